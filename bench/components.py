@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from mun import register
+
+
+def register_components(count: int) -> list[str]:
+    """Register `count` no-op components, returning their names.
+
+    Only `exec` ships with mun and an entity holds each component once, so
+    entities with several components need more types to choose from. This only
+    imports the registry, to keep it out of cold start timings.
+    """
+    names = []
+    for i in range(count):
+        cls = type(f"BenchNoop{i}", (), {"__doc__": "Do nothing, for benchmarks."})
+        register.component(cls, with_defaults=True)
+        names.append(f"bench_noop{i}")
+    return names
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterator
+import click
+from bench.components import register_components
+from mun.cache import RegistryCache, WorkspaceCache
+from mun.config import ENV_CONFIG_PATH, Config, Opts
+from mun.registry import Registry
+
+# benchmarks of workspace discovery and registry loading over synthetic
+# workspaces, run from the repository root with `python -m bench.discovery`
+
+RESULTS_VERSION = 1
+REPO_ROOT = Path(__file__).parent.parent
+
+# most that `mun --help` may take beyond starting a bare interpreter, tracked
+# here and checked by the test suite - it is run from shell prompts and git
+# hooks, so regressions are felt on every keystroke
+COLD_START_BUDGET_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class Scenario:
+    siblings: int  # project roots beside the one being worked in
+    entities: int  # entity files in each root
+    components: int  # components in each entity
+    depth: int  # directories between the project root and the working directory
+
+    @property
+    def id(self) -> str:
+        return f"s{self.siblings}-e{self.entities}-c{self.components}-d{self.depth}"
+
+
+def generate(scenario: Scenario, base: Path) -> Path:
+    """Lay out a workspace for `scenario`, returning the directory to work from."""
+    components = register_components(scenario.components)
+    for i in range(scenario.siblings + 1):
+        entity_dir = base / f"project{i}/.mun/entities"
+        entity_dir.mkdir(parents=True)
+        for j in range(scenario.entities):
+            # depend on the previous entity, for a realistic amount of graph
+            depends_on = [f"p{i}e{j - 1}"] if j else []
+            tables = "".join(
+                f'\n[{name}]\nargs = ["true"]\nreset_inputs = ["src/{j}"]\n'
+                for name in components
+            )
+            (entity_dir / f"p{i}e{j}.toml").write_text(
+                f"depends_on = {depends_on!r}\n{tables}"
+            )
+        (base / f"unrelated{i}").mkdir()
+
+    cwd = base / "project0" / Path(*(f"d{i}" for i in range(scenario.depth)))
+    cwd.mkdir(parents=True, exist_ok=True)
+
+    # discovery results over recently modified directories aren't cached
+    past = time.time() - 60
+    for dir in [base, *(p for p in base.rglob("*") if p.is_dir())]:
+        os.utime(dir, (past, past))
+    return cwd
+
+
+def measure(func: Callable[[], Any], *, repeat: int) -> dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "runs": runs,
+    }
+
+
+def cold_start(*, repeat: int) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Time `mun --help` from a cold interpreter, and a bare interpreter to compare."""
+    for name, code in [
+        ("python.startup/cold", "pass"),
+        ("cli.help/cold", "from mun.cli import main; main(['--help'])"),
+    ]:
+        command = [sys.executable, "-c", code]
+        run = partial(subprocess.run, command, capture_output=True, cwd=REPO_ROOT)
+        yield name, measure(run, repeat=repeat)
+
+
+def cold_start_overhead(results: dict[str, Any]) -> float:
+    """The least time `mun --help` took beyond a bare interpreter."""
+    return float(
+        results["cli.help/cold"]["min"] - results["python.startup/cold"]["min"]
+    )
+
+
+def run_scenario(
+    scenario: Scenario, *, repeat: int, workers: int
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Benchmark each stage of discovery in `scenario`, with and without caches."""
+    with tempfile.TemporaryDirectory(prefix="mun-bench-") as tmp:
+        base = Path(tmp)
+        cwd = generate(scenario, base / "workspace")
+        cache_dir = base / "cache"
+        config_file = base / "config.toml"
+        config_file.write_text('sibling_project_patterns = ["../*"]\n')
+
+        def config(*, cached: bool) -> Config:
+            opts = Opts(cache_dir=cache_dir if cached else None)
+            cache = WorkspaceCache(cache_dir) if cached else None
+            return Config(opts=opts, workspace_cache=cache)
+
+        def discover(attr: str, *, cached: bool) -> Any:
+            return getattr(config(cached=cached), attr)
+
+        def registry(entity_dirs: set[Path], *, cached: bool) -> Registry:
+            return Registry.from_dirs(
+                entity_dirs=entity_dirs,
+                cache=RegistryCache(cache_dir) if cached else None,
+                max_workers=workers,
+            )
+
+        env = {
+            ENV_CONFIG_PATH: str(config_file),
+            "XDG_CACHE_HOME": str(base / "xdg-cache"),
+            "XDG_RUNTIME_DIR": str(base / "run"),
+            "PYTHONPATH": str(REPO_ROOT),
+        }
+        with _chdir(cwd), _environ(env):
+            entity_dirs = config(cached=False).entity_dirs
+            for cached in (False, True):
+                mode = "warm" if cached else "uncached"
+                if cached:
+                    # prime the caches, so the timed runs are all hits
+                    _ = config(cached=True).entity_dirs
+                    registry(entity_dirs, cached=True)
+
+                yield (
+                    f"config.find_or_default/{mode}",
+                    measure(Config.find_or_default, repeat=repeat),
+                )
+                yield (
+                    f"config.sibling_roots/{mode}",
+                    measure(
+                        partial(discover, "sibling_roots", cached=cached), repeat=repeat
+                    ),
+                )
+                yield (
+                    f"config.entity_dirs/{mode}",
+                    measure(
+                        partial(discover, "entity_dirs", cached=cached), repeat=repeat
+                    ),
+                )
+                yield (
+                    f"registry.from_dirs/{mode}",
+                    measure(
+                        partial(registry, entity_dirs, cached=cached), repeat=repeat
+                    ),
+                )
+
+            # the CLI uses the default caches, which the first run primes
+            cli = _cli_command(scenario.components)
+            subprocess.run(cli, check=True, capture_output=True)
+            yield (
+                "cli.entity_list/warm",
+                measure(
+                    lambda: subprocess.run(cli, check=True, capture_output=True),
+                    repeat=repeat,
+                ),
+            )
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> Iterator[str]:
+    for key in sorted(old["results"].keys() & new["results"].keys()):
+        before = old["results"][key]["median"]
+        after = new["results"][key]["median"]
+        change = (after - before) / before * 100 if before else 0.0
+        yield f"{key:<60} {before * 1000:9.2f}ms {after * 1000:9.2f}ms {change:+7.1f}%"
+
+
+@click.command()
+@click.option("--siblings", multiple=True, type=int, default=[0, 10, 50])
+@click.option("--entities", multiple=True, type=int, default=[10, 200])
+@click.option("--components", multiple=True, type=int, default=[3])
+@click.option("--depth", multiple=True, type=int, default=[8])
+@click.option("--repeat", default=5, help="Timed runs of each benchmark.")
+@click.option("--workers", default=1, help="Registry scan workers.")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write results here as JSON.",
+)
+@click.option(
+    "--compare",
+    "baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Compare medians against earlier results.",
+)
+def main(
+    *,
+    siblings: tuple[int, ...],
+    entities: tuple[int, ...],
+    components: tuple[int, ...],
+    depth: tuple[int, ...],
+    repeat: int,
+    workers: int,
+    output: Path | None,
+    baseline: Path | None,
+) -> None:
+    """Benchmark discovery over every combination of the given sizes."""
+    scenarios = [
+        Scenario(*sizes)
+        for sizes in itertools.product(siblings, entities, components, depth)
+    ]
+    results: dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "meta": _meta(),
+        "scenarios": {scenario.id: asdict(scenario) for scenario in scenarios},
+        "results": {},
+    }
+    for name, result in cold_start(repeat=repeat):
+        results["results"][name] = result
+        click.echo(f"{name:<60} {result['median'] * 1000:9.2f}ms", err=True)
+    overhead = cold_start_overhead(results["results"])
+    results["budgets"] = {"cli.help/cold": COLD_START_BUDGET_SECONDS}
+    if overhead > COLD_START_BUDGET_SECONDS:
+        click.echo(
+            f"cli.help/cold is {overhead * 1000:.0f}ms over a bare interpreter,"
+            f" beyond its budget of {COLD_START_BUDGET_SECONDS * 1000:.0f}ms",
+            err=True,
+        )
+
+    for scenario in scenarios:
+        for name, result in run_scenario(scenario, repeat=repeat, workers=workers):
+            key = f"{scenario.id}/{name}"
+            results["results"][key] = result
+            click.echo(f"{key:<60} {result['median'] * 1000:9.2f}ms", err=True)
+
+    if output:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+    if baseline:
+        for line in compare(json.loads(baseline.read_text()), results):
+            click.echo(line)
+
+
+def _meta() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=REPO_ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": datetime.now(UTC).isoformat(),
+    }
+
+
+def _cli_command(components: int) -> list[str]:
+    code = (
+        "import sys\n"
+        "from bench.components import register_components\n"
+        f"register_components({components})\n"
+        "from mun.cli import main\n"
+        "sys.argv = ['mun', 'entity', 'list']\n"
+        "main()\n"
+    )
+    return [sys.executable, "-c", code]
+
+
+@contextmanager
+def _chdir(to: Path) -> Iterator[None]:
+    cwd = Path.cwd()
+    os.chdir(to)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+@contextmanager
+def _environ(env: dict[str, str]) -> Iterator[None]:
+    saved = dict(os.environ)
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+if __name__ == "__main__":
+    main()
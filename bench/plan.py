@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import itertools
+import json
+import statistics
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterator
+import anyio
+import click
+from bench.discovery import _chdir, _meta, compare
+from mun.component import Context
+from mun.registry import Registry
+from mun.tasks import TaskRunner
+
+# benchmarks of running a dependency graph with limited jobs, before and after
+# its durations have been recorded, run from the repository root with
+# `python -m bench.plan`
+
+RESULTS_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Scenario:
+    jobs: int
+    sidecars: int  # quick entities, each with a quick check depending on it
+    slow: float  # seconds taken by the one slow entity, which nothing depends on
+
+    @property
+    def id(self) -> str:
+        return f"j{self.jobs}-s{self.sidecars}-t{self.slow}"
+
+
+def generate(scenario: Scenario, base: Path) -> Path:
+    """Lay out a project for `scenario`, returning its entity directory.
+
+    Untimed, the sidecars look like the critical path, as their chains are the
+    longest - so bring-up only gets faster once the slow entity has been timed.
+    """
+    entities = base / ".mun/entities"
+    entities.mkdir(parents=True)
+    (entities / "slow.toml").write_text(
+        f"[exec]\nargs = ['sleep', '{scenario.slow}']\n"
+    )
+    for i in range(scenario.sidecars):
+        (entities / f"sidecar{i}.toml").write_text("[exec]\nargs = ['sleep', '0.1']\n")
+        (entities / f"check{i}.toml").write_text(
+            f"depends_on = ['sidecar{i}']\n[exec]\nargs = ['sleep', '0.1']\n"
+        )
+    return entities
+
+
+def run_scenario(
+    scenario: Scenario, *, repeat: int
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    with tempfile.TemporaryDirectory(prefix="mun-bench-") as tmp, _chdir(Path(tmp)):
+        base = Path(tmp)
+        registry = Registry.from_dirs(entity_dirs={generate(scenario, base)})
+        names = list(registry.entities)
+
+        for variant in ("untimed", "timed"):
+            totals = []
+            for _ in range(repeat):
+                # each untimed run starts from an empty cache, and timed runs
+                # from one that a previous run recorded to
+                cache_dir = base / "cache" if variant == "timed" else None
+                ctx = Context(pwd=base, project_root=base, cache_dir=cache_dir)
+                if variant == "timed" and not (base / "cache").exists():
+                    anyio.run(TaskRunner(registry=registry, ctx=ctx).run, names)
+
+                runner = TaskRunner(registry=registry, ctx=ctx, jobs=scenario.jobs)
+                began = time.perf_counter()
+                anyio.run(runner.run, names)
+                totals.append(time.perf_counter() - began)
+            yield (
+                f"tasks.run/{variant}",
+                {
+                    "min": min(totals),
+                    "median": statistics.median(totals),
+                    "runs": totals,
+                },
+            )
+
+
+@click.command()
+@click.option("--jobs", multiple=True, type=int, default=[2])
+@click.option("--sidecars", multiple=True, type=int, default=[4, 8])
+@click.option("--slow", multiple=True, type=float, default=[1.0])
+@click.option("--repeat", default=3, help="Timed runs of each benchmark.")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write results here as JSON.",
+)
+@click.option(
+    "--compare",
+    "baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Compare medians against earlier results.",
+)
+def main(
+    *,
+    jobs: tuple[int, ...],
+    sidecars: tuple[int, ...],
+    slow: tuple[float, ...],
+    repeat: int,
+    output: Path | None,
+    baseline: Path | None,
+) -> None:
+    """Benchmark critical-path scheduling over every combination of the given sizes."""
+    scenarios = [Scenario(*sizes) for sizes in itertools.product(jobs, sidecars, slow)]
+    results: dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "meta": _meta(),
+        "scenarios": {scenario.id: asdict(scenario) for scenario in scenarios},
+        "results": {},
+    }
+    for scenario in scenarios:
+        for name, result in run_scenario(scenario, repeat=repeat):
+            key = f"{scenario.id}/{name}"
+            results["results"][key] = result
+            click.echo(f"{key:<60} {result['median'] * 1000:9.2f}ms", err=True)
+
+    if output:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+    if baseline:
+        for line in compare(json.loads(baseline.read_text()), results):
+            click.echo(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import itertools
+import json
+import statistics
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Iterator
+import anyio
+import click
+from bench.discovery import _chdir, _meta, compare
+from mun.component import Context, Exec
+
+# benchmarks of starting many Exec components at once with each spawn backend,
+# run from the repository root with `python -m bench.spawn`
+
+RESULTS_VERSION = 1
+BACKENDS = ("subprocess", "posix_spawn")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    components: int  # started together, as by one large entity
+    ballast: int  # MiB of memory touched by the parent beforehand
+
+    @property
+    def id(self) -> str:
+        return f"c{self.components}-m{self.ballast}"
+
+
+async def start_all(
+    scenario: Scenario, *, backend: str, base: Path
+) -> tuple[float, list[float]]:
+    """Start and stop `scenario.components` processes, timing how long each took."""
+    ctx = Context(pwd=base, project_root=base)
+    execs = [
+        Exec(
+            ctx=ctx,
+            args=["sleep", "30"],
+            cwd=str(base),
+            stdout=base / f"{i}.out",
+            stderr=base / f"{i}.err",
+            spawn=backend,
+        )
+        for i in range(scenario.components)
+    ]
+    latencies: list[float] = []
+
+    async def start(exec: Exec) -> None:
+        began = time.perf_counter()
+        await exec.start(ctx=ctx)
+        latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for exec in execs:
+            tg.start_soon(start, exec)
+    total = time.perf_counter() - began
+
+    async with anyio.create_task_group() as tg:
+        for exec in execs:
+            tg.start_soon(partial(exec.run, ctx=ctx))
+        for exec in execs:
+            tg.start_soon(partial(exec.stop, ctx=ctx))
+    return total, latencies
+
+
+def run_scenario(
+    scenario: Scenario, *, repeat: int
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    # held until the scenario finishes, so every spawn happens from a parent
+    # of at least this size
+    ballast = bytearray(scenario.ballast * 1024 * 1024)
+    ballast[::4096] = b"\1" * len(ballast[::4096])
+    with tempfile.TemporaryDirectory(prefix="mun-bench-") as tmp, _chdir(Path(tmp)):
+        # components run from the project root, which mun is usually started
+        # in - elsewhere, posix_spawn has to go through a shell to change to it
+        for backend in BACKENDS:
+            totals, latencies = [], []
+            for _ in range(repeat):
+                total, each = anyio.run(
+                    partial(start_all, scenario, backend=backend, base=Path(tmp))
+                )
+                totals.append(total)
+                latencies.extend(each)
+            yield (
+                f"exec.start_all/{backend}",
+                {
+                    "min": min(totals),
+                    "median": statistics.median(totals),
+                    "runs": totals,
+                },
+            )
+            yield (
+                f"exec.start/{backend}",
+                {
+                    "min": min(latencies),
+                    "median": statistics.median(latencies),
+                    "p99": statistics.quantiles(latencies, n=100)[-1],
+                },
+            )
+    del ballast
+
+
+@click.command()
+@click.option("--components", multiple=True, type=int, default=[100, 500])
+@click.option("--ballast", multiple=True, type=int, default=[0, 1024])
+@click.option("--repeat", default=3, help="Timed runs of each benchmark.")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write results here as JSON.",
+)
+@click.option(
+    "--compare",
+    "baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Compare medians against earlier results.",
+)
+def main(
+    *,
+    components: tuple[int, ...],
+    ballast: tuple[int, ...],
+    repeat: int,
+    output: Path | None,
+    baseline: Path | None,
+) -> None:
+    """Benchmark spawning over every combination of the given sizes."""
+    scenarios = [Scenario(*sizes) for sizes in itertools.product(components, ballast)]
+    results: dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "meta": _meta(),
+        "scenarios": {scenario.id: asdict(scenario) for scenario in scenarios},
+        "results": {},
+    }
+    for scenario in scenarios:
+        for name, result in run_scenario(scenario, repeat=repeat):
+            key = f"{scenario.id}/{name}"
+            results["results"][key] = result
+            click.echo(f"{key:<60} {result['median'] * 1000:9.2f}ms", err=True)
+
+    if output:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+    if baseline:
+        for line in compare(json.loads(baseline.read_text()), results):
+            click.echo(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Mapping
+from mun.digest import expand_files, file_digest
+
+logger = logging.getLogger(__name__)
+CACHE_VERSION: int = 1
+
+# directories modified this recently may still change within the same mtime tick,
+# so a result depending on them is not trusted enough to be cached yet
+RACY_MTIME_NS: int = 1_000_000_000
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    return Path(base).expanduser() / "mun"
+
+
+def stat_key(stat: os.stat_result) -> list[int]:
+    """Identify a version of a file without reading it."""
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+def cache_file_name(key: Path | str) -> str:
+    return hashlib.sha256(str(key).encode()).hexdigest()[:32] + ".json"
+
+
+def read_json(path: Path) -> Any:
+    """Read a cache file, treating a missing or corrupt file as empty."""
+    try:
+        with path.open("rb") as fp:
+            doc = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(doc, dict) or doc.get("version") != CACHE_VERSION:
+        return None
+    return doc.get("data")
+
+
+def update_json(path: Path, update: Callable[[dict[str, Any]], None]) -> None:
+    """Change a cache file of a dict with `update`, locked against other writers.
+
+    Concurrent mun processes, or threads, updating the same file don't lose
+    each other's changes.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock = path.with_suffix(".lock").open("w")
+    except OSError as e:
+        logger.debug(f"Could not lock cache file '{path}': {e}")
+        return
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = read_json(path)
+        data = data if isinstance(data, dict) else {}
+        update(data)
+        write_json(path, data)
+
+
+def write_json(path: Path, data: Any) -> None:
+    """Atomically replace a cache file, logging rather than failing on error."""
+    tmp = _temp_path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("w") as fp:
+            json.dump({"version": CACHE_VERSION, "data": data}, fp)
+        tmp.replace(path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug(f"Could not write cache file '{path}': {e}")
+        tmp.unlink(missing_ok=True)
+
+
+def _temp_path(path: Path) -> Path:
+    # unique to the thread as well as the process, as threads write at once too
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+
+
+@dataclass
+class DocCache:
+    """Parsed TOML documents of a single entity directory, keyed by file stat."""
+
+    path: Path
+    entries: dict[str, tuple[list[int], dict[str, Any]]]
+    seen: dict[str, tuple[list[int], dict[str, Any]]] = field(default_factory=dict)
+
+    def get(self, file: Path, stat: os.stat_result) -> dict[str, Any] | None:
+        entry = self.entries.get(file.name)
+        if entry is None or entry[0] != stat_key(stat):
+            return None
+        self.seen[file.name] = entry
+        return entry[1]
+
+    def put(self, file: Path, stat: os.stat_result, doc: dict[str, Any]) -> None:
+        try:
+            json.dumps(doc)
+        except (TypeError, ValueError):
+            return  # e.g. TOML datetimes, which are cheap enough to re-parse
+        self.seen[file.name] = (stat_key(stat), doc)
+
+    def save(self) -> None:
+        """Persist the entries seen since loading, dropping deleted files."""
+        if self.seen != self.entries:
+            write_json(self.path, self.seen)
+            self.entries = dict(self.seen)
+
+
+@dataclass
+class RegistryCache:
+    """On-disk cache of parsed entity documents, stored per entity directory."""
+
+    root: Path
+
+    def for_dir(self, dir: Path) -> DocCache:
+        path = self.root / "registry" / cache_file_name(dir)
+        data = read_json(path)
+        entries = {
+            name: (list(key), doc)
+            for name, (key, doc) in (data or {}).items()
+            if isinstance(doc, dict)
+        }
+        return DocCache(path=path, entries=entries)
+
+
+@dataclass
+class WorkspaceCache:
+    """Discovered project layouts, validated by the mtimes of the directories
+    whose listings decided them.
+    """
+
+    root: Path
+
+    def load(self, key: str) -> dict[str, Any] | None:
+        data = read_json(self._path(key))
+        if not isinstance(data, dict):
+            return None
+        for path, mtime in data.get("witnesses", {}).items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:  # noqa: PTH116
+                    return None
+            except OSError:
+                return None
+        logger.debug("Using cached workspace layout")
+        return data
+
+    def save(
+        self, key: str, workspace: dict[str, Any], witnesses: dict[str, int]
+    ) -> None:
+        racy = time.time_ns() - RACY_MTIME_NS
+        if any(mtime > racy for mtime in witnesses.values()):
+            return
+        write_json(self._path(key), {**workspace, "witnesses": witnesses})
+
+    def _path(self, key: str) -> Path:
+        return self.root / "workspace" / cache_file_name(key)
+
+
+@dataclass
+class DigestStore:
+    """Input digests recorded after operations succeed, such as a component reset."""
+
+    root: Path
+
+    def get(self, key: str) -> str | None:
+        digest = (read_json(self._path) or {}).get(key)
+        return digest if isinstance(digest, str) else None
+
+    def put(self, key: str, digest: str) -> None:
+        update_json(self._path, lambda digests: digests.update({key: digest}))
+
+    @property
+    def _path(self) -> Path:
+        return self.root / "digests.json"
+
+
+@dataclass
+class DurationStore:
+    """Recent durations of operations, such as entities starting, to plan by."""
+
+    root: Path
+    history: int = 8  # durations kept for each key
+
+    def record(self, key: str, seconds: float) -> None:
+        self.record_all({key: seconds})
+
+    def record_all(self, durations: Mapping[str, float]) -> None:
+        """Add `durations` by key, in one locked update."""
+
+        def record(recorded: dict[str, Any]) -> None:
+            for key, seconds in durations.items():
+                recent = recorded.get(key)
+                recent = recent if isinstance(recent, list) else []
+                recorded[key] = [*recent, round(seconds, 3)][-self.history :]
+
+        update_json(self._path, record)
+
+    def estimates(self) -> dict[str, float]:
+        """Estimate each key's duration as the median of its recent ones."""
+        return {
+            key: sorted(recent)[len(recent) // 2]
+            for key, recent in (read_json(self._path) or {}).items()
+            if isinstance(recent, list) and recent
+        }
+
+    @property
+    def _path(self) -> Path:
+        return self.root / "durations.json"
+
+
+@dataclass
+class OutputStore:
+    """Files produced by commands, stored by content and restored by action key.
+
+    Kept in the cache directory, which every project root shares, so siblings
+    building the same thing from the same inputs reuse each other's outputs.
+    """
+
+    root: Path
+
+    def restore(self, key: str, *, base: Path) -> bool:
+        """Replace the outputs recorded for `key` below `base`, if there are any."""
+        manifest = read_json(self._action(key))
+        try:
+            blobs = [
+                self._blob(entry["digest"]) for entry in manifest["files"].values()
+            ]
+        except (KeyError, TypeError, AttributeError):
+            return False
+        if not all(blob.is_file() for blob in blobs):
+            return False  # pruned from under the manifest
+
+        for output in manifest["outputs"]:
+            _remove(base / output)
+        for dir in manifest["dirs"]:
+            (base / dir).mkdir(parents=True, exist_ok=True)
+        for name, entry in manifest["files"].items():
+            path = base / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self._blob(entry["digest"]), path)
+            path.chmod(entry["mode"])
+        return True
+
+    def save(self, key: str, outputs: list[Path], *, base: Path) -> None:
+        """Store the files below `outputs`, recording them under `key`."""
+        files = {}
+        for file in expand_files(base / output for output in outputs):
+            digest = file_digest(file)
+            blob = self._blob(digest)
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                tmp = _temp_path(blob)
+                shutil.copyfile(file, tmp)
+                tmp.replace(blob)
+            name = os.path.relpath(file, base)
+            files[name] = {"digest": digest, "mode": file.stat().st_mode & 0o7777}
+
+        dirs = {
+            os.path.relpath(dir, base)
+            for output in outputs
+            if (base / output).is_dir()
+            for dir in [base / output, *(base / output).rglob("*")]
+            if dir.is_dir()
+        }
+        manifest = {
+            "outputs": [str(output) for output in outputs],
+            "dirs": sorted(dirs),
+            "files": files,
+        }
+        write_json(self._action(key), manifest)
+
+    def _action(self, key: str) -> Path:
+        return self.root / "cas" / "actions" / f"{key}.json"
+
+    def _blob(self, digest: str) -> Path:
+        return self.root / "cas" / "blobs" / digest[:2] / digest
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
@@ -1,14 +1,27 @@
 from __future__ import annotations
 
 import logging
+import os
 import sys
+from contextlib import suppress
 from dataclasses import dataclass
-from typing import Iterator
+from functools import cached_property, partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator
 import click
-import rich
-from rich.logging import RichHandler
-from mun.config import Config
-from mun.registry import Registry
+
+# rich, pydantic and anyio are comparatively slow to import, so everything that
+# pulls them in is imported where used to keep `mun --help` and friends fast
+if TYPE_CHECKING:
+    from rich.table import Table
+    from mun.component import Context
+    from mun.config import Config
+    from mun.logs import LogStore
+    from mun.logs import Record as LogRecord
+    from mun.plan import Plan
+    from mun.registry import Registry
+    from mun.runtime import Runtime
+    from mun.tasks import TaskResult
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +35,8 @@ def main() -> None:
 
 
 def config_logging(*, verbose: bool, quiet: bool) -> None:
+    from rich.logging import RichHandler
+
     class MunDebugOnlyFilter(logging.Filter):
         def filter(self, record: logging.LogRecord) -> bool:
             if record.levelno < logging.INFO:
@@ -50,19 +65,294 @@ def config_logging(*, verbose: bool, quiet: bool) -> None:
 
 @dataclass
 class ClickContext:
-    config: Config
-    registry: Registry
+    """State shared by subcommands, only constructed once a command needs it."""
+
+    verbose: bool = False
+    quiet: bool = False
+
+    @cached_property
+    def config(self) -> Config:
+        from mun.config import Config
+
+        return Config.find_or_default()
+
+    @cached_property
+    def registry(self) -> Registry:
+        from mun.cache import RegistryCache
+        from mun.registry import Registry
+
+        opts = self.config.opts
+        return Registry.from_dirs(
+            entity_dirs=self.config.entity_dirs,
+            cache=RegistryCache(opts.cache_dir) if opts.cache_dir else None,
+            max_workers=opts.scan_workers,
+        )
+
+    @cached_property
+    def socket_path(self) -> Path:
+        from mun import control
+
+        return control.socket_path(self.config.project_root)
+
+    @cached_property
+    def context(self) -> Context:
+        from mun import control
+        from mun.component import Context
+        from mun.ports import PortAllocator
+
+        return Context(
+            pwd=Path.cwd(),
+            project_root=self.config.project_root,
+            cache_dir=self.config.opts.cache_dir,
+            log_store=self.log_store,
+            ports=PortAllocator(control.runtime_dir() / "ports"),
+            roots=frozenset(self.config.roots),
+        )
+
+    @cached_property
+    def log_store(self) -> LogStore | None:
+        from mun.logs import LogStore
+
+        opts = self.config.opts
+        if opts.log_dir is None:
+            return None
+        return LogStore.for_project(
+            opts.log_dir,
+            self.config.project_root,
+            segment_bytes=opts.log_segment_bytes,
+            segments=opts.log_segments,
+        )
+
+    def runtime(self, *, sample: bool = False) -> Runtime:
+        from mun.runtime import Runtime
+        from mun.stats import Sampler
+
+        opts = self.config.opts
+        return Runtime(
+            registry=self.registry,
+            ctx=self.context,
+            jobs=opts.start_jobs,
+            sampler=(
+                Sampler(interval=opts.stats_interval, history=opts.stats_history)
+                if sample and opts.stats_interval > 0
+                else None
+            ),
+        )
+
+    def request(self, command: str, **args: Any) -> Any:
+        """Send a command to this project's daemon."""
+        from mun import control
+
+        try:
+            return control.request(self.socket_path, command, **args)
+        except OSError as e:
+            raise click.ClickException(
+                "No daemon is running for this project, "
+                "start one with `mun daemon --detach`"
+            ) from e
+        except RuntimeError as e:
+            raise click.ClickException(str(e)) from e
 
 
 @click.group()
 @click.option("--verbose", "-v", is_flag=True, default=False, help="Verbose output.")
 @click.option("--quiet", "-q", is_flag=True, default=False, help="Avoid output.")
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    help="Write a Chrome trace of where time went to this file.",
+)
 @click.pass_context
-def cli(ctx: click.Context, *, verbose: bool, quiet: bool) -> None:
+def cli(ctx: click.Context, *, verbose: bool, quiet: bool, trace: Path | None) -> None:
     config_logging(verbose=verbose, quiet=quiet)
-    config = Config.find_or_default()
-    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
-    ctx.obj = ClickContext(config=config, registry=registry)
+    ctx.obj = ClickContext(verbose=verbose, quiet=quiet)
+    if trace:
+        from mun.trace import TRACER
+
+        TRACER.enabled = True
+        ctx.call_on_close(partial(TRACER.write, trace))
+
+
+@cli.command()
+@click.option("--detach", is_flag=True, default=False, help="Run in the background.")
+@click.option("--shutdown", is_flag=True, default=False, help="Stop a running daemon.")
+@click.pass_context
+def daemon(ctx: click.Context, *, detach: bool, shutdown: bool) -> None:
+    """Supervise entities, controlled by the entity subcommands."""
+    obj: ClickContext = ctx.obj
+    if shutdown:
+        obj.request("shutdown")
+        return
+    if detach:
+        _spawn_daemon(obj)
+        return
+
+    import anyio
+    from mun.daemon import Daemon
+    from mun.watch import open_watcher
+
+    opts = obj.config.opts
+    watcher = (
+        open_watcher(obj.config.entity_dirs, poll_interval=opts.watch_poll_interval)
+        if opts.watch
+        else None
+    )
+    daemon = Daemon(
+        runtime=obj.runtime(sample=True), path=obj.socket_path, watcher=watcher
+    )
+    anyio.run(daemon.serve)
+
+
+@cli.command(name="shared-daemon", hidden=True)
+@click.option(
+    "--socket",
+    required=True,
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Socket to listen on.",
+)
+@click.argument("definitions", nargs=-1, required=True, type=click.Path(path_type=Path))
+@click.pass_context
+def shared_daemon(
+    ctx: click.Context, *, socket: Path, definitions: tuple[Path, ...]
+) -> None:
+    """Run shared entities for the projects holding them, spawned on demand."""
+    import anyio
+    from mun.daemon import Daemon
+    from mun.registry import EntityIndex, Registry
+    from mun.runtime import Runtime
+
+    obj: ClickContext = ctx.obj
+    # only the definitions of the shared entity and its dependencies, which
+    # are run here rather than by daemons of their own
+    registry = Registry(entities=EntityIndex(), share=False)
+    registry.reload(definitions)
+    daemon = Daemon(
+        runtime=Runtime(registry=registry, ctx=obj.context), path=socket, shared=True
+    )
+    anyio.run(daemon.serve)
+
+
+STATS_COLUMNS = {
+    "processes": "procs",
+    "cpu": "cpu %",
+    "rss": "rss",
+    "fds": "fds",
+    "read": "read/s",
+    "write": "write/s",
+}
+
+
+@cli.command()
+@click.option(
+    "--sort",
+    type=click.Choice(["name", *STATS_COLUMNS]),
+    default="cpu",
+    help="Column to sort by, largest first.",
+)
+@click.option("--watch", "-w", is_flag=True, default=False, help="Keep updating.")
+@click.option("--interval", default=2.0, help="Seconds between updates.")
+@click.pass_context
+def stats(ctx: click.Context, *, sort: str, watch: bool, interval: float) -> None:
+    """Show the resource usage of processes running in the daemon."""
+    from rich.console import Console
+
+    obj: ClickContext = ctx.obj
+    if not watch:
+        Console().print(_stats_table(obj.request("stats"), sort=sort))
+        return
+
+    import time
+    from rich.live import Live
+
+    with Live(auto_refresh=False) as live, suppress(KeyboardInterrupt):
+        while True:
+            live.update(_stats_table(obj.request("stats"), sort=sort), refresh=True)
+            time.sleep(interval)
+
+
+def _parse_time(
+    _ctx: click.Context, _param: click.Parameter, value: str | None
+) -> float | None:
+    """Parse a time ago, like 10m, or an ISO 8601 time into a timestamp."""
+    import re
+    import time
+    from datetime import datetime
+
+    if value is None:
+        return None
+    if match := re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value):
+        seconds = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}[match[2]]
+        return time.time() - float(match[1]) * seconds
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError as e:
+        raise click.BadParameter(
+            "expected a time ago like 10m, or an ISO 8601 time"
+        ) from e
+
+
+@cli.command()
+@click.argument("names", nargs=-1)
+@click.option(
+    "--since", callback=_parse_time, help="Show output from a time, like 10m ago."
+)
+@click.option("--until", callback=_parse_time, help="Show output up to a time.")
+@click.option(
+    "--follow", "-f", is_flag=True, default=False, help="Keep showing output."
+)
+@click.option("--interval", default=0.25, help="Seconds between checks when following.")
+@click.pass_context
+def logs(
+    ctx: click.Context,
+    names: tuple[str, ...],
+    *,
+    since: float | None,
+    until: float | None,
+    follow: bool,
+    interval: float,
+) -> None:
+    """Show the output of components, by entity or component name, or of all."""
+    import heapq
+    import itertools
+    import time
+
+    obj: ClickContext = ctx.obj
+    store = obj.log_store
+    if store is None:
+        raise click.ClickException("Logs are disabled by the log_dir option")
+    components = [
+        component
+        for component in store.names()
+        if not names
+        or any(component == name or component.startswith(f"{name}.") for name in names)
+    ]
+    if not components:
+        raise click.ClickException(f"No logs of {', '.join(names) or 'any component'}")
+
+    # opened first, so nothing written while the history is shown is missed, and
+    # the history stops where they start so nothing is shown twice
+    tails = {name: store.reader(name).tail() for name in components} if follow else {}
+    history = heapq.merge(
+        *(
+            zip(
+                itertools.repeat(name),
+                store.reader(name).read(since=since, until=until, tail=tails.get(name)),
+            )
+            for name in components
+        ),
+        key=lambda item: item[1].time,
+    )
+    for name, record in history:
+        _echo_record(name, record)
+
+    with suppress(KeyboardInterrupt):
+        while tails:
+            for name, tail in tails.items():
+                for record in tail.poll():
+                    if until is not None and record.time > until:
+                        return
+                    _echo_record(name, record)
+            time.sleep(interval)
 
 
 @cli.group()
@@ -72,12 +362,14 @@ def component(_ctx: click.Context) -> None: ...
 
 @component.command(name="list")
 @click.pass_context
-def component_list(ctx: click.Context) -> None:
-    registry: Registry = ctx.obj.registry
+def component_list(_ctx: click.Context) -> None:
+    # listing components needs neither the config nor the entity registry
+    import mun.component  # noqa: F401 loaded for side-effect
+    from mun.register import COMPONENTS
+
     _output_two_col_table(
         items=(
-            (name, str(component.__doc__))
-            for name, component in registry.components.items()
+            (name, str(component.__doc__)) for name, component in COMPONENTS.items()
         ),
     )
 
@@ -90,20 +382,273 @@ def entity(_ctx: click.Context) -> None: ...
 @entity.command(name="list")
 @click.pass_context
 def entity_list(ctx: click.Context) -> None:
-    registry: Registry = ctx.obj.registry
+    from mun import control
+
+    obj: ClickContext = ctx.obj
+    try:
+        entities = control.request(obj.socket_path, "list")
+    except OSError:
+        registry: Registry = obj.registry
+        entities = [
+            {"name": name, "path": str(path)}
+            for name, path in registry.entities.paths.items()
+        ]
     _output_two_col_table(
-        items=(
-            (entity.name, str(entity.path)) for entity in registry.entities.values()
-        ),
+        items=((entity["name"], entity["path"]) for entity in entities),
     )
 
 
+@entity.command(name="start")
+@click.argument("names", nargs=-1, required=True)
+@click.pass_context
+def entity_start(ctx: click.Context, names: tuple[str, ...]) -> None:
+    """Start entities and their dependencies in the daemon."""
+    _output_states(ctx.obj.request("start", names=names))
+
+
+@entity.command(name="stop")
+@click.argument("names", nargs=-1)
+@click.pass_context
+def entity_stop(ctx: click.Context, names: tuple[str, ...]) -> None:
+    """Stop entities and their dependents in the daemon, or all of them."""
+    _output_states(ctx.obj.request("stop", names=names or None))
+
+
+@entity.command(name="reset")
+@click.argument("names", nargs=-1)
+@click.pass_context
+def entity_reset(ctx: click.Context, names: tuple[str, ...]) -> None:
+    """Reset running entities in the daemon, or all of them."""
+    _output_states(ctx.obj.request("reset", names=names or None))
+
+
+@entity.command(name="status")
+@click.pass_context
+def entity_status(ctx: click.Context) -> None:
+    """Show the state of entities running in the daemon."""
+    states = ctx.obj.request("status")
+    for name, count in ctx.obj.request("restarts").items():
+        entity = name.partition(".")[0]
+        if count and entity in states:
+            states[entity] += f" ({name} restarted {count}x)"
+    _output_states(states)
+
+
+@entity.command(name="ports")
+@click.pass_context
+def entity_ports(ctx: click.Context) -> None:
+    """Show the ports reserved for entities running in the daemon."""
+    ports = ctx.obj.request("ports")
+    _output_two_col_table(
+        items=((name, str(port)) for name, port in sorted(ports.items()))
+    )
+
+
+@entity.command(name="up")
+@click.argument("names", nargs=-1, required=True)
+@click.pass_context
+def entity_up(ctx: click.Context, names: tuple[str, ...]) -> None:
+    """Start entities and their dependencies, stopping them on exit."""
+    import anyio
+
+    anyio.run(ctx.obj.runtime().up, names)
+
+
+@cli.command()
+@click.argument("names", nargs=-1, required=True)
+@click.option("--jobs", "-j", default=os.cpu_count() or 1, help="Tasks to run at once.")
+@click.option(
+    "--keep-going",
+    "-k",
+    is_flag=True,
+    default=False,
+    help="Keep running what doesn't depend on a failed task.",
+)
+@click.pass_context
+def run(
+    ctx: click.Context, names: tuple[str, ...], *, jobs: int, keep_going: bool
+) -> None:
+    """Run entities and their dependencies to completion, as one-shot tasks."""
+    import anyio
+    from rich.console import Console
+    from mun.tasks import TaskRunner
+
+    obj: ClickContext = ctx.obj
+    runner = TaskRunner(
+        registry=obj.registry,
+        ctx=obj.context,
+        jobs=max(1, jobs),
+        keep_going=keep_going,
+    )
+    anyio.run(runner.run, names)
+    Console().print(_tasks_table(runner.results))
+    if runner.failed:
+        ctx.exit(1)
+
+
+@cli.command()
+@click.argument("names", nargs=-1, required=True)
+@click.option(
+    "--critical-path",
+    is_flag=True,
+    default=False,
+    help="Only show the path deciding how long it all takes.",
+)
+@click.option(
+    "--tasks", is_flag=True, default=False, help="Plan `mun run` rather than `up`."
+)
+@click.pass_context
+def plan(
+    ctx: click.Context, names: tuple[str, ...], *, critical_path: bool, tasks: bool
+) -> None:
+    """Show the order entities would start in, from their recorded durations."""
+    from rich.console import Console
+    from mun.plan import Plan
+
+    obj: ClickContext = ctx.obj
+    plan = Plan.load(
+        obj.registry.dependency_graph(names),
+        cache_dir=obj.config.opts.cache_dir,
+        project_root=obj.config.project_root,
+        phase="run" if tasks else "ready",
+    )
+    Console().print(_plan_table(plan, critical_path=critical_path))
+
+
+def _spawn_daemon(obj: ClickContext) -> None:
+    import subprocess
+    import time
+    from mun import control
+
+    flags = [
+        *(["--verbose"] if obj.verbose else []),
+        *(["--quiet"] if obj.quiet else []),
+    ]
+    log = obj.socket_path.with_suffix(".log")
+    log.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    with log.open("ab") as fp:
+        subprocess.Popen(
+            [sys.executable, "-m", "mun", *flags, "daemon"],
+            stdin=subprocess.DEVNULL,
+            stdout=fp,
+            stderr=fp,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            control.request(obj.socket_path, "status")
+        except OSError:
+            time.sleep(0.05)
+        else:
+            click.echo(f"Daemon listening on {obj.socket_path}, logging to {log}")
+            return
+    raise click.ClickException(f"Daemon did not start, see {log}")
+
+
+def _echo_record(name: str, record: LogRecord) -> None:
+    click.echo(
+        f"{name} | ".encode() + record.line, err=record.stream == "stderr", nl=False
+    )
+
+
+def _output_states(states: dict[str, str]) -> None:
+    _output_two_col_table(items=iter(sorted(states.items())))
+
+
+def _stats_table(stats: dict[str, dict[str, Any]], *, sort: str) -> Table:
+    from rich.table import Table
+
+    table = Table(box=None, pad_edge=False)
+    table.add_column("component", style="bold")
+    for heading in STATS_COLUMNS.values():
+        table.add_column(heading, justify="right")
+    table.add_column("cpu trend", style="magenta")
+
+    rows = sorted(stats.items(), key=lambda item: item[0])
+    if sort != "name":
+        rows.sort(key=lambda item: item[1][sort], reverse=True)
+    for name, usage in rows:
+        table.add_row(
+            name,
+            str(usage["processes"]),
+            f"{usage['cpu']:.1f}",
+            _format_bytes(usage["rss"]),
+            str(usage["fds"]),
+            _format_bytes(usage["read"]),
+            _format_bytes(usage["write"]),
+            _sparkline(usage["cpu_history"][-20:]),
+        )
+    return table
+
+
+def _plan_table(plan: Plan, *, critical_path: bool) -> Table:
+    from rich.table import Table
+
+    table = Table(box=None, pad_edge=False)
+    table.add_column("entity", style="bold")
+    table.add_column("estimate", justify="right")
+    table.add_column("path", justify="right")
+
+    critical = plan.critical_path()
+    names = critical if critical_path else plan.order()
+    for name in names:
+        estimate = plan.estimates.get(name)
+        table.add_row(
+            name,
+            f"{estimate:.1f}s" if estimate is not None else "unknown",
+            f"{plan.paths[name]:.1f}s",
+            style="red" if name in critical and not critical_path else None,
+        )
+    return table
+
+
+def _tasks_table(results: dict[str, TaskResult]) -> Table:
+    from rich.table import Table
+
+    styles = {
+        "succeeded": "green",
+        "failed": "bold red",
+        "skipped": "yellow",
+        "cancelled": "yellow",
+    }
+    table = Table(box=None, pad_edge=False)
+    table.add_column("task", style="bold")
+    table.add_column("status")
+    table.add_column("duration", justify="right")
+    for result in results.values():
+        table.add_row(
+            result.name,
+            f"[{styles[result.status]}]{result.status}[/]",
+            f"{result.duration:.2f}s" if result.status != "skipped" else "",
+        )
+    return table
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def _sparkline(values: list[float]) -> str:
+    bars = "▁▂▃▄▅▆▇█"
+    top = max([100.0, *values])
+    return "".join(bars[min(len(bars) - 1, int(v / top * len(bars)))] for v in values)
+
+
 def _output_two_col_table(
     *,
     items: Iterator[tuple[str, str]],
     styles: tuple[str, str] = ("bold", "bold magenta"),
 ) -> None:
-    table = rich.table.Table(
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(
         box=None, show_header=False, show_footer=False, pad_edge=False, highlight=True
     )
     table.add_column(style=styles[0])
@@ -111,4 +656,4 @@ def _output_two_col_table(
     for a, b in items:
         table.add_row(a, b)
 
-    rich.console.Console().print(table)
+    Console().print(table)
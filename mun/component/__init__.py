@@ -3,4 +3,7 @@ from __future__ import annotations
 from mun.component.component import Component, Context
 from mun.component.exec import Exec
 
-__all__ = ["Component", "Context", "Exec"]
+# isort: split
+from mun.component.cached_exec import CachedExec  # wraps Exec
+
+__all__ = ["CachedExec", "Component", "Context", "Exec"]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import logging
+from functools import partial
+from pathlib import Path
+from typing import Annotated, Any
+import anyio
+from pydantic import ConfigDict, Field, conlist
+from mun import register
+from mun.cache import OutputStore
+from mun.component import Context
+from mun.component.exec import CommandArgs, Exec
+from mun.digest import digest_paths
+
+logger = logging.getLogger(__name__)
+
+
+class Args(CommandArgs):
+    model_config = ConfigDict(extra="forbid")
+
+    # files and directories, relative to `cwd`, whose contents decide what the
+    # command produces - along with the command and its environment
+    inputs: list[Path] = Field(default_factory=list)
+    # files and directories, relative to `cwd`, that the command produces
+    outputs: Annotated[list[Path], conlist(Path, min_length=1)]
+
+
+@register.component(with_defaults=True)
+class CachedExec:
+    """Execute a deterministic command once, restoring its outputs after.
+
+    Outputs are stored by the digest of the command's inputs, and restored
+    rather than produced again whenever the inputs match a stored run. The
+    command runs to completion while starting, so the components that come
+    after it start once its outputs are in place.
+    """
+
+    args: Args
+    cwd: Path
+    exec: Exec
+
+    def __init__(self, *, ctx: Context, **kwargs: Any) -> None:
+        self.args = Args(**kwargs)
+        self.cwd = (ctx.project_root / self.args.cwd).resolve()
+        self.exec = Exec(
+            ctx=ctx,
+            **self.args.model_dump(include=set(CommandArgs.model_fields)),
+        )
+
+    async def start(self, *, ctx: Context) -> None:
+        store = OutputStore(ctx.cache_dir) if ctx.cache_dir else None
+        if store is None:
+            await self._execute(ctx=ctx)
+            return
+
+        key = await anyio.to_thread.run_sync(self._key)
+        if await anyio.to_thread.run_sync(partial(store.restore, key, base=self.cwd)):
+            logger.info(f"Restored outputs of {self.args.args}, inputs unchanged")
+            return
+
+        await self._execute(ctx=ctx)
+        missing = [path for path in self.args.outputs if not (self.cwd / path).exists()]
+        if missing:
+            logger.warning(
+                f"{self.args.args} didn't produce {', '.join(map(str, missing))},"
+                " not caching its outputs"
+            )
+            return
+        await anyio.to_thread.run_sync(
+            partial(store.save, key, self.args.outputs, base=self.cwd)
+        )
+
+    async def stop(self, *, ctx: Context) -> None:
+        await self.exec.stop(ctx=ctx)
+
+    def _key(self) -> str:
+        return digest_paths(
+            [self.cwd / path for path in self.args.inputs],
+            root=self.cwd,
+            extra={
+                "args": self.args.args,
+                "env": self.args.env,
+                "outputs": self.args.outputs,
+            },
+        )
+
+    async def _execute(self, *, ctx: Context) -> None:
+        await self.exec.start(ctx=ctx)
+        await self.exec.run(ctx=ctx)
+        if status := self.exec.returncode:
+            raise RuntimeError(f"{self.args.args} exited with status {status}")
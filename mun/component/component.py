@@ -2,18 +2,28 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Protocol
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from mun.logs import LogStore
+    from mun.ports import PortAllocator
 
 
 @dataclass
 class Context:
     pwd: Path
     project_root: Path
+    name: str | None = None  # qualified name of the component being constructed
+    cache_dir: Path | None = None
+    log_store: LogStore | None = None  # where components keep their output
+    ports: PortAllocator | None = None  # substituted for `${port:NAME}` in args
+    roots: frozenset[Path] = frozenset()  # of the workspace, if not only project_root
 
 
 class Component(Protocol):
     def __init__(self, *, ctx: Context, **kwargs: Any) -> None: ...
     async def start(self, *, ctx: Context) -> None: ...
+    async def ready(self, *, ctx: Context) -> None: ...
     async def run(self, *, ctx: Context) -> None: ...
     async def stop(self, *, ctx: Context) -> None: ...
     async def reset(self, *, ctx: Context) -> None: ...
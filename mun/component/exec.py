@@ -1,24 +1,53 @@
 from __future__ import annotations
 
-import io
 import logging
+import os
+import signal
+import time
+from contextlib import suppress
 from functools import partial
 from pathlib import Path
-from typing import Annotated, Any
+from typing import Annotated, Any, Callable, Literal
 import anyio
-from pydantic import BaseModel, Field, conlist
+from pydantic import BaseModel, Field, conlist, model_validator
 from mun import register
-from mun.component import Context
+from mun.component import Context, limits
+from mun.component.limits import Limits
+from mun.component.readiness import AnyProbe, LogProbe
+from mun.component.restart import RestartPolicy, Restarts
+from mun.logs import LogStore
+from mun.output import FileSink, LogSink, OutputPipeline, Sink, console_sink
+from mun.spawn import find_executable, posix_spawn
 
 logger = logging.getLogger(__name__)
 
 
-class Args(BaseModel):
+class CommandArgs(BaseModel):
+    """What to run and where its output goes, for every component running one."""
+
     cwd: Path = Path()  # relative to project root
     args: Annotated[list[str], conlist(str, min_length=1)]
     env: dict[str, str] | None = None
-    stdout: Path = Field(default_factory=partial(Path, "/dev/stdout"))
-    stderr: Path = Field(default_factory=partial(Path, "/dev/stderr"))
+    stdout: Path | None = None  # also written here unaltered, besides the console
+    stderr: Path | None = None
+
+
+class Args(CommandArgs):
+    history: int = 1000  # lines of recent output kept in memory
+    ready: list[AnyProbe] = Field(default_factory=list)
+    restart: RestartPolicy = Field(default_factory=RestartPolicy)
+    stop_timeout: float = 10.0  # seconds between SIGTERM and SIGKILL when stopping
+    # how processes are started - posix_spawn is cheaper for a large parent, but
+    # output is carried over sockets rather than pipes
+    spawn: Literal["subprocess", "posix_spawn"] = "subprocess"
+    limits: Limits = Field(default_factory=Limits)
+
+    @model_validator(mode="after")
+    def _limits_need_subprocess(self) -> Args:
+        # a posix_spawned process runs at once, so could only be limited late
+        if self.spawn == "posix_spawn" and not self.limits.empty:
+            raise ValueError("limits can't be used with spawn = 'posix_spawn'")
+        return self
 
 
 @register.component(with_defaults=True)
@@ -27,30 +56,212 @@ class Exec:
 
     proc: anyio.abc.Process | None = None
     cwd: Path
+    project_root: Path
     args: Args
-    stdout: io.BufferedWriter
-    stderr: io.BufferedWriter
+    label: str
+    output: OutputPipeline
+    sinks: dict[str, list[Sink]]
+    log_store: LogStore | None
+    restarts: Restarts
+    _stopping: anyio.Event | None = None
+    _spawning: anyio.Lock  # held while a restart spawns, so stop can wait for it
 
     def __init__(self, *, ctx: Context, **kwargs: Any) -> None:
         self.args = Args(**kwargs)
 
+        self.project_root = ctx.project_root
         self.cwd = (ctx.project_root / self.args.cwd).resolve()
-        self.stdout = self.args.stdout.open("wb")
-        self.stderr = self.args.stderr.open("wb")
+        self.label = ctx.name or Path(self.args.args[0]).name
+        self.log_store = ctx.log_store if ctx.name else None
+        self.output = OutputPipeline(history=self.args.history)
+        self.output.observers = [probe.observe for probe in self._log_probes()]
+        self.sinks = {}
+        self.restarts = Restarts(self.args.restart)
+        self._spawning = anyio.Lock()
 
     async def start(self, *, ctx: Context) -> None:  # noqa: ARG002
-        self.proc = await anyio.open_process(
-            self.args.args,
-            stdout=self.stdout,
-            stderr=self.stderr,
-            cwd=self.cwd,
-            env=self.args.env,
-        )
+        self._stopping = anyio.Event()
+        self.sinks = self._open_sinks()
+        await self._spawn()
+
+    async def ready(self, *, ctx: Context) -> None:  # noqa: ARG002
+        async with anyio.create_task_group() as tg:
+            for probe in self.args.ready:
+                tg.start_soon(partial(probe.wait, cwd=self.cwd, exited=self._exited))
 
     async def run(self, *, ctx: Context) -> None:  # noqa: ARG002
-        assert self.proc
-        status = await self.proc.wait()
-        if status == 0:
-            logger.debug(f"{self.args.args} exited succesfully")
+        try:
+            while True:
+                status = await self._wait()
+                if self._stopped():
+                    logger.debug(f"{self.args.args} stopped")
+                    return
+                if status == 0:
+                    logger.debug(f"{self.args.args} exited succesfully")
+                else:
+                    logger.warning(f"{self.args.args} exited with status {status}")
+                if not await self._restart(status):
+                    return
+        finally:
+            if self.args.limits.cgroup_limited:
+                limits.CGROUPS.remove(self.label, project_root=self.project_root)
+            for sinks in self.sinks.values():
+                for sink in sinks:
+                    sink.close()
+
+    async def stop(self, *, ctx: Context) -> None:  # noqa: ARG002
+        if self._stopping:
+            self._stopping.set()
+        # a restart spawning now is waited for, so its process is stopped too
+        async with self._spawning:
+            if self.proc is None:
+                return
+            if not self._exited():
+                self._signal(signal.SIGTERM)
+                with anyio.move_on_after(self.args.stop_timeout):
+                    await self.proc.wait()
+                if self.proc.returncode is None:
+                    logger.warning(
+                        f"{self.args.args} still running {self.args.stop_timeout}s"
+                        " after SIGTERM, killing"
+                    )
+            # the process' own children may outlive it, even once it has exited
+            # itself, so the whole group is killed
+            self._signal(signal.SIGKILL)
+            await self.proc.wait()
+
+    @property
+    def pid(self) -> int | None:
+        return None if self._exited() or self.proc is None else self.proc.pid
+
+    @property
+    def returncode(self) -> int | None:
+        """The status of the latest process, once it has exited."""
+        return None if self.proc is None else self.proc.returncode
+
+    @property
+    def restart_count(self) -> int:
+        return self.restarts.count
+
+    async def _spawn(self) -> None:
+        for probe in self._log_probes():
+            probe.reset()
+        if self.args.spawn == "posix_spawn":
+            self.proc = await posix_spawn(
+                self.args.args,
+                cwd=self.cwd,
+                env=self.args.env,
+                start_new_session=True,  # own process group, so stop reaches children
+            )
         else:
-            logger.warning(f"{self.args.args} exited with status {status}")
+            self.proc = await _open_process(
+                self.args.args,
+                cwd=self.cwd,
+                env=self.args.env,
+                start_new_session=True,
+                before_exec=(
+                    None
+                    if self.args.limits.empty
+                    else partial(
+                        self.args.limits.apply,
+                        name=self.label,
+                        project_root=self.project_root,
+                    )
+                ),
+            )
+
+    async def _wait(self) -> int:
+        assert self.proc and self.proc.stdout and self.proc.stderr
+        async with anyio.create_task_group() as tg:
+            for stream, source in [
+                ("stdout", self.proc.stdout),
+                ("stderr", self.proc.stderr),
+            ]:
+                tg.start_soon(self.output.pump, stream, source, self.sinks[stream])
+        return await self.proc.wait()
+
+    async def _restart(self, status: int) -> bool:
+        """Restart the exited process if its policy says to, after backing off."""
+        if not self.args.restart.applies(status):
+            return False
+        delay = self.restarts.next_delay(time.monotonic())
+        if delay is None:
+            logger.error(
+                f"{self.args.args} restarted {self.args.restart.max_restarts} times"
+                f" within {self.args.restart.window}s, giving up"
+            )
+            return False
+
+        logger.info(f"Restarting {self.args.args} in {delay:.2f}s")
+        assert self._stopping
+        with anyio.move_on_after(delay):
+            await self._stopping.wait()
+        async with self._spawning:
+            if self._stopped():
+                return False
+            await self._spawn()
+        return True
+
+    def _signal(self, signum: signal.Signals) -> None:
+        assert self.proc
+        with suppress(ProcessLookupError):
+            os.killpg(self.proc.pid, signum)
+
+    def _stopped(self) -> bool:
+        return self._stopping is not None and self._stopping.is_set()
+
+    def _exited(self) -> bool:
+        return self.proc is None or self.proc.returncode is not None
+
+    def _log_probes(self) -> list[LogProbe]:
+        return [probe for probe in self.args.ready if isinstance(probe, LogProbe)]
+
+    def _open_sinks(self) -> dict[str, list[Sink]]:
+        sinks: dict[str, list[Sink]] = {}
+        writer = self.log_store.writer(self.label) if self.log_store else None
+        lock = anyio.Lock()
+        for stream in ("stdout", "stderr"):
+            path = self.args.stdout if stream == "stdout" else self.args.stderr
+            sinks[stream] = [
+                console_sink(stream, label=self.label),
+                *([FileSink(path)] if path else []),
+                *([LogSink(writer, stream=stream, lock=lock)] if writer else []),
+            ]
+        return sinks
+
+
+async def _open_process(
+    args: list[str],
+    *,
+    cwd: Path,
+    env: dict[str, str] | None,
+    start_new_session: bool,
+    before_exec: Callable[[int], None] | None = None,
+) -> anyio.abc.Process:
+    """Start `args`, calling `before_exec` with its pid before it runs, if given.
+
+    anyio can't run anything in the child before it execs, so the command is
+    held by a shell reading its stdin until `before_exec` has returned.
+    """
+    if before_exec is None:
+        return await anyio.open_process(
+            args, cwd=cwd, env=env, start_new_session=start_new_session
+        )
+
+    find_executable(args[0], cwd=cwd, env=env)
+    proc = await anyio.open_process(
+        ["/bin/sh", "-c", 'read -r _ && exec "$@"', "sh", *args],
+        cwd=cwd,
+        env=env,
+        start_new_session=start_new_session,
+    )
+    assert proc.stdin
+    try:
+        before_exec(proc.pid)
+        await proc.stdin.send(b"\n")
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            proc.kill()
+            await proc.aclose()
+        raise
+    return proc
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import ctypes
+import hashlib
+import logging
+import math
+import os
+import platform
+import resource
+from contextlib import suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Literal
+from pydantic import BaseModel, ByteSize, ConfigDict, Field, field_validator
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+CGROUP_CONTROLLERS = ("cpu", "memory")
+CPU_PERIOD_US = 100_000
+
+# ioprio_set(2) has no wrapper in libc or Python, so is called by number
+IOPRIO_SET_SYSCALLS = {"x86_64": 251, "aarch64": 30, "i686": 289, "armv7l": 314}
+IOPRIO_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+
+
+class Limits(BaseModel):
+    """Resources a process may use, so that it can't starve everything else.
+
+    CPU and memory limits are applied through a cgroup v2 sub-tree where mun
+    has been delegated one, and approximated with niceness and rlimits where
+    it hasn't. Limits are in place before the command runs, so they can't be
+    used with posix_spawn, which starts it straight away.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    # share of CPU time under contention relative to other processes, which
+    # default to 100, and the most CPUs' worth of time usable, such as 0.5
+    cpu_weight: int | None = Field(default=None, ge=1, le=10000)
+    cpu_quota: float | None = Field(default=None, gt=0)
+
+    # most memory usable, such as "512MiB"
+    memory_max: ByteSize | None = None
+
+    # scheduling niceness, and I/O scheduling class and priority within it
+    nice: int | None = Field(default=None, ge=-20, le=19)
+    io_class: Literal["realtime", "best-effort", "idle"] | None = None
+    io_priority: int = Field(default=4, ge=0, le=7)
+
+    # setrlimit(2) limits by resource, such as `nofile = 1024`, as one value
+    # for both the soft and hard limits or a pair of them
+    rlimits: dict[str, int | tuple[int, int]] = Field(default_factory=dict)
+
+    @field_validator("rlimits")
+    @classmethod
+    def _known_rlimits(
+        cls, rlimits: dict[str, int | tuple[int, int]]
+    ) -> dict[str, int | tuple[int, int]]:
+        for name in rlimits:
+            if not hasattr(resource, f"RLIMIT_{name.upper()}"):
+                raise ValueError(f"Unknown rlimit '{name}'")
+        return rlimits
+
+    @property
+    def empty(self) -> bool:
+        return self == Limits()
+
+    @property
+    def cgroup_limited(self) -> bool:
+        return any(
+            limit is not None
+            for limit in (self.cpu_weight, self.cpu_quota, self.memory_max)
+        )
+
+    def apply(
+        self,
+        pid: int,
+        *,
+        name: str,
+        project_root: Path,
+        cgroups: Cgroups | None = None,
+    ) -> None:
+        """Limit the process `pid`, in a cgroup named after its component."""
+        cgroups = cgroups or CGROUPS
+        nice = self.nice
+        rlimits = dict(self.rlimits)
+        if self.cgroup_limited and not cgroups.add(
+            name, pid, self, project_root=project_root
+        ):
+            # without a cgroup, CPU weight is approximated by niceness, as the
+            # kernel weighs each step of niceness by 1.25x, and memory by the
+            # address space limit
+            if nice is None and self.cpu_weight is not None:
+                nice = round(-math.log(self.cpu_weight / 100, 1.25))
+                nice = max(-20, min(19, nice))
+            if self.memory_max is not None:
+                rlimits.setdefault("as", int(self.memory_max))
+            if self.cpu_quota is not None:
+                logger.warning(f"Not limiting {name} to cpu_quota without cgroups")
+
+        if nice is not None:
+            _try(name, "nice", os.setpriority, os.PRIO_PROCESS, pid, nice)
+        if self.io_class is not None:
+            _try(name, "io_class", _ioprio_set, pid, self.io_class, self.io_priority)
+        for rlimit, value in rlimits.items():
+            limits = value if isinstance(value, tuple) else (value, value)
+            res = getattr(resource, f"RLIMIT_{rlimit.upper()}")
+            _try(name, rlimit, resource.prlimit, pid, res, limits)
+
+
+@dataclass
+class Cgroups:
+    """A cgroup v2 sub-tree delegated to mun, with a leaf for each component.
+
+    mun's own cgroup belongs to whatever started it, so is never changed. The
+    tree holding it is used only once prepared, as by a systemd unit with
+    `Delegate=yes` running mun in a cgroup of its own: owned by mun's user and
+    with the controllers already enabled. Leaves are named after the project
+    root too, as every project running from one tree shares it.
+    """
+
+    root: Path = CGROUP_ROOT
+    proc: Path = Path("/proc/self/cgroup")
+    _tree: Path | None = field(default=None, init=False)
+    _opened: bool = field(default=False, init=False)
+
+    def add(self, name: str, pid: int, limits: Limits, *, project_root: Path) -> bool:
+        """Move `pid` into a limited cgroup named `name`, if cgroups are usable."""
+        tree = self.tree()
+        if tree is None:
+            return False
+        leaf = tree / _leaf_name(name, project_root)
+        try:
+            leaf.mkdir(exist_ok=True)
+            if limits.cpu_weight is not None:
+                (leaf / "cpu.weight").write_text(str(limits.cpu_weight))
+            if limits.cpu_quota is not None:
+                quota = round(limits.cpu_quota * CPU_PERIOD_US)
+                (leaf / "cpu.max").write_text(f"{quota} {CPU_PERIOD_US}")
+            if limits.memory_max is not None:
+                (leaf / "memory.max").write_text(str(int(limits.memory_max)))
+            (leaf / "cgroup.procs").write_text(str(pid))
+        except OSError as e:
+            logger.warning(f"Could not limit {name} with a cgroup: {e}")
+            with suppress(OSError):
+                leaf.rmdir()
+            return False
+        return True
+
+    def remove(self, name: str, *, project_root: Path) -> None:
+        """Remove the cgroup named `name`, once its processes have exited."""
+        if self._tree:
+            try:
+                (self._tree / _leaf_name(name, project_root)).rmdir()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"Could not remove cgroup of {name}: {e}")
+
+    def tree(self) -> Path | None:
+        if not self._opened:
+            self._opened = True
+            try:
+                self._tree = self._open()
+            except OSError as e:
+                logger.info(f"Limiting without cgroups, which aren't usable: {e}")
+        return self._tree
+
+    def _open(self) -> Path | None:
+        own = next(
+            (
+                self.root / path.lstrip("/")
+                for line in self.proc.read_text().splitlines()
+                for hierarchy, _, path in [line.partition("::")]
+                if hierarchy == "0"
+            ),
+            None,
+        )
+        if own is None or not (own / "cgroup.controllers").exists():
+            logger.info("Limiting without cgroups, as cgroup v2 isn't mounted")
+            return None
+
+        tree = own.parent
+        enabled = (tree / "cgroup.subtree_control").read_text().split()
+        if (
+            own == self.root
+            or tree.stat().st_uid != os.geteuid()
+            or not any(name in enabled for name in CGROUP_CONTROLLERS)
+        ):
+            logger.info(
+                "Limiting without cgroups, as mun's cgroup isn't in a tree"
+                " delegated to it"
+            )
+            return None
+        return tree
+
+
+CGROUPS = Cgroups()
+
+
+def _leaf_name(name: str, project_root: Path) -> str:
+    digest = hashlib.sha256(str(project_root).encode()).hexdigest()[:16]
+    return f"mun-{digest}.{name.replace('/', '_')}"
+
+
+def _ioprio_set(pid: int, io_class: str, priority: int) -> None:
+    number = IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if number is None:
+        raise OSError(f"ioprio_set is unknown on {platform.machine()}")
+    libc = ctypes.CDLL(None, use_errno=True)
+    value = IOPRIO_CLASSES[io_class] << IOPRIO_CLASS_SHIFT | priority
+    if libc.syscall(number, IOPRIO_WHO_PROCESS, pid, value) < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def _try(name: str, limit: str, func: Callable[..., object], *args: object) -> None:
+    try:
+        func(*args)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not set {limit} of {name}: {e}")
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import logging
+import re
+import subprocess
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Literal, Union
+import anyio
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+class Probe(BaseModel, ABC):
+    """A condition that must hold before a component counts as ready."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    # seconds between checks, and until the probe is considered failed
+    interval: float = 0.1
+    timeout: float = 60.0
+
+    @abstractmethod
+    async def check(self, *, cwd: Path) -> bool: ...
+
+    async def wait(self, *, cwd: Path, exited: Callable[[], bool]) -> None:
+        """Poll until the probe succeeds, failing on timeout or once `exited`."""
+        try:
+            with anyio.fail_after(self.timeout):
+                while not await self.check(cwd=cwd):
+                    if exited():
+                        raise RuntimeError(f"Process exited before {self} was ready")
+                    await anyio.sleep(self.interval)
+        except TimeoutError as e:
+            raise TimeoutError(f"{self} not ready after {self.timeout}s") from e
+        logger.debug(f"{self} is ready")
+
+    def __str__(self) -> str:
+        return f"{type(self).__name__}({self._target()})"
+
+    @abstractmethod
+    def _target(self) -> str: ...
+
+
+class TcpProbe(Probe):
+    """Ready once a TCP connection to `host:port` is accepted."""
+
+    tcp: int | str
+
+    async def check(self, *, cwd: Path) -> bool:  # noqa: ARG002
+        host, _, port = str(self.tcp).rpartition(":")
+        try:
+            stream = await anyio.connect_tcp(host or "localhost", int(port))
+        except OSError:
+            return False
+        await stream.aclose()
+        return True
+
+    def _target(self) -> str:
+        return str(self.tcp)
+
+
+class UnixProbe(Probe):
+    """Ready once a unix socket exists at the path, relative to the working dir."""
+
+    unix: Path
+
+    async def check(self, *, cwd: Path) -> bool:
+        return (cwd / self.unix).is_socket()
+
+    def _target(self) -> str:
+        return str(self.unix)
+
+
+class FileProbe(Probe):
+    """Ready once a file exists at the path, relative to the working dir."""
+
+    file: Path
+
+    async def check(self, *, cwd: Path) -> bool:
+        return (cwd / self.file).exists()
+
+    def _target(self) -> str:
+        return str(self.file)
+
+
+class LogProbe(Probe):
+    """Ready once a line of output matches the regular expression."""
+
+    log: str
+    stream: Literal["stdout", "stderr"] = "stdout"
+    _matched: bool = PrivateAttr(default=False)
+
+    def reset(self) -> None:
+        self._matched = False
+
+    def observe(self, stream: str, line: bytes) -> None:
+        if stream == self.stream and re.search(self.log, line.decode(errors="replace")):
+            self._matched = True
+
+    async def check(self, *, cwd: Path) -> bool:  # noqa: ARG002
+        return self._matched
+
+    def _target(self) -> str:
+        return repr(self.log)
+
+
+class CommandProbe(Probe):
+    """Ready once the command exits successfully, run from the working dir."""
+
+    command: list[str]
+
+    async def check(self, *, cwd: Path) -> bool:
+        result = await anyio.run_process(
+            self.command,
+            cwd=cwd,
+            check=False,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return result.returncode == 0
+
+    def _target(self) -> str:
+        return " ".join(self.command)
+
+
+AnyProbe = Union[TcpProbe, UnixProbe, FileProbe, LogProbe, CommandProbe]
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Literal
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class RestartPolicy(BaseModel):
+    """When and how quickly to restart a process that has exited."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    policy: Literal["never", "on-failure", "always"] = "never"
+
+    # seconds to wait before the first restart, growing by `multiplier` for each
+    # further restart within `window`, up to `max_backoff`, and varied randomly
+    # by up to `jitter` as a fraction so restarted services don't synchronise
+    backoff: float = 0.5
+    multiplier: float = 2.0
+    max_backoff: float = 30.0
+    jitter: float = Field(default=0.2, ge=0, le=1)
+
+    # more than `max_restarts` within `window` seconds is a crash loop, and the
+    # process is left down rather than restarted again
+    max_restarts: int = 5
+    window: float = 60.0
+
+    def applies(self, status: int) -> bool:
+        match self.policy:
+            case "never":
+                return False
+            case "on-failure":
+                return status != 0
+            case "always":
+                return True
+
+
+@dataclass
+class Restarts:
+    """Restarts of a single process under a `RestartPolicy`."""
+
+    policy: RestartPolicy
+    count: int = 0
+    crash_looped: bool = False
+    recent: deque[float] = field(default_factory=deque)
+
+    def next_delay(self, now: float) -> float | None:
+        """Record a restart at `now`, returning how long to back off before it.
+
+        Returns `None` instead if the restart would exceed the crash loop limit.
+        """
+        while self.recent and now - self.recent[0] > self.policy.window:
+            self.recent.popleft()
+        if len(self.recent) >= self.policy.max_restarts:
+            self.crash_looped = True
+            return None
+
+        self.recent.append(now)
+        self.count += 1
+        exponent = len(self.recent) - 1
+        delay = min(
+            self.policy.max_backoff,
+            self.policy.backoff * self.policy.multiplier**exponent,
+        )
+        jitter = self.policy.jitter
+        return delay * random.uniform(1 - jitter, 1 + jitter)
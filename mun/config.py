@@ -2,18 +2,25 @@ from __future__ import annotations
 
 import glob
 import itertools
+import json
 import logging
 import os
+import re
 import sys
-from dataclasses import dataclass
+from contextlib import suppress
+from dataclasses import dataclass, field
 from functools import cached_property
 from pathlib import Path, PurePath
-from typing import Self
+from typing import Any, Self
 import tomllib
 from pydantic import BaseModel, Field
+from mun.cache import WorkspaceCache, default_cache_dir
+from mun.logs import default_log_dir
+from mun.trace import traced
 
 logger = logging.getLogger(__name__)
 ENV_CONFIG_PATH: str = "MUN_CONFIG"
+GLOB_MAGIC = re.compile("[*?[]")
 
 
 def default_config_search() -> Path | None:
@@ -43,10 +50,41 @@ class Opts(BaseModel):
         default_factory=lambda: [Path(".mun/entities")]
     )
 
+    # directory for caches that speed up repeated invocations, or none to disable
+    cache_dir: Path | None = Field(default_factory=default_cache_dir)
+
+    # threads used to scan entity directories - above one, directories are listed
+    # and entity files parsed concurrently, which helps on slow or network disks
+    scan_workers: int = 1
+
+    # seconds between samples of the daemon's processes' resource usage, shown by
+    # `mun stats`, or zero to disable sampling - and how many samples to keep
+    stats_interval: float = 2.0
+    stats_history: int = 150
+
+    # whether the daemon reloads entities as their files change, and how often
+    # to check for changes where the platform can't notify of them
+    watch: bool = True
+    watch_poll_interval: float = 1.0
+
+    # directory keeping the output of every component, read by `mun logs`, or
+    # none to disable - each component's log rotates once it reaches the given
+    # size, keeping that many compressed segments
+    log_dir: Path | None = Field(default_factory=default_log_dir)
+    log_segment_bytes: int = 16 * 1024 * 1024
+    log_segments: int = 8
+
+    # most entities coming up at once, those on the longest path of recorded
+    # startup durations first, or none for no limit - each holds its place
+    # until it's ready, not just while its processes are spawned
+    start_jobs: int | None = Field(default=None, ge=1)
+
 
 @dataclass
 class Config:
     opts: Opts
+    workspace_cache: WorkspaceCache | None = None
+    _witnesses: dict[str, int] = field(default_factory=dict, init=False, repr=False)
 
     @classmethod
     def find_or_default(cls: type[Self]) -> Self:
@@ -56,14 +94,19 @@ class Config:
                 logging.info(f"Using config file {path}")
                 overrides = tomllib.load(fp)
         opts = Opts(**overrides)
+        workspace_cache = WorkspaceCache(opts.cache_dir) if opts.cache_dir else None
 
-        return cls(opts=opts)
+        return cls(opts=opts, workspace_cache=workspace_cache)
 
     @cached_property
+    @traced("config.project_root")
     def project_root(self) -> Path:
+        if self._cached_workspace:
+            return Path(self._cached_workspace["project_root"])
+
         def has_indicator(pwd: Path) -> bool:
             return any(
-                (pwd / indicator).exists()
+                self._exists(pwd / indicator)
                 for indicator in self.opts.project_root_indicators
             )
 
@@ -82,7 +125,11 @@ class Config:
         sys.exit(1)
 
     @cached_property
+    @traced("config.sibling_roots")
     def sibling_roots(self) -> set[Path]:
+        if self._cached_workspace:
+            return {Path(path) for path in self._cached_workspace["sibling_roots"]}
+
         prospects: set[Path] = set()
         for pattern in self.opts.sibling_project_patterns:
             if PurePath(pattern).is_absolute():
@@ -94,7 +141,7 @@ class Config:
         return {
             path.resolve()
             for (path, indicator) in checks
-            if (path / indicator).exists()
+            if self._exists(path / indicator)
         }
 
     @cached_property
@@ -102,21 +149,73 @@ class Config:
         return {self.project_root, *self.sibling_roots}
 
     @cached_property
+    @traced("config.entity_dirs")
     def entity_dirs(self) -> set[Path]:
+        if self._cached_workspace:
+            return {Path(path) for path in self._cached_workspace["entity_dirs"]}
+
         checks = itertools.product(self.roots, self.opts.entity_dir_patterns)
-        return {
+        entity_dirs = {
             (root / pattern).resolve()
             for (root, pattern) in checks
-            if (root / pattern).is_dir()
+            if self._exists(root / pattern, is_dir=True)
         }
 
+        if self.workspace_cache:
+            workspace = {
+                "project_root": str(self.project_root),
+                "sibling_roots": sorted(str(path) for path in self.sibling_roots),
+                "entity_dirs": sorted(str(path) for path in entity_dirs),
+            }
+            self.workspace_cache.save(self._workspace_key, workspace, self._witnesses)
+        return entity_dirs
+
+    @cached_property
+    def _workspace_key(self) -> str:
+        return json.dumps(
+            {"cwd": str(Path().resolve()), "opts": self.opts.model_dump(mode="json")},
+            sort_keys=True,
+        )
+
+    @cached_property
+    def _cached_workspace(self) -> dict[str, Any] | None:
+        if self.workspace_cache is None:
+            return None
+        return self.workspace_cache.load(self._workspace_key)
+
+    def _exists(self, path: Path, *, is_dir: bool = False) -> bool:
+        """Check for `path`, witnessing the directory whose listing decides it."""
+        self._witness(path.parent)
+        return path.is_dir() if is_dir else path.exists()
+
+    def _witness(self, path: Path) -> None:
+        # the deepest existing ancestor is the one whose mtime changes when
+        # anything below it that we looked for is created or removed
+        for dir in (path, *path.parents):
+            with suppress(OSError):
+                self._witnesses[str(dir)] = dir.stat().st_mtime_ns
+                return
+
+    def _witness_glob(self, pattern: Path, matches: set[Path]) -> None:
+        static = itertools.takewhile(
+            lambda part: not GLOB_MAGIC.search(part), pattern.parts
+        )
+        base = Path(*static)
+        self._witness(base)
+        for match in matches:
+            self._witness(match.parent)
+
     def _absolute_sibling_pattern_expansions(self, pattern: str) -> set[Path]:
         globbed = (Path(p).resolve() for p in glob.glob(pattern))  # noqa: PTH207
-        return {path for path in globbed if path != self.project_root}
+        expansions = {path for path in globbed if path != self.project_root}
+        self._witness_glob(Path(pattern), expansions)
+        return expansions
 
     def _relative_sibling_pattern_expansions(self, pattern: str) -> set[Path]:
-        return {
+        expansions = {
             path
             for path in self.project_root.glob(pattern)
             if path.resolve() != self.project_root
         }
+        self._witness_glob(self.project_root / pattern, expansions)
+        return expansions
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any
+from mun.cache import default_cache_dir
+
+# the client side of the daemon's control socket - kept to the standard library
+# so that commands talking to a running daemon start as quickly as possible
+
+MAX_MESSAGE_BYTES: int = 16 * 1024 * 1024
+
+
+def runtime_dir() -> Path:
+    if base := os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(base) / "mun"
+    return default_cache_dir() / "run"
+
+
+def socket_path(project_root: Path) -> Path:
+    digest = hashlib.sha256(str(project_root).encode()).hexdigest()[:16]
+    return runtime_dir() / f"{digest}.sock"
+
+
+def encode(message: dict[str, Any]) -> bytes:
+    return json.dumps(message).encode() + b"\n"
+
+
+def request(path: Path, command: str, **args: Any) -> Any:
+    """Send a command to the daemon listening on `path` and return its result.
+
+    Raises `OSError` if no daemon is listening, and `RuntimeError` with the
+    daemon's description of the problem if the command failed.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(path))
+        sock.sendall(encode({"command": command, **args}))
+        with sock.makefile("rb") as fp:
+            line = fp.readline(MAX_MESSAGE_BYTES)
+
+    if not line:
+        raise ConnectionResetError(f"Daemon at {path} closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response.get("result")
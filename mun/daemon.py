@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import signal
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+import anyio
+from anyio.abc import ByteStream
+from anyio.streams.buffered import BufferedByteReceiveStream
+from mun import control
+from mun.runtime import Runtime
+from mun.shared import holder_alive
+from mun.util import describe_error
+from mun.watch import Watcher
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Daemon:
+    """Keep a runtime resident, controlled through a unix socket.
+
+    Requests and responses are single lines of JSON. A request names a
+    `command` and its arguments; a response holds either its `result` or an
+    `error` describing why it failed.
+
+    A `shared` daemon runs entities for other projects, each holding them
+    until released. It exits once it has had no holders for `idle_timeout`
+    seconds, counting those whose process has died as released.
+
+    A daemon started while another on the same socket is still stopping waits
+    for it to finish, so the two never run the same entities at once.
+    """
+
+    runtime: Runtime
+    path: Path
+    watcher: Watcher | None = None  # of entity files, to reload as they change
+    shared: bool = False
+    holders: set[str] = field(default_factory=set)  # from `shared.holder_id`
+    idle_timeout: float = 10.0
+    _scope: anyio.CancelScope | None = field(default=None, init=False, repr=False)
+
+    async def serve(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        # held until the runtime has stopped, released by closing
+        with self.path.with_suffix(".serve.lock").open("w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # a daemon still listening is an error, one stopping is waited for
+                await anyio.to_thread.run_sync(self._claim_socket)
+                logger.info(f"Waiting for the daemon on {self.path} to stop")
+                await anyio.to_thread.run_sync(
+                    fcntl.flock, lock, fcntl.LOCK_EX, abandon_on_cancel=True
+                )
+            await self._serve()
+
+    async def _serve(self) -> None:
+        await anyio.to_thread.run_sync(self._claim_socket)
+        listener = await anyio.create_unix_listener(self.path)
+        inode = self.path.stat().st_ino
+        logger.info(f"Listening on {self.path}")
+        try:
+            async with self.runtime:
+                try:
+                    async with listener, anyio.create_task_group() as tg:
+                        self._scope = tg.cancel_scope
+                        tg.start_soon(self._handle_signals)
+                        if self.watcher:
+                            tg.start_soon(self._reload_on_change, self.watcher)
+                        if self.shared:
+                            tg.start_soon(self._expire_holders)
+                        await listener.serve(self._handle, task_group=tg)
+                finally:
+                    # gone before the entities stop, so projects start a new
+                    # daemon rather than finding this one refusing connections
+                    self._release_socket(inode)
+        finally:
+            self._release_socket(inode)
+            if self.watcher:
+                self.watcher.close()
+
+    def shutdown(self) -> None:
+        if self._scope:
+            self._scope.cancel()
+
+    async def dispatch(self, request: dict[str, Any]) -> Any:
+        runtime = self.runtime
+        match request.get("command"):
+            case "start":
+                await runtime.start(request["names"])
+                return runtime.states
+            case "stop":
+                await runtime.stop(request.get("names"))
+                return runtime.states
+            case "reset":
+                await runtime.reset(request.get("names"))
+                return runtime.states
+            case "acquire" | "release":
+                return await self._hold(request)
+            case "shutdown":
+                return None  # shut down once the response has been sent
+            case command:
+                return self._query(command)
+
+    def _query(self, command: str | None) -> Any:
+        """Answer a command that only reads the state of the runtime."""
+        runtime = self.runtime
+        match command:
+            case "list":
+                return [
+                    {"name": name, "path": str(path)}
+                    for name, path in runtime.registry.entities.paths.items()
+                ]
+            case "status":
+                return runtime.states
+            case "restarts":
+                return runtime.restarts()
+            case "ports":
+                return runtime.ports()
+            case "stats":
+                return runtime.sampler.summary() if runtime.sampler else {}
+            case _:
+                raise ValueError(f"Unknown command '{command}'")
+
+    async def _hold(self, request: dict[str, Any]) -> Any:
+        """Acquire a shared entity for a holder, or release what it holds."""
+        holder = request["holder"]
+        if request["command"] == "release":
+            self.holders.discard(holder)
+            return None  # shut down once the last holder has gone
+
+        if holder.count(":") < 2:
+            raise ValueError(f"Invalid holder '{holder}'")
+        self.holders.add(holder)
+        try:
+            await self.runtime.start([request["name"]])
+        except BaseException:
+            self.holders.discard(holder)
+            raise
+        return {"states": self.runtime.states, "ports": self.runtime.ports()}
+
+    async def _handle(self, stream: ByteStream) -> None:
+        async with stream:
+            buffered = BufferedByteReceiveStream(stream)
+            request: dict[str, Any] = {}
+            try:
+                line = await buffered.receive_until(b"\n", control.MAX_MESSAGE_BYTES)
+                request = json.loads(line)
+                response = {"result": await self.dispatch(request)}
+            except Exception as e:
+                logger.debug("Request failed", exc_info=True)
+                response = {"error": describe_error(e)}
+            with suppress(anyio.BrokenResourceError):
+                await stream.send(control.encode(response))
+
+        if request.get("command") == "shutdown":
+            self.shutdown()
+        elif self.shared and request.get("command") == "release" and not self.holders:
+            logger.info("Shutting down, as the last holder has released")
+            self.shutdown()
+
+    async def _reload_on_change(self, watcher: Watcher) -> None:
+        while True:
+            paths = await watcher.changes()
+            try:
+                names = self.runtime.registry.reload(paths)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not reload entities: {describe_error(e)}")
+                continue
+            if not names:
+                continue
+
+            logger.info(f"Reloading changed entities: {', '.join(sorted(names))}")
+            try:
+                await self.runtime.restart(names)
+            except Exception:
+                logger.exception("Could not restart changed entities")
+
+    async def _expire_holders(self) -> None:
+        idle_since = time.monotonic()
+        while True:
+            await anyio.sleep(1)
+            for holder in list(self.holders):
+                if not holder_alive(holder):
+                    logger.info(f"Releasing for {holder}, which has exited")
+                    self.holders.discard(holder)
+            if self.holders:
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= self.idle_timeout:
+                logger.info("Shutting down, as nothing holds the shared entities")
+                self.shutdown()
+                return
+
+    async def _handle_signals(self) -> None:
+        with anyio.open_signal_receiver(signal.SIGTERM, signal.SIGINT) as signals:
+            async for signum in signals:
+                logger.info(f"Received {signal.Signals(signum).name}, shutting down")
+                self.shutdown()
+
+    def _claim_socket(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            control.request(self.path, "status")
+        except OSError:
+            # left behind by a daemon that didn't exit cleanly, or one stopping
+            self.path.unlink(missing_ok=True)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {self.path}")
+
+    def _release_socket(self, inode: int) -> None:
+        # only while it's still this daemon's, not a successor's
+        with suppress(FileNotFoundError):
+            if self.path.stat().st_ino == inode:
+                self.path.unlink()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+
+def file_digest(path: Path) -> str:
+    with path.open("rb") as fp:
+        return hashlib.file_digest(fp, "sha256").hexdigest()
+
+
+def expand_files(paths: Iterable[Path]) -> list[Path]:
+    """List the files below each of `paths`, in a stable order."""
+    files: set[Path] = set()
+    for path in paths:
+        if path.is_dir():
+            files.update(p for p in path.rglob("*") if p.is_file())
+        elif path.is_file():
+            files.add(path)
+    return sorted(files)
+
+
+def digest_paths(
+    paths: Iterable[Path],
+    *,
+    root: Path,
+    extra: Any = None,
+    max_workers: int | None = None,
+) -> str:
+    """Digest the names and contents of every file below `paths`.
+
+    Files are hashed concurrently, and `extra` - anything JSON serialisable,
+    such as the configuration that acts on the files - is mixed in so that it
+    changing also changes the digest.
+    """
+    paths = list(paths)
+    files = expand_files(paths)
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = list(executor.map(file_digest, files))
+
+    hasher = hashlib.sha256(json.dumps(extra, sort_keys=True, default=str).encode())
+    for path in paths:
+        # inputs that don't exist yet still count, so creating them is a change
+        hasher.update(f"{os.path.relpath(path, root)}:{path.exists()}\n".encode())
+    for file, digest in zip(files, digests, strict=True):
+        hasher.update(f"{os.path.relpath(file, root)}:{digest}\n".encode())
+    return hasher.hexdigest()
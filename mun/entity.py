@@ -1,10 +1,21 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import logging
+from dataclasses import dataclass, field
 from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING
 import anyio
+from mun import graph
+from mun.cache import DigestStore
 from mun.component import Component, Context
+from mun.digest import digest_paths
+from mun.trace import span
+
+if TYPE_CHECKING:
+    from mun.registry import ComponentSpec
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -12,20 +23,75 @@ class Entity:
     name: str
     path: Path
     components: list[Component]
+    specs: list[ComponentSpec] = field(default_factory=list)
+    # start components one at a time in order, rather than each once those it
+    # comes after have started
+    sequential: bool = False
 
     async def start(self, *, ctx: Context) -> None:
-        for component in self.components:
-            await component.start(ctx=ctx)
+        await graph.in_order(
+            self._ids, self._after, partial(self._phase, phase="start", ctx=ctx)
+        )
+
+    async def ready(self, *, ctx: Context) -> None:
+        async with anyio.create_task_group() as tg:
+            for id in self._ids:
+                tg.start_soon(partial(self._phase, id, "ready", ctx=ctx))
 
     async def run(self, *, ctx: Context) -> None:
         async with anyio.create_task_group() as tg:
-            for component in self.components:
-                tg.start_soon(partial(component.run, ctx=ctx))
+            for id in self._ids:
+                tg.start_soon(partial(self._phase, id, "run", ctx=ctx))
 
     async def stop(self, *, ctx: Context) -> None:
-        for component in reversed(self.components):
-            await component.stop(ctx=ctx)
+        await graph.in_order(
+            self._ids,
+            graph.dependents(self._after),
+            partial(self._phase, phase="stop", ctx=ctx),
+        )
 
     async def reset(self, *, ctx: Context) -> None:
-        for component in self.components:
-            await component.reset(ctx=ctx)
+        for i, id in enumerate(self._ids):
+            spec = self.specs[i] if self.specs else None
+            if spec is None or not spec.reset_inputs or ctx.cache_dir is None:
+                await self._phase(id, "reset", ctx=ctx)
+                continue
+
+            # skip resets whose inputs are unchanged since the last successful one
+            key = f"{ctx.project_root}:{self.path}#{id}"
+            digest = await anyio.to_thread.run_sync(
+                partial(
+                    digest_paths,
+                    [ctx.project_root / path for path in spec.reset_inputs],
+                    root=ctx.project_root,
+                    extra=spec.args,
+                )
+            )
+            store = DigestStore(ctx.cache_dir)
+            if await anyio.to_thread.run_sync(store.get, key) == digest:
+                logger.info(f"Skipping reset of {self.name}.{id}, unchanged")
+                continue
+
+            await self._phase(id, "reset", ctx=ctx)
+            await anyio.to_thread.run_sync(store.put, key, digest)
+
+    @property
+    def _ids(self) -> list[str]:
+        if self.specs:
+            return [spec.id for spec in self.specs]
+        return [str(i) for i in range(len(self.components))]
+
+    @property
+    def _after(self) -> dict[str, list[str]]:
+        ids = self._ids
+        if self.sequential:
+            return {id: ids[i - 1 : i] for i, id in enumerate(ids)}
+        if self.specs:
+            return {spec.id: spec.after for spec in self.specs}
+        return {id: [] for id in ids}
+
+    async def _phase(self, id: str, phase: str, *, ctx: Context) -> None:
+        """Run one lifecycle `phase` of the component `id`, traced."""
+        component = self.components[self._ids.index(id)]
+        with span(phase, track=f"{self.name}.{id}"):
+            await getattr(component, phase)(ctx=ctx)
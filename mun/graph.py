@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import Awaitable, Callable, Iterable, Mapping
+import anyio
+
+
+def dependency_closure(
+    names: Iterable[str], depends_on: Callable[[str], Iterable[str]]
+) -> dict[str, list[str]]:
+    """Collect the dependency graph reachable from `names`.
+
+    The returned mapping contains every node in the transitive closure
+    mapped to its direct dependencies.
+    """
+    graph: dict[str, list[str]] = {}
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in graph:
+            continue
+        graph[name] = list(depends_on(name))
+        pending.extend(dep for dep in graph[name] if dep not in graph)
+    return graph
+
+
+def topological_order(graph: Mapping[str, Iterable[str]]) -> list[str]:
+    """Order nodes so that every node comes after its dependencies.
+
+    Raises a `ValueError` describing the cycle if the graph is not a DAG.
+    """
+    order: list[str] = []
+    done: set[str] = set()
+    visiting: list[str] = []
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            cycle = [*visiting[visiting.index(name) :], name]
+            raise ValueError(f"Dependency cycle: {' -> '.join(cycle)}")
+        visiting.append(name)
+        for dep in graph.get(name, ()):
+            visit(dep)
+        visiting.pop()
+        done.add(name)
+        order.append(name)
+
+    for name in sorted(graph):
+        visit(name)
+    return order
+
+
+def dependents(graph: Mapping[str, Iterable[str]]) -> dict[str, set[str]]:
+    """Invert a dependency graph, mapping each node to its direct dependents."""
+    inverted: dict[str, set[str]] = {name: set() for name in graph}
+    for name, deps in graph.items():
+        for dep in deps:
+            inverted.setdefault(dep, set()).add(name)
+    return inverted
+
+
+async def in_order(
+    nodes: Iterable[str],
+    after: Mapping[str, Iterable[str]],
+    action: Callable[[str], Awaitable[None]],
+) -> None:
+    """Apply `action` concurrently to `nodes`, each once those before it are done.
+
+    `after` maps each node to those it comes after, like a dependency graph.
+    Only the `nodes` given are waited for, so ordering against anything else in
+    the graph is ignored.
+    """
+    done = {node: anyio.Event() for node in nodes}
+
+    async def apply(node: str) -> None:
+        for other in after.get(node, ()):
+            if other in done:
+                await done[other].wait()
+        try:
+            await action(node)
+        finally:
+            done[node].set()
+
+    async with anyio.create_task_group() as tg:
+        for node in done:
+            tg.start_soon(apply, node)
+
+
+def longest_paths(
+    graph: Mapping[str, Iterable[str]], cost: Callable[[str], float]
+) -> dict[str, float]:
+    """Find the costliest path from each node through those depending on it.
+
+    A node's path includes its own cost, so the nodes that should go first, to
+    finish everything soonest, are those with the costliest paths.
+    """
+    after = dependents(graph)
+    paths: dict[str, float] = {}
+    for name in reversed(topological_order(graph)):
+        paths[name] = cost(name) + max(
+            (paths[other] for other in after.get(name, ())), default=0.0
+        )
+    return paths
+
+
+def critical_path(
+    graph: Mapping[str, Iterable[str]], paths: Mapping[str, float]
+) -> list[str]:
+    """Follow the costliest path found by `longest_paths`, first node first."""
+    after = dependents(graph)
+    path: list[str] = []
+    candidates = sorted(paths)
+    while candidates:
+        path.append(max(candidates, key=lambda name: paths[name]))
+        candidates = sorted(after.get(path[-1], ()))
+    return path
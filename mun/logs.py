@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import bisect
+import gzip
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+# component output kept on disk in size-rotated segments. The active segment is
+# plain text; rotated ones are gzipped in independently compressed blocks, and
+# a sparse index of when each block starts lets readers seek straight to a
+# point in time. Kept to the standard library, like `control`, so that `mun
+# logs` starts quickly.
+
+ACTIVE = "current"
+INDEX_BYTES: int = 64 * 1024  # uncompressed bytes of output between index entries
+
+
+def default_log_dir() -> Path:
+    base = os.environ.get("XDG_STATE_HOME") or "~/.local/state"
+    return Path(base).expanduser() / "mun" / "logs"
+
+
+@dataclass(frozen=True)
+class Record:
+    time: float
+    stream: str
+    line: bytes  # including its trailing newline
+
+    def encode(self) -> bytes:
+        line = self.line if self.line.endswith(b"\n") else self.line + b"\n"
+        return f"{self.time:.6f} {self.stream} ".encode() + line
+
+    @classmethod
+    def decode(cls, data: bytes) -> Record:
+        timestamp, stream, line = data.split(b" ", 2)
+        return cls(time=float(timestamp), stream=stream.decode(), line=line)
+
+
+@dataclass(frozen=True)
+class LogStore:
+    """The logs of one project's components, a directory of segments for each."""
+
+    root: Path
+    segment_bytes: int = 16 * 1024 * 1024  # size at which the active segment rotates
+    segments: int = 8  # rotated segments kept for each component
+
+    @classmethod
+    def for_project(cls, base: Path, project_root: Path, **kwargs: int) -> LogStore:
+        digest = hashlib.sha256(str(project_root).encode()).hexdigest()[:16]
+        return cls(root=base / digest, **kwargs)
+
+    def names(self) -> list[str]:
+        """List the components with logs, by qualified name."""
+        try:
+            return sorted(
+                entry.name for entry in os.scandir(self.root) if entry.is_dir()
+            )
+        except FileNotFoundError:
+            return []
+
+    def writer(self, name: str) -> LogWriter:
+        return LogWriter(
+            self.root / name, segment_bytes=self.segment_bytes, segments=self.segments
+        )
+
+    def reader(self, name: str) -> LogReader:
+        return LogReader(self.root / name)
+
+
+class LogWriter:
+    """Append records to a component's active segment, rotating it once full."""
+
+    def __init__(
+        self,
+        dir: Path,
+        *,
+        segment_bytes: int,
+        segments: int,
+        index_bytes: int = INDEX_BYTES,
+    ) -> None:
+        self.dir = dir
+        self.segment_bytes = segment_bytes
+        self.segments = segments
+        self.index_bytes = index_bytes
+        self._fp: BinaryIO | None = None
+        self._index_fp: BinaryIO
+        self._size = 0  # of the active segment
+        self._indexed: int | None = None  # offset of the last index entry
+        self._open()
+
+    def write(self, stream: str, lines: Iterable[bytes]) -> None:
+        assert self._fp and self._index_fp, "writer is closed"
+        now = time.time()
+        for line in lines:
+            if self._indexed is None or self._size - self._indexed >= self.index_bytes:
+                self._index_fp.write(f"{now:.6f} {self._size}\n".encode())
+                self._indexed = self._size
+            data = Record(time=now, stream=stream, line=line).encode()
+            self._fp.write(data)
+            self._size += len(data)
+        self._fp.flush()
+        self._index_fp.flush()
+
+    @property
+    def full(self) -> bool:
+        return self._size >= self.segment_bytes
+
+    def rotate(self) -> None:
+        """Compress the active segment, dropping the oldest beyond `segments`."""
+        self.close()
+        rotated = _rotated(self.dir)
+        seq = int(rotated[-1].name.partition(".")[0]) + 1 if rotated else 1
+        _compress(self.dir / ACTIVE, self.dir / f"{seq:08d}")
+        (self.dir / f"{ACTIVE}.log").unlink()
+        (self.dir / f"{ACTIVE}.idx").unlink(missing_ok=True)
+        for stem in [*rotated, self.dir / f"{seq:08d}"][: -self.segments or None]:
+            stem.with_suffix(".idx").unlink(missing_ok=True)
+            stem.with_suffix(".log.gz").unlink(missing_ok=True)
+        self._open()
+
+    def close(self) -> None:
+        if self._fp:
+            self._fp.close()
+            self._index_fp.close()
+            self._fp = None
+
+    def _open(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        index = _read_index(self.dir / f"{ACTIVE}.idx")
+        self._fp = (self.dir / f"{ACTIVE}.log").open("ab")
+        self._index_fp = (self.dir / f"{ACTIVE}.idx").open("ab")
+        self._size = self._fp.tell()
+        self._indexed = index[-1][1] if index else None
+
+
+@dataclass
+class Segment:
+    path: Path
+    index: list[tuple[float, int]]  # of the time each block starts at, and where
+
+    @property
+    def compressed(self) -> bool:
+        return self.path.suffix == ".gz"
+
+    @property
+    def start(self) -> float:
+        return self.index[0][0]
+
+    def read(
+        self, *, since: float | None = None, end: tuple[int, int] | None = None
+    ) -> Iterator[Record]:
+        """Read records from the last block starting before `since`.
+
+        With `end`, an inode and offset, reading stops at that offset if this
+        segment is that file.
+        """
+        offset = 0
+        if since is not None:
+            times = [time for time, _ in self.index]
+            offset = self.index[max(0, bisect.bisect_left(times, since) - 1)][1]
+        with self.path.open("rb") as fp:
+            if end is not None and end[0] != os.fstat(fp.fileno()).st_ino:
+                end = None
+            fp.seek(offset)
+            lines = gzip.GzipFile(fileobj=fp) if self.compressed else fp
+            for line in lines:
+                offset += len(line)
+                if end is not None and offset > end[1]:
+                    return
+                if line.endswith(b"\n"):  # not one still being written
+                    yield Record.decode(line)
+
+
+@dataclass
+class LogReader:
+    dir: Path
+
+    def segments(self) -> list[Segment]:
+        """List the segments with records, oldest first."""
+        stems = [*_rotated(self.dir), self.dir / ACTIVE]
+        segments = [
+            Segment(
+                path=stem.with_suffix(".log" if stem.name == ACTIVE else ".log.gz"),
+                index=_read_index(stem.with_suffix(".idx")),
+            )
+            for stem in stems
+        ]
+        return [segment for segment in segments if segment.index]
+
+    def read(
+        self,
+        *,
+        since: float | None = None,
+        until: float | None = None,
+        tail: LogTail | None = None,
+    ) -> Iterator[Record]:
+        """Read the records written between `since` and `until`, in order.
+
+        Only the segments and blocks that can hold them are read. With `tail`,
+        reading stops where it started following, so no record is in both.
+        """
+        end = tail.start if tail else None
+        segments = self.segments()
+        for i, segment in enumerate(segments):
+            following = segments[i + 1] if i + 1 < len(segments) else None
+            if since is not None and following and following.start < since:
+                continue
+            if until is not None and segment.start > until:
+                return
+            try:
+                for record in segment.read(since=since, end=end):
+                    if until is not None and record.time > until:
+                        return
+                    if since is None or record.time >= since:
+                        yield record
+            except FileNotFoundError:
+                continue  # rotated away while listing
+
+    def tail(self) -> LogTail:
+        return LogTail(self.dir / f"{ACTIVE}.log")
+
+
+@dataclass
+class LogTail:
+    """Follow records appended to an active segment, across rotations."""
+
+    path: Path
+    _fp: BinaryIO | None = field(default=None, init=False)
+    _partial: bytes = field(default=b"", init=False)
+    # the inode and offset of the active segment it started following at
+    start: tuple[int, int] | None = field(default=None, init=False)
+
+    def __post_init__(self) -> None:
+        if self._reopen():
+            assert self._fp
+            offset = self._fp.seek(0, os.SEEK_END)
+            self.start = (os.fstat(self._fp.fileno()).st_ino, offset)
+
+    def poll(self) -> list[Record]:
+        """Read the records written since the last poll."""
+        if self._fp is None and not self._reopen():
+            return []
+        assert self._fp
+        data = self._partial + self._fp.read()
+        if self._rotated():
+            # the rest of the rotated segment was read above, so carry on from
+            # the start of the new one
+            self._reopen()
+            assert self._fp
+            data += self._fp.read()
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        return [Record.decode(line + b"\n") for line in lines]
+
+    def close(self) -> None:
+        if self._fp:
+            self._fp.close()
+            self._fp = None
+
+    def _reopen(self) -> bool:
+        self.close()
+        try:
+            self._fp = self.path.open("rb")
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _rotated(self) -> bool:
+        assert self._fp
+        try:
+            return self.path.stat().st_ino != os.fstat(self._fp.fileno()).st_ino
+        except FileNotFoundError:
+            return False  # mid-rotation, the new segment will turn up
+
+
+def _rotated(dir: Path) -> list[Path]:
+    """List the stems of rotated segments, oldest first."""
+    try:
+        names = [entry.name for entry in os.scandir(dir)]
+    except FileNotFoundError:
+        return []
+    return sorted(
+        dir / name.removesuffix(".log.gz") for name in names if name.endswith(".log.gz")
+    )
+
+
+def _read_index(path: Path) -> list[tuple[float, int]]:
+    try:
+        text = path.read_text()
+    except FileNotFoundError:
+        return []
+    entries = (line.split() for line in text.splitlines())
+    return [(float(time), int(offset)) for time, offset in entries]
+
+
+def _compress(active: Path, dest: Path) -> None:
+    """Gzip `active` into `dest`, a member per indexed block, indexing each."""
+    data = active.with_suffix(".log").read_bytes()
+    index = _read_index(active.with_suffix(".idx"))
+    ends = [offset for _, offset in index[1:]] + [len(data)]
+
+    log = dest.with_suffix(".log.gz")
+    tmp_log = log.with_name(f".{log.name}")
+    compressed_index = []
+    with tmp_log.open("wb") as fp:
+        for (time, start), end in zip(index, ends, strict=True):
+            compressed_index.append(f"{time:.6f} {fp.tell()}\n")
+            fp.write(gzip.compress(data[start:end], mtime=0))
+
+    idx = dest.with_suffix(".idx")
+    tmp_idx = idx.with_name(f".{idx.name}")
+    tmp_idx.write_text("".join(compressed_index))
+    tmp_log.replace(log)
+    tmp_idx.replace(idx)
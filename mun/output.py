@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Callable, Protocol
+import anyio
+from anyio.abc import ByteReceiveStream
+
+if TYPE_CHECKING:
+    from mun.logs import LogWriter
+
+# lines longer than this are split, so a process that never writes a newline
+# can't grow the pipeline's buffers without bound
+MAX_LINE_BYTES: int = 64 * 1024
+
+_console_lock = threading.Lock()
+
+
+class Sink(Protocol):
+    async def write(self, lines: list[bytes]) -> None: ...
+    def close(self) -> None: ...
+
+
+class ConsoleSink:
+    """Write lines to a console stream, each prefixed with its source.
+
+    Writes happen on a worker thread and hold a lock shared by every console
+    sink, so lines from different processes never interleave and a slow
+    terminal pushes back on the processes writing to it.
+    """
+
+    def __init__(self, *, stream: BinaryIO, prefix: str) -> None:
+        self.stream = stream
+        self.prefix = prefix.encode()
+
+    async def write(self, lines: list[bytes]) -> None:
+        data = b"".join(
+            self.prefix + (line if line.endswith(b"\n") else line + b"\n")
+            for line in lines
+        )
+        await anyio.to_thread.run_sync(self._write, data)
+
+    def close(self) -> None: ...
+
+    def _write(self, data: bytes) -> None:
+        with _console_lock:
+            self.stream.write(data)
+            self.stream.flush()
+
+
+class FileSink:
+    """Write output to a file unaltered, on a worker thread."""
+
+    def __init__(self, path: Path) -> None:
+        self.fp = path.open("wb")
+
+    async def write(self, lines: list[bytes]) -> None:
+        await anyio.to_thread.run_sync(self._write, b"".join(lines))
+
+    def close(self) -> None:
+        self.fp.close()
+
+    def _write(self, data: bytes) -> None:
+        self.fp.write(data)
+        self.fp.flush()
+
+
+class LogSink:
+    """Write lines to a component's log store, rotating it as it fills.
+
+    The sinks of a component's streams share its writer, and `lock` with it,
+    so neither writes while the other is rotating.
+    """
+
+    def __init__(self, writer: LogWriter, *, stream: str, lock: anyio.Lock) -> None:
+        self.writer = writer
+        self.stream = stream
+        self.lock = lock
+
+    async def write(self, lines: list[bytes]) -> None:
+        async with self.lock:
+            self.writer.write(self.stream, lines)
+            if self.writer.full:
+                await anyio.to_thread.run_sync(self.writer.rotate)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def console_sink(stream: str, *, label: str) -> ConsoleSink:
+    console = sys.stdout if stream == "stdout" else sys.stderr
+    return ConsoleSink(stream=console.buffer, prefix=f"{label} | ")
+
+
+class OutputPipeline:
+    """Split process output into lines and fan them out to sinks.
+
+    The most recent lines of every stream are kept in a fixed-size buffer,
+    and observers are called with each line as it arrives.
+    """
+
+    def __init__(self, *, history: int) -> None:
+        self.recent: deque[tuple[str, bytes]] = deque(maxlen=history)
+        self.observers: list[Callable[[str, bytes], None]] = []
+
+    async def pump(
+        self, stream: str, source: ByteReceiveStream, sinks: list[Sink]
+    ) -> None:
+        """Forward everything received from `source` until it is closed."""
+        partial = b""
+        async for chunk in source:
+            data = partial + chunk
+            end = data.rfind(b"\n") + 1
+            lines = (
+                [line + b"\n" for line in data[: end - 1].split(b"\n")] if end else []
+            )
+            partial = data[end:]
+            while len(partial) > MAX_LINE_BYTES:
+                lines.append(partial[:MAX_LINE_BYTES])
+                partial = partial[MAX_LINE_BYTES:]
+            await self._emit(stream, lines, sinks)
+
+        await self._emit(stream, [partial] if partial else [], sinks)
+
+    async def _emit(self, stream: str, lines: list[bytes], sinks: list[Sink]) -> None:
+        if not lines:
+            return
+        for line in lines:
+            self.recent.append((stream, line))
+            for observer in self.observers:
+                observer(stream, line)
+        for sink in sinks:
+            await sink.write(lines)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Literal, Mapping
+import anyio
+import anyio.lowlevel
+from mun import graph
+from mun.cache import DurationStore
+
+# seconds assumed for an entity that has never been timed, so that until it
+# has, longer chains of dependents still count for more
+DEFAULT_DURATION: float = 1.0
+
+# recorded from an entity starting until it's ready, or as a task, until done
+Phase = Literal["ready", "run"]
+
+
+def duration_key(project_root: Path, name: str, phase: Phase) -> str:
+    return f"{project_root}:{name}#{phase}"
+
+
+@dataclass
+class Plan:
+    """Estimated durations of a dependency graph, and what to start first.
+
+    Entities are prioritised by the estimated time from starting them until
+    everything depending on them is done, so that with limited concurrency
+    the critical path isn't left waiting behind quick entities off it.
+    """
+
+    graph: dict[str, list[str]]
+    estimates: dict[str, float]  # of entities timed before
+    paths: dict[str, float]  # estimated time from starting each to the end
+
+    @classmethod
+    def build(cls, deps: dict[str, list[str]], estimates: Mapping[str, float]) -> Plan:
+        known = {name: estimates[name] for name in deps if name in estimates}
+        paths = graph.longest_paths(
+            deps, lambda name: known.get(name, DEFAULT_DURATION)
+        )
+        return cls(graph=deps, estimates=known, paths=paths)
+
+    @classmethod
+    def load(
+        cls,
+        deps: dict[str, list[str]],
+        *,
+        cache_dir: Path | None,
+        project_root: Path,
+        phase: Phase,
+    ) -> Plan:
+        """Plan `deps` with the durations recorded in `cache_dir`, if any."""
+        recorded = DurationStore(cache_dir).estimates() if cache_dir else {}
+        estimates = {
+            name: recorded[key]
+            for name in deps
+            if (key := duration_key(project_root, name, phase)) in recorded
+        }
+        return cls.build(deps, estimates)
+
+    def order(self) -> list[str]:
+        """List every entity, those to start first first."""
+        return sorted(self.graph, key=lambda name: (-self.paths[name], name))
+
+    def critical_path(self) -> list[str]:
+        return graph.critical_path(self.graph, self.paths)
+
+
+class PriorityLimiter:
+    """Limit concurrency like `anyio.CapacityLimiter`, highest priority first.
+
+    Waiters arriving together are all queued before any is admitted, so the
+    order they happen to be scheduled in doesn't decide which goes first.
+    """
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self._borrowed = 0
+        self._waiting: list[tuple[float, int, anyio.Event]] = []
+        self._arrivals = itertools.count()
+
+    @asynccontextmanager
+    async def acquire(self, priority: float) -> AsyncIterator[None]:
+        waiter = (-priority, next(self._arrivals), anyio.Event())
+        heapq.heappush(self._waiting, waiter)
+        try:
+            await anyio.lowlevel.checkpoint()
+            self._admit()
+            await waiter[2].wait()
+        except BaseException:
+            if waiter[2].is_set():
+                self._release()  # admitted while being cancelled
+            else:
+                self._waiting.remove(waiter)
+                heapq.heapify(self._waiting)
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _admit(self) -> None:
+        while self._waiting and self._borrowed < self.total:
+            self._borrowed += 1
+            heapq.heappop(self._waiting)[2].set()
+
+    def _release(self) -> None:
+        self._borrowed -= 1
+        self._admit()
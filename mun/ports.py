@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import errno
+import fcntl
+import logging
+import os
+import re
+import socket
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# `${port:NAME}` names a port of the entity being instantiated, and
+# `${port:ENTITY.NAME}` one of another entity's, such as a dependency's
+PORT_PLACEHOLDER = re.compile(r"\$\{port:([\w.-]+)\}")
+
+
+@dataclass
+class PortAllocator:
+    """Free TCP ports reserved for the entities using them.
+
+    A port is reserved by holding an exclusive lock on a file named after it,
+    in a directory shared by every mun process of the user, which is removed
+    once released. Concurrent allocations, even from different workspaces,
+    never hand out the same port, and a process' reservations go with it
+    however it exits. Processes not using mun can still take a port between
+    allocation and use, though only one the kernel considered free.
+    """
+
+    dir: Path
+    host: str = "127.0.0.1"
+    attempts: int = 64
+    reserved: dict[tuple[str, str], int] = field(default_factory=dict)
+    _locks: dict[tuple[str, str], int] = field(default_factory=dict, repr=False)
+
+    def port(self, entity: str, name: str) -> int:
+        """Reserve a port named `name` for `entity`, or return the one it has."""
+        key = (entity, name)
+        if key in self.reserved:
+            return self.reserved[key]
+
+        self.dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+        for _ in range(self.attempts):
+            port = _free_port(self.host)
+            path = self.dir / f"{port}.lock"
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)  # reserved by another process, though not yet bound
+                continue
+            if not _still_linked(fd, path):
+                os.close(fd)  # released and removed since opening it
+                continue
+            self.reserved[key] = port
+            self._locks[key] = fd
+            logger.debug(f"Reserved port {port} for {entity} as '{name}'")
+            return port
+        raise OSError(
+            errno.EADDRINUSE, f"No free port for {entity} after {self.attempts} tries"
+        )
+
+    def adopt(self, entity: str, name: str, port: int) -> None:
+        """Use a port reserved by another process, such as a shared entity's."""
+        self.reserved[(entity, name)] = port
+
+    def release(self, entity: str) -> None:
+        """Give up the ports reserved for `entity`."""
+        for key in [key for key in self.reserved if key[0] == entity]:
+            port = self.reserved.pop(key)
+            if (fd := self._locks.pop(key, None)) is not None:
+                # removed while still locked, so that anyone who opened it
+                # before can tell it's gone once they lock it
+                (self.dir / f"{port}.lock").unlink(missing_ok=True)
+                os.close(fd)
+
+    def substitute(self, value: Any, *, entity: str) -> Any:
+        """Replace port placeholders in the strings within `value`."""
+
+        def port(match: re.Match[str]) -> str:
+            other, _, name = match[1].rpartition(".")
+            return str(self.port(other or entity, name))
+
+        return _map_strings(value, lambda string: PORT_PLACEHOLDER.sub(port, string))
+
+
+def _free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return int(sock.getsockname()[1])
+
+
+def _still_linked(fd: int, path: Path) -> bool:
+    try:
+        return path.stat().st_ino == os.fstat(fd).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _map_strings(value: Any, func: Callable[[str], str]) -> Any:
+    if isinstance(value, str):
+        return func(value)
+    if isinstance(value, dict):
+        return {key: _map_strings(item, func) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_map_strings(item, func) for item in value]
+    return value
@@ -13,6 +13,7 @@ COMPONENTS: dict[str, type[Component]] = {}
 class DefaultComponent:
     def __init__(self, *, ctx: Context, **kwargs: Any) -> None: ...
     async def start(self, *, ctx: Context) -> None: ...
+    async def ready(self, *, ctx: Context) -> None: ...
     async def run(self, *, ctx: Context) -> None: ...
     async def stop(self, *, ctx: Context) -> None: ...
     async def reset(self, *, ctx: Context) -> None: ...
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+import itertools
 import logging
-from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from functools import partial
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Self
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    MutableMapping,
+    Self,
+)
 import tomllib
 import mun.component  # noqa: F401 loaded for side-effect
+from mun import graph
 from mun.entity import Entity
 from mun.register import COMPONENTS
+from mun.shared import SharedEntity
+from mun.trace import span, traced
 
 if TYPE_CHECKING:
+    from mun.cache import DocCache, RegistryCache
     from mun.component import Component, Context
 
 logger = logging.getLogger(__name__)
@@ -20,6 +37,17 @@ class ComponentSpec:
     name: str
     cls: type[Component]
     args: dict[str, Any]
+    # paths, relative to the project root, whose contents decide whether a
+    # reset is needed - unchanged inputs since the last successful reset skip it
+    reset_inputs: list[str] = field(default_factory=list)
+    # identifies the component within its entity, defaulting to its name, or
+    # its name and position for a component in an array of tables
+    id: str = ""
+    # ids of components in the same entity that must start before this one
+    after: list[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.id = self.id or self.name
 
 
 @dataclass
@@ -27,88 +55,325 @@ class EntitySpec:
     name: str
     path: Path
     components: list[ComponentSpec]
-    depends_on: list[EntitySpec]
+    depends_on: list[str]
+    # components start concurrently, ordered only by their `after` lists, or
+    # one at a time in the order they're defined
+    order: Literal["concurrent", "sequential"] = "concurrent"
+    # run once for every project of the machine or workspace that depends on it,
+    # rather than by each of them
+    shared: Literal["machine", "workspace"] | None = None
+
+
+class EntityIndex(MutableMapping[str, EntitySpec]):
+    """Entity definitions by name, each parsed in full when first looked up.
+
+    The index itself only needs file names and any explicit `name` keys, so a
+    command working with a few entities doesn't pay to parse all of them.
+    Documents parsed on lookup are only written to their cache by `save`.
+    """
+
+    def __init__(self) -> None:
+        self.paths: dict[str, Path] = {}
+        self._docs: dict[Path, DocCache | None] = {}
+        self._specs: dict[str, EntitySpec] = {}
+        self._unsaved: dict[Path, DocCache] = {}  # by cache file
+
+    def add(self, name: str, path: Path, docs: DocCache | None = None) -> None:
+        """Index the entity `name` as defined at `path`, without parsing it."""
+        self.paths[name] = path
+        self._docs[path] = docs
+        self._specs.pop(name, None)
+
+    def copy(self) -> EntityIndex:
+        index = EntityIndex()
+        index.paths = dict(self.paths)
+        index._docs = dict(self._docs)
+        index._specs = dict(self._specs)
+        index._unsaved = dict(self._unsaved)
+        return index
+
+    def loaded(self, name: str) -> EntitySpec | None:
+        """The definition of `name`, if it has been parsed."""
+        return self._specs.get(name)
+
+    def __getitem__(self, name: str) -> EntitySpec:
+        if (spec := self._specs.get(name)) is None:
+            path = self.paths[name]
+            docs = self._docs.get(path)
+            _, spec = _entity_in_doc(doc=_load_doc(path, docs), path=path)
+            if docs is not None:
+                self._unsaved[docs.path] = docs
+            self._specs[name] = spec
+        return spec
+
+    def save(self) -> None:
+        """Persist the documents parsed by lookups since last saved."""
+        for docs in self._unsaved.values():
+            docs.save()
+        self._unsaved.clear()
+
+    def __setitem__(self, name: str, spec: EntitySpec) -> None:
+        self.paths[name] = spec.path
+        self._specs[name] = spec
+
+    def __delitem__(self, name: str) -> None:
+        del self.paths[name]
+        self._specs.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.paths
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
 
 
 @dataclass
 class Registry:
-    entities: dict[str, EntitySpec]
+    entities: EntityIndex
     components: dict[str, type[Component]] = field(default_factory=lambda: COMPONENTS)
+    # whether shared entities are left to their shared daemons, rather than run
+    # like any other - as they are by those daemons
+    share: bool = True
 
     @classmethod
-    def from_dirs(cls: type[Self], *, entity_dirs: set[Path]) -> Self:
-        entities: dict[str, EntitySpec] = {}
-        for dir in entity_dirs:
-            if not dir.exists():
-                logger.warn(f"Entity directory '{dir}' does not exist")
-                continue
+    @traced("registry.from_dirs")
+    def from_dirs(
+        cls: type[Self],
+        *,
+        entity_dirs: set[Path],
+        cache: RegistryCache | None = None,
+        max_workers: int = 1,
+    ) -> Self:
+        """Index every entity definition found in `entity_dirs`.
 
-            logger.debug(f"Searching '{dir}' for entities")
-            loaded_entities = _entities_in_dir(dir)
+        Definitions are only parsed in full as they are looked up. With a
+        `cache`, documents are only re-parsed when their file has changed. With
+        `max_workers` above one, directories are listed and entities named on a
+        thread pool. Entities are always merged in path order, so collisions
+        and errors are reported the same way in either mode.
+        """
+        dirs = [dir for dir in sorted(entity_dirs) if _entity_dir_exists(dir)]
+        with _mapper(max_workers) as map_:
+            listings = list(map_(partial(_entity_files, cache=cache), dirs))
+            paths = [path for paths, _ in listings for path in paths]
+            caches = [docs for paths, docs in listings for _ in paths]
+            names = list(map_(_entity_name, paths, caches))
 
-            for loaded_name, loaded_entity in loaded_entities.items():
-                if loaded_name in entities:
-                    _raise_entity_collision(entities[loaded_name], loaded_entity)
+        entities = EntityIndex()
+        for path, docs, name in zip(paths, caches, names, strict=True):
+            if name in entities:
+                _, loaded_entity = _entity_in_doc(doc=_load_doc(path, docs), path=path)
+                _raise_entity_collision(entities[name], loaded_entity)
+            entities.add(name, path, docs)
 
-            entities.update(loaded_entities)
+        for _, docs in listings:
+            if docs is not None:
+                docs.save()
 
         return cls(entities=entities)
 
+    def reload(self, paths: Iterable[Path]) -> set[str]:
+        """Re-read the entity files at `paths`, which may have been removed.
+
+        Returns the names of the entities added, removed or changed as a result.
+        Entities never looked up have nothing to compare against, so count as
+        changed.
+        """
+        # reloaded into a copy, so a file failing to parse leaves it as it was
+        entities = self.entities.copy()
+        changed: set[str] = set()
+        for path in paths:
+            loaded: EntitySpec | None = None
+            if path.exists():
+                with path.open("rb") as fp:
+                    name, loaded = _entity_in_doc(doc=tomllib.load(fp), path=path)
+                if entities.paths.get(name, path) != path:
+                    _raise_entity_collision(entities[name], loaded)
+
+            for name, other in list(entities.paths.items()):
+                if other == path and (loaded is None or loaded.name != name):
+                    del entities[name]
+                    changed.add(name)
+            if loaded and entities.loaded(loaded.name) != loaded:
+                entities[loaded.name] = loaded
+                changed.add(loaded.name)
+        self.entities = entities
+        return changed
+
+    def dependency_graph(self, names: Iterable[str]) -> dict[str, list[str]]:
+        """Resolve the `depends_on` closure of `names`, rejecting cycles.
+
+        Documents parsed to resolve it are then saved to the registry cache.
+        """
+
+        def depends_on(name: str) -> list[str]:
+            # a shared entity's dependencies are run by its shared daemon
+            if self._shared(name):
+                return []
+            return self._depends_on(name)
+
+        try:
+            deps = graph.dependency_closure(names, depends_on)
+        finally:
+            self.entities.save()
+        graph.topological_order(deps)
+        return deps
+
     def instantiate_entity(self, name: str, ctx: Context) -> Entity:
         entity_spec = self.entities[name]
-        return Entity(
-            name=entity_spec.name,
-            path=entity_spec.path,
-            components=[
-                spec.cls(ctx=ctx, **spec.args) for spec in entity_spec.components
-            ],
-        )
+        if self._shared(name):
+            assert entity_spec.shared
+            closure = graph.dependency_closure([name], self._depends_on)
+            return SharedEntity.attach(
+                entity_spec.name,
+                scope=entity_spec.shared,
+                definitions=[self.entities.paths[dep] for dep in closure],
+                ctx=ctx,
+            )
+        with span("registry.instantiate_entity", track=name):
+            return Entity(
+                name=entity_spec.name,
+                path=entity_spec.path,
+                specs=entity_spec.components,
+                components=[
+                    spec.cls(
+                        ctx=replace(ctx, name=f"{name}.{spec.id}"),
+                        **(
+                            ctx.ports.substitute(spec.args, entity=name)
+                            if ctx.ports
+                            else spec.args
+                        ),
+                    )
+                    for spec in entity_spec.components
+                ],
+                sequential=entity_spec.order == "sequential",
+            )
+
+    def _depends_on(self, name: str) -> list[str]:
+        if name not in self.entities:
+            raise KeyError(f"No entity named '{name}'")
+        return self.entities[name].depends_on
+
+    def _shared(self, name: str) -> bool:
+        return self.share and name in self.entities and bool(self.entities[name].shared)
+
+
+@contextmanager
+def _mapper(max_workers: int) -> Iterator[Callable[..., Iterator[Any]]]:
+    if max_workers <= 1:
+        yield map
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield executor.map
+
 
+def _entity_dir_exists(dir: Path) -> bool:
+    if not dir.exists():
+        logger.warn(f"Entity directory '{dir}' does not exist")
+        return False
+    return True
 
-def _entities_in_dir(dir: Path) -> dict[str, EntitySpec]:
-    entities: dict[str, EntitySpec] = {}
-    paths = (path for path in dir.iterdir() if path.name.endswith(".toml"))
-    for path in paths:
+
+def _entity_files(
+    dir: Path, *, cache: RegistryCache | None
+) -> tuple[list[Path], DocCache | None]:
+    logger.debug(f"Searching '{dir}' for entities")
+    paths = sorted(path for path in dir.iterdir() if path.name.endswith(".toml"))
+    return paths, cache.for_dir(dir) if cache else None
+
+
+def _load_doc(path: Path, docs: DocCache | None) -> dict[str, Any]:
+    if docs is None:
         with path.open("rb") as fp:
-            doc = tomllib.load(fp)
+            return tomllib.load(fp)
 
-        name, loaded_entity = _entity_in_doc(doc=doc, path=path)
-        if name in entities:
-            _raise_entity_collision(entities[name], loaded_entity)
+    stat = path.stat()
+    if (doc := docs.get(path, stat)) is None:
+        with path.open("rb") as fp:
+            doc = tomllib.load(fp)
+        docs.put(path, stat, doc)
+    return doc
 
-        entities[name] = loaded_entity
 
-    return entities
+def _entity_name(path: Path, docs: DocCache | None) -> str:
+    """Name the entity defined at `path`, parsing as little of it as possible."""
+    doc = docs.get(path, path.stat()) if docs is not None else None
+    if doc is None:
+        # top level keys, such as `name`, all come before the first table
+        text = path.read_text()
+        preamble = itertools.takewhile(
+            lambda line: not line.lstrip().startswith("["), text.splitlines()
+        )
+        try:
+            doc = tomllib.loads("\n".join(preamble))
+        except tomllib.TOMLDecodeError:
+            doc = tomllib.loads(text)  # e.g. a line of a multi-line array
+    return str(doc.get("name", path.name[0 : -(len(path.suffix))]))
 
 
 def _entity_in_doc(*, doc: dict[str, Any], path: Path) -> tuple[str, EntitySpec]:
     assert path.name.endswith(".toml")
     name = doc.get("name", path.name[0 : -(len(path.suffix))])
+    order = doc.get("order", "concurrent")
+    if order not in ("concurrent", "sequential"):
+        raise ValueError(f"Unknown component order '{order}' in {path}")
+    shared = doc.get("shared")
+    if shared not in (None, "machine", "workspace"):
+        raise ValueError(f"Unknown sharing scope '{shared}' in {path}")
     return (
         name,
         EntitySpec(
             name=name,
             path=path,
-            components=_components_in_doc(doc),
+            components=_components_in_doc(doc, path=path),
             depends_on=doc.get("depends_on", []),
+            order=order,
+            shared=shared,
         ),
     )
 
 
-def _components_in_doc(doc: dict[str, Any]) -> list[ComponentSpec]:
+def _components_in_doc(doc: dict[str, Any], *, path: Path) -> list[ComponentSpec]:
     components = []
-    for name, args in doc.items():
-        if not isinstance(args, dict):
+    for name, value in doc.items():
+        # a table per component, or an array of them for several of one kind
+        if isinstance(value, dict):
+            tables = [(str(name), value)]
+        elif (
+            value
+            and isinstance(value, list)
+            and all(isinstance(v, dict) for v in value)
+        ):
+            tables = [(f"{name}.{i}", table) for i, table in enumerate(value)]
+        else:
             continue
         if (cls := COMPONENTS.get(str(name))) is None:
             raise ValueError(f"No component defined for '{name}'")
-        components.append(
-            ComponentSpec(
-                name=name,
-                cls=cls,
-                args=args,
+        for default_id, table in tables:
+            args = dict(table)
+            components.append(
+                ComponentSpec(
+                    name=name,
+                    cls=cls,
+                    reset_inputs=args.pop("reset_inputs", []),
+                    id=args.pop("id", default_id),
+                    after=args.pop("after", []),
+                    args=args,
+                )
             )
-        )
+
+    ids = [component.id for component in components]
+    if duplicates := sorted({id for id in ids if ids.count(id) > 1}):
+        raise ValueError(f"Duplicate component ids {duplicates} in {path}")
+    for component in components:
+        if unknown := sorted(set(component.after) - set(ids)):
+            raise ValueError(
+                f"Component '{component.id}' in {path} is after unknown {unknown}"
+            )
+    graph.topological_order({component.id: component.after for component in components})
     return components
 
 
@@ -1,10 +1,287 @@
 from __future__ import annotations
 
 import logging
-from contextlib import suppress
-from dataclasses import dataclass
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import Awaitable, Callable, Iterable, Self
+import anyio
+from anyio.abc import TaskGroup
+from mun import graph
+from mun.cache import DurationStore
 from mun.component import Context
 from mun.entity import Entity
+from mun.plan import Plan, PriorityLimiter, duration_key
 from mun.registry import Registry
+from mun.stats import Sampler
 
 logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Runtime:
+    """Drive a set of entities through their lifecycle.
+
+    Entities are started as soon as everything they depend on is ready, so
+    independent parts of the dependency graph come up concurrently. Each
+    entity runs in the background from the moment it has started, until the
+    runtime is exited, which stops everything still running.
+
+    With `jobs`, at most that many entities are coming up at once, each from
+    starting until it's ready, those with the longest estimated path of
+    dependents still to start going first. How long each entity took to become
+    ready is recorded to estimate by, once each call to `start` is done.
+    """
+
+    registry: Registry
+    ctx: Context
+    entities: dict[str, Entity] = field(default_factory=dict)
+    graph: dict[str, list[str]] = field(default_factory=dict)
+    states: dict[str, str] = field(default_factory=dict)
+    sampler: Sampler | None = None
+    jobs: int | None = None  # most entities starting at once, or no limit
+    _limiter: PriorityLimiter | None = field(default=None, init=False, repr=False)
+    _tg: TaskGroup | None = field(default=None, init=False, repr=False)
+    _done: dict[str, anyio.Event] = field(default_factory=dict, init=False, repr=False)
+    # set once each entity being started is ready, or has failed to start, so
+    # overlapping calls to `start` wait for it rather than starting it again
+    _starting: dict[str, anyio.Event] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    # seconds each entity took to become ready, by duration key, to record
+    _durations: dict[str, float] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.jobs:
+            self._limiter = PriorityLimiter(self.jobs)
+
+    async def __aenter__(self) -> Self:
+        self._tg = anyio.create_task_group()
+        await self._tg.__aenter__()
+        if self.sampler:
+            self._tg.start_soon(self.sampler.run, self.pids)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> bool | None:
+        assert self._tg
+        with anyio.CancelScope(shield=True):
+            await self.stop()
+        self._tg.cancel_scope.cancel()
+        return await self._tg.__aexit__(exc_type, exc_val, exc_tb)
+
+    async def start(self, names: Iterable[str]) -> None:
+        """Start `names` and their dependencies, returning once all are ready."""
+        deps = self.registry.dependency_graph(names)
+        self.graph.update(deps)
+
+        started = {name: anyio.Event() for name in deps}
+        plan = self._plan(deps)
+        try:
+            async with anyio.create_task_group() as tg:
+                for name in plan.order():
+                    if name in self._starting:
+                        tg.start_soon(
+                            self._await_start, name, self._starting[name], started
+                        )
+                    elif name in self.entities:
+                        started[name].set()
+                    else:
+                        # claimed before yielding, so no other call can claim it
+                        self._starting[name] = anyio.Event()
+                        tg.start_soon(
+                            self._start_entity, name, started, plan.paths[name]
+                        )
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self._record_durations()
+
+    async def wait(self) -> None:
+        """Wait for every running entity to finish running."""
+        for done in list(self._done.values()):
+            await done.wait()
+
+    async def stop(self, names: Iterable[str] | None = None) -> None:
+        """Stop `names` and whatever running depends on them, or everything.
+
+        Each entity is stopped once everything depending on it has stopped, so
+        independent entities stop concurrently.
+        """
+
+        async def stop(name: str) -> None:
+            logger.debug(f"Stopping entity '{name}'")
+            await self.entities[name].stop(ctx=self.ctx)
+            del self.entities[name]
+            self.states.pop(name, None)
+            if self.ctx.ports:
+                self.ctx.ports.release(name)
+
+        await self._in_order(self._with_dependents(names), stop, reverse=True)
+
+    async def reset(self, names: Iterable[str] | None = None) -> None:
+        """Reset `names`, or every running entity, after their dependencies."""
+
+        async def reset(name: str) -> None:
+            logger.debug(f"Resetting entity '{name}'")
+            await self.entities[name].reset(ctx=self.ctx)
+
+        targets = set(self.entities if names is None else names)
+        await self._in_order(targets & self.entities.keys(), reset, reverse=False)
+
+    async def restart(self, names: Iterable[str]) -> None:
+        """Restart whichever of `names` are running, with their running dependents.
+
+        Entities are restarted from their current definitions in the registry,
+        and those no longer defined are only stopped.
+        """
+        targets = self._with_dependents(set(names) & self.entities.keys())
+        if not targets:
+            return
+        await self.stop(targets)
+        await self.start(name for name in targets if name in self.registry.entities)
+
+    async def up(self, names: Iterable[str]) -> None:
+        """Start `names` and their dependencies, run them, and stop on exit."""
+        async with self:
+            await self.start(names)
+            await self.wait()
+
+    def plan(self, names: Iterable[str]) -> Plan:
+        """Plan starting `names` and their dependencies from recorded durations."""
+        return self._plan(self.registry.dependency_graph(names))
+
+    def restarts(self) -> dict[str, int]:
+        """Count the restarts of each running component that restarts itself."""
+        return self._component_attrs("restart_count")
+
+    def ports(self) -> dict[str, int]:
+        """List the ports reserved for running entities, by entity and name."""
+        if self.ctx.ports is None:
+            return {}
+        return {
+            f"{entity}.{name}": port
+            for (entity, name), port in self.ctx.ports.reserved.items()
+        }
+
+    def pids(self) -> dict[str, int]:
+        """Find the process of each running component that has one."""
+        return self._component_attrs("pid")
+
+    def _plan(self, deps: dict[str, list[str]]) -> Plan:
+        return Plan.load(
+            deps,
+            cache_dir=self.ctx.cache_dir,
+            project_root=self.ctx.project_root,
+            phase="ready",
+        )
+
+    async def _start_entity(
+        self, name: str, started: dict[str, anyio.Event], priority: float
+    ) -> None:
+        assert self._tg, "runtime must be entered before starting entities"
+        try:
+            for dep in self.graph[name]:
+                await started[dep].wait()
+
+            async with AsyncExitStack() as stack:
+                if self._limiter:
+                    await stack.enter_async_context(self._limiter.acquire(priority))
+                logger.debug(f"Starting entity '{name}'")
+                self.states[name] = "starting"
+                begun = time.monotonic()
+                entity = self.registry.instantiate_entity(name, ctx=self.ctx)
+                await entity.start(ctx=self.ctx)
+                self.entities[name] = entity
+                self._done[name] = anyio.Event()
+                self._tg.start_soon(self._run_entity, name, entity)
+
+                await entity.ready(ctx=self.ctx)
+            logger.debug(f"Entity '{name}' is ready")
+            self.states[name] = "ready"
+        except BaseException:
+            self.states.pop(name, None)
+            with anyio.CancelScope(shield=True):
+                await self._discard(name)
+            raise
+        finally:
+            self._starting.pop(name).set()
+
+        key = duration_key(self.ctx.project_root, name, "ready")
+        self._durations[key] = time.monotonic() - begun
+        started[name].set()
+
+    async def _await_start(
+        self, name: str, starting: anyio.Event, started: dict[str, anyio.Event]
+    ) -> None:
+        """Wait for another call to `start` to bring up `name`."""
+        await starting.wait()
+        if name not in self.states:
+            raise RuntimeError(f"Entity '{name}' failed to start")
+        started[name].set()
+
+    async def _record_durations(self) -> None:
+        durations, self._durations = self._durations, {}
+        if durations and self.ctx.cache_dir:
+            store = DurationStore(self.ctx.cache_dir)
+            await anyio.to_thread.run_sync(store.record_all, durations)
+
+    async def _discard(self, name: str) -> None:
+        """Stop an entity that failed to start, if it got as far, and free its ports."""
+        if (entity := self.entities.pop(name, None)) is not None:
+            try:
+                await entity.stop(ctx=self.ctx)
+            except Exception:
+                logger.exception(f"Could not stop entity '{name}'")
+        if self.ctx.ports:
+            self.ctx.ports.release(name)
+
+    async def _run_entity(self, name: str, entity: Entity) -> None:
+        # caught rather than left to cancel the runtime, and with it every
+        # other entity - such as all of those a daemon holds
+        state = "exited"
+        try:
+            await entity.run(ctx=self.ctx)
+        except Exception:
+            logger.exception(f"Entity '{name}' failed while running")
+            state = "failed"
+        finally:
+            if self.entities.get(name) is entity:
+                self.states[name] = state
+            self._done[name].set()
+
+    def _component_attrs(self, attr: str) -> dict[str, int]:
+        return {
+            f"{name}.{spec.id}": value
+            for name, entity in self.entities.items()
+            for spec, component in zip(entity.specs, entity.components, strict=False)
+            if isinstance(value := getattr(component, attr, None), int)
+        }
+
+    def _with_dependents(self, names: Iterable[str] | None) -> set[str]:
+        if names is None:
+            return set(self.entities)
+        running = {name: self.graph.get(name, []) for name in self.entities}
+        dependents = graph.dependents(running)
+        closure = graph.dependency_closure(names, lambda name: dependents.get(name, ()))
+        return closure.keys() & self.entities.keys()
+
+    async def _in_order(
+        self,
+        names: set[str],
+        action: Callable[[str], Awaitable[None]],
+        *,
+        reverse: bool,
+    ) -> None:
+        """Apply `action` concurrently to `names`, following the dependency graph.
+
+        Each waits for those it depends on, or if `reverse` for those depending
+        on it, to be done first.
+        """
+        running = {name: self.graph.get(name, []) for name in self.entities}
+        after = graph.dependents(running) if reverse else running
+        await graph.in_order(names, after, action)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Literal
+from uuid import uuid4
+import anyio
+from mun import control
+from mun.component import Context
+from mun.entity import Entity
+
+logger = logging.getLogger(__name__)
+
+SPAWN_TIMEOUT: float = 10.0  # seconds for a shared daemon to start listening
+POLL_INTERVAL: float = 2.0  # seconds between checks that a shared entity is up
+
+Scope = Literal["machine", "workspace"]
+
+
+def shared_socket_path(path: Path, *, scope: Scope, roots: Iterable[Path] = ()) -> Path:
+    """Locate the socket of the daemon running the entity defined at `path`.
+
+    Every project of the machine sharing the definition finds the same daemon,
+    or with a `workspace` scope, every project of the same set of `roots`.
+    """
+    key = [scope, str(path)]
+    if scope == "workspace":
+        key += sorted(str(root) for root in roots)
+    digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()[:16]
+    return control.runtime_dir() / "shared" / f"{digest}.sock"
+
+
+def holder_id(pid: int) -> str:
+    """Identify a holder of shared entities running as the process `pid`.
+
+    Holders are "PID:START:ID", with the process' start time, so that a later
+    process reusing the PID isn't mistaken for the holder.
+    """
+    return f"{pid}:{_start_time(pid) or ''}:{uuid4().hex[:8]}"
+
+
+def holder_alive(holder: str) -> bool:
+    """Whether the process of `holder` is still running."""
+    pid, started, _ = holder.split(":", 2)
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # of another user, though still running
+    return not started or _start_time(int(pid)) == started
+
+
+def _start_time(pid: int) -> str | None:
+    """Read when `pid` started, in clock ticks since boot, where /proc has it."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # the command name, in parentheses, may itself hold spaces
+    return stat.rpartition(")")[2].split()[19]
+
+
+@dataclass
+class SharedEntity(Entity):
+    """An entity run by a daemon shared with other projects, held while running.
+
+    Starting acquires the entity from its daemon, spawning the daemon first if
+    none is listening, and stopping releases it. The daemon stops the entity,
+    and exits, once its last holder has released it or died.
+    """
+
+    components: list[Any] = field(default_factory=list)
+    socket: Path = Path()
+    definitions: list[Path] = field(default_factory=list)  # of it and its deps
+    holder: str = field(default_factory=lambda: holder_id(os.getpid()))
+    _adopted: set[str] = field(default_factory=set, init=False, repr=False)
+
+    @classmethod
+    def attach(
+        cls, name: str, *, scope: Scope, definitions: list[Path], ctx: Context
+    ) -> SharedEntity:
+        path = definitions[0]
+        return cls(
+            name=name,
+            path=path,
+            socket=shared_socket_path(
+                path, scope=scope, roots=ctx.roots or {ctx.project_root}
+            ),
+            definitions=definitions,
+        )
+
+    async def start(self, *, ctx: Context) -> None:
+        result = await anyio.to_thread.run_sync(self._acquire)
+        if ctx.ports:
+            # ports of the entity and its dependencies, for `${port:ENTITY.NAME}`
+            for key, port in result["ports"].items():
+                entity, _, name = key.rpartition(".")
+                ctx.ports.adopt(entity, name, port)
+                self._adopted.add(entity)
+
+    async def ready(self, *, ctx: Context) -> None:
+        pass  # acquiring returns once the entity is ready
+
+    async def run(self, *, ctx: Context) -> None:  # noqa: ARG002
+        while True:
+            await anyio.sleep(POLL_INTERVAL)
+            try:
+                states = await anyio.to_thread.run_sync(self._request, "status")
+            except (OSError, RuntimeError):
+                logger.warning(f"Shared daemon of {self.name} has gone away")
+                return
+            if states.get(self.name) != "ready":
+                logger.warning(f"Shared entity {self.name} is {states.get(self.name)}")
+                return
+
+    async def stop(self, *, ctx: Context) -> None:
+        try:
+            await anyio.to_thread.run_sync(
+                lambda: self._request("release", holder=self.holder)
+            )
+        except (OSError, RuntimeError) as e:
+            logger.debug(f"Could not release shared entity {self.name}: {e}")
+        if ctx.ports:
+            for entity in self._adopted:
+                ctx.ports.release(entity)
+
+    async def reset(self, *, ctx: Context) -> None:  # noqa: ARG002
+        await anyio.to_thread.run_sync(
+            lambda: self._request("reset", names=[self.name])
+        )
+
+    def _request(self, command: str, **args: Any) -> Any:
+        return control.request(self.socket, command, **args)
+
+    def _acquire(self) -> dict[str, Any]:
+        acquire = {"name": self.name, "holder": self.holder}
+        try:
+            return self._request("acquire", **acquire)  # type: ignore[no-any-return]
+        except OSError:
+            pass
+
+        # only one project spawns the daemon, the others waiting to connect
+        self.socket.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        with self.socket.with_suffix(".lock").open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                control.request(self.socket, "status")
+            except OSError:
+                self._spawn()
+        return self._request("acquire", **acquire)  # type: ignore[no-any-return]
+
+    def _spawn(self) -> None:
+        log = self.socket.with_suffix(".log")
+        logger.info(f"Starting shared daemon for {self.name}, logging to {log}")
+        with log.open("ab") as fp:
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "mun",
+                    "shared-daemon",
+                    "--socket",
+                    str(self.socket),
+                    *(str(path) for path in self.definitions),
+                ],
+                # from the definition's directory, so the daemon configures
+                # itself as the project the definition belongs to
+                cwd=self.path.parent,
+                stdin=subprocess.DEVNULL,
+                stdout=fp,
+                stderr=fp,
+                start_new_session=True,
+            )
+
+        deadline = time.monotonic() + SPAWN_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                control.request(self.socket, "status")
+            except OSError:
+                time.sleep(0.05)
+            else:
+                return
+        raise RuntimeError(f"Shared daemon of {self.name} did not start, see {log}")
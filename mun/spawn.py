@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import os
+import shlex
+import shutil
+import signal
+import socket
+from collections.abc import Mapping, Sequence
+from contextlib import suppress
+from pathlib import Path
+import anyio
+from anyio.abc import ByteReceiveStream, ByteSendStream, Process
+
+# spawning with posix_spawn rather than subprocess' fork and exec - glibc spawns
+# with vfork semantics, so the cost doesn't grow with the parent's memory, and
+# there's no pre-exec bookkeeping in Python
+
+MAX_REAP_INTERVAL: float = 0.05
+
+
+async def posix_spawn(
+    args: Sequence[str],
+    *,
+    cwd: Path,
+    env: Mapping[str, str] | None = None,
+    start_new_session: bool = False,
+) -> PosixSpawnProcess:
+    """Start `args` like `anyio.open_process`, with its output piped back.
+
+    The output is carried by unix sockets rather than pipes, which every event
+    loop can wait on. posix_spawn can't change directory, so processes started
+    elsewhere go through a shell to `cd` first.
+    """
+    executable = find_executable(args[0], cwd=cwd, env=env)
+    if cwd.resolve() != Path.cwd().resolve():
+        executable = "/bin/sh"
+        args = [
+            executable,
+            "-c",
+            f'cd {shlex.quote(str(cwd))} && exec "$@"',
+            "sh",
+            *args,
+        ]
+
+    stdout, child_stdout = socket.socketpair()
+    stderr, child_stderr = socket.socketpair()
+    try:
+        pid = os.posix_spawn(
+            executable,
+            list(args),
+            dict(os.environ if env is None else env),
+            file_actions=[
+                (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+                (os.POSIX_SPAWN_DUP2, child_stdout.fileno(), 1),
+                (os.POSIX_SPAWN_DUP2, child_stderr.fileno(), 2),
+            ],
+            setsid=start_new_session,
+        )
+    except BaseException:
+        stdout.close()
+        stderr.close()
+        raise
+    finally:
+        child_stdout.close()
+        child_stderr.close()
+
+    await anyio.lowlevel.checkpoint()
+    return PosixSpawnProcess(
+        pid=pid, stdout=SocketReceiveStream(stdout), stderr=SocketReceiveStream(stderr)
+    )
+
+
+def find_executable(
+    command: str, *, cwd: Path, env: Mapping[str, str] | None = None
+) -> str:
+    """Find the executable `command` names when run in `cwd`, as a shell would.
+
+    Commands with a slash are paths, relative to `cwd`; others are looked up on
+    the `PATH` of `env`.
+    """
+    if "/" in command:
+        executable = shutil.which(str(cwd / command))
+    else:
+        executable = shutil.which(command, path=(env or os.environ).get("PATH"))
+    if executable is None:
+        raise FileNotFoundError(f"No such executable '{command}'")
+    return executable
+
+
+class PosixSpawnProcess(Process):
+    """A child process, reaped once its pidfd is readable, or else by polling.
+
+    No loop can wait on a child portably, but on Linux 5.3 and later a pidfd
+    can be waited on like any other file descriptor.
+    """
+
+    def __init__(
+        self, *, pid: int, stdout: ByteReceiveStream, stderr: ByteReceiveStream
+    ) -> None:
+        self._pid = pid
+        self._stdout = stdout
+        self._stderr = stderr
+        self._returncode: int | None = None
+
+    async def wait(self) -> int:
+        if self._reap() is None and (pidfd := _pidfd_open(self._pid)) is not None:
+            try:
+                await anyio.wait_readable(pidfd)
+            finally:
+                os.close(pidfd)
+        interval = 0.001
+        while self._reap() is None:
+            await anyio.sleep(interval)
+            interval = min(interval * 2, MAX_REAP_INTERVAL)
+        assert self._returncode is not None
+        return self._returncode
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+    def send_signal(self, signal: signal.Signals) -> None:
+        if self._reap() is None:
+            os.kill(self._pid, signal)
+
+    async def aclose(self) -> None:
+        await self._stdout.aclose()
+        await self._stderr.aclose()
+        await self.wait()
+
+    @property
+    def pid(self) -> int:
+        return self._pid
+
+    @property
+    def returncode(self) -> int | None:
+        return self._reap()
+
+    @property
+    def stdin(self) -> ByteSendStream | None:
+        return None
+
+    @property
+    def stdout(self) -> ByteReceiveStream:
+        return self._stdout
+
+    @property
+    def stderr(self) -> ByteReceiveStream:
+        return self._stderr
+
+    def _reap(self) -> int | None:
+        if self._returncode is None:
+            with suppress(ChildProcessError):
+                pid, status = os.waitpid(self._pid, os.WNOHANG)
+                if pid:
+                    self._returncode = os.waitstatus_to_exitcode(status)
+        return self._returncode
+
+
+def _pidfd_open(pid: int) -> int | None:
+    # waiting on anything but a socket needs anyio 4.7
+    if not hasattr(os, "pidfd_open") or not hasattr(anyio, "wait_readable"):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None  # e.g. a kernel before 5.3
+
+
+class SocketReceiveStream(ByteReceiveStream):
+    def __init__(self, sock: socket.socket) -> None:
+        sock.setblocking(False)
+        self._sock = sock
+
+    async def receive(self, max_bytes: int = 65536) -> bytes:
+        await anyio.lowlevel.checkpoint()
+        while True:
+            try:
+                data = self._sock.recv(max_bytes)
+            except BlockingIOError:
+                await _wait_readable(self._sock)
+                continue
+            except OSError as e:
+                raise anyio.ClosedResourceError from e
+            if not data:
+                raise anyio.EndOfStream
+            return data
+
+    async def aclose(self) -> None:
+        self._sock.close()
+
+
+async def _wait_readable(sock: socket.socket) -> None:
+    # anyio 4.7 generalised waiting on sockets to any file descriptor, and
+    # deprecated the old function
+    if wait_readable := getattr(anyio, "wait_readable", None):
+        await wait_readable(sock)
+    else:
+        await anyio.wait_socket_readable(sock)
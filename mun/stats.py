@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import itertools
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping
+import anyio
+
+PROC = Path("/proc")
+CLOCK_TICKS: int = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE: int = os.sysconf("SC_PAGE_SIZE")
+
+
+@dataclass(frozen=True, slots=True)
+class Sample:
+    """Resource usage totalled over the processes of a session."""
+
+    time: float  # monotonic
+    processes: int
+    cpu_seconds: float
+    rss_bytes: int
+    fds: int
+    read_bytes: int
+    write_bytes: int
+
+
+def sample_sessions(sids: Iterable[int]) -> dict[int, Sample]:
+    """Sample the processes of each session in `sids`.
+
+    A session holds every process descended from its leader, except those that
+    started sessions of their own. Processes that can't be read, such as those
+    exiting, are skipped.
+    """
+    wanted = set(sids)
+    now = time.monotonic()
+    totals: dict[int, list[float]] = {}
+    for entry in os.scandir(PROC):
+        if not entry.name.isdigit():
+            continue
+        try:
+            # fields after the parenthesised command, which may itself contain
+            # spaces and parentheses, counted from the third
+            fields = (PROC / entry.name / "stat").read_text().rpartition(")")[2].split()
+            sid = int(fields[3])
+            if sid not in wanted:
+                continue
+            usage = _process_usage(int(entry.name), fields)
+        except (OSError, IndexError, ValueError):
+            continue
+        total = totals.setdefault(sid, [0] * len(usage))
+        for i, value in enumerate(usage):
+            total[i] += value
+
+    return {
+        sid: Sample(
+            time=now,
+            processes=int(processes),
+            cpu_seconds=cpu,
+            rss_bytes=int(rss),
+            fds=int(fds),
+            read_bytes=int(read),
+            write_bytes=int(write),
+        )
+        for sid, (processes, cpu, rss, fds, read, write) in totals.items()
+    }
+
+
+def _process_usage(pid: int, fields: list[str]) -> list[float]:
+    cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    rss = int(fields[21]) * PAGE_SIZE
+    try:
+        fds = sum(1 for _ in os.scandir(PROC / str(pid) / "fd"))
+    except PermissionError:
+        fds = 0
+    io = _read_io(pid)
+    return [1, cpu, rss, fds, io.get("read_bytes", 0), io.get("write_bytes", 0)]
+
+
+def _read_io(pid: int) -> dict[str, int]:
+    try:
+        text = (PROC / str(pid) / "io").read_text()
+    except PermissionError:
+        return {}
+    lines = (line.partition(": ") for line in text.splitlines())
+    return {key: int(value) for key, _, value in lines}
+
+
+@dataclass
+class Sampler:
+    """Periodically sample running processes, keeping a rolling history of each."""
+
+    interval: float = 2.0
+    history: int = 150
+    series: dict[str, deque[Sample]] = field(default_factory=dict)
+
+    def record(self, pids: Mapping[str, int]) -> None:
+        """Sample the session led by each of `pids`, keyed by name."""
+        self.update(pids, sample_sessions(pids.values()))
+
+    def update(self, pids: Mapping[str, int], samples: Mapping[int, Sample]) -> None:
+        """Add `samples` of the sessions led by `pids` to the history."""
+        for name in self.series.keys() - pids.keys():
+            del self.series[name]
+        for name, pid in pids.items():
+            if sample := samples.get(pid):
+                series = self.series.setdefault(name, deque(maxlen=self.history))
+                series.append(sample)
+
+    async def run(self, pids: Callable[[], Mapping[str, int]]) -> None:
+        while True:
+            # only the reading happens on a thread; the history is changed here,
+            # on the loop, so summary() never sees it mid-update
+            current = dict(pids())
+            samples = await anyio.to_thread.run_sync(sample_sessions, current.values())
+            self.update(current, samples)
+            await anyio.sleep(self.interval)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Describe the latest usage of each process and its recent CPU history."""
+        return {name: _summarise(series) for name, series in self.series.items()}
+
+
+def _summarise(series: deque[Sample]) -> dict[str, Any]:
+    latest = series[-1]
+    cpu = [_rate(a, b, "cpu_seconds") * 100 for a, b in itertools.pairwise(series)]
+    previous = series[-2] if len(series) > 1 else latest
+    return {
+        "processes": latest.processes,
+        "cpu": cpu[-1] if cpu else 0.0,
+        "rss": latest.rss_bytes,
+        "fds": latest.fds,
+        "read": _rate(previous, latest, "read_bytes"),
+        "write": _rate(previous, latest, "write_bytes"),
+        "cpu_history": cpu,
+    }
+
+
+def _rate(a: Sample, b: Sample, attr: str) -> float:
+    elapsed = b.time - a.time
+    if elapsed <= 0:
+        return 0.0
+    return max(0.0, float(getattr(b, attr) - getattr(a, attr)) / elapsed)
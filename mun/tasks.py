@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Iterable, Literal
+import anyio
+from mun import graph
+from mun.cache import DurationStore
+from mun.component import Context
+from mun.entity import Entity
+from mun.plan import Plan, PriorityLimiter, duration_key
+from mun.registry import Registry
+from mun.util import describe_error
+
+logger = logging.getLogger(__name__)
+
+TaskStatus = Literal["succeeded", "failed", "skipped", "cancelled"]
+
+
+@dataclass
+class TaskResult:
+    name: str
+    status: TaskStatus
+    duration: float = 0.0  # seconds from starting the entity until it finished
+    error: str | None = None
+
+
+@dataclass
+class TaskRunner:
+    """Run entities to completion as one-shot tasks, dependencies first.
+
+    Up to `jobs` entities run at once, each once those it depends on have
+    succeeded, those with the longest estimated path of dependents still to
+    run going first. After a failure, entities still running are cancelled and
+    nothing more is started - unless `keep_going`, in which case everything
+    not depending on the failure still runs. How long each task took to
+    succeed is recorded to estimate by.
+    """
+
+    registry: Registry
+    ctx: Context
+    jobs: int = 1
+    keep_going: bool = False
+    results: dict[str, TaskResult] = field(default_factory=dict)
+    _deps: dict[str, list[str]] = field(default_factory=dict, init=False, repr=False)
+    _scopes: dict[str, anyio.CancelScope] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    async def run(self, names: Iterable[str]) -> dict[str, TaskResult]:
+        """Run `names` and their dependencies, returning results in finishing order."""
+        self._deps = self.registry.dependency_graph(names)
+        plan = self.plan(self._deps)
+        limiter = PriorityLimiter(self.jobs)
+        try:
+            await graph.in_order(
+                plan.order(),
+                self._deps,
+                partial(self._run_task, limiter=limiter, paths=plan.paths),
+            )
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self._record_durations()
+        return self.results
+
+    def plan(self, deps: dict[str, list[str]]) -> Plan:
+        return Plan.load(
+            deps,
+            cache_dir=self.ctx.cache_dir,
+            project_root=self.ctx.project_root,
+            phase="run",
+        )
+
+    @property
+    def failed(self) -> bool:
+        return any(result.status == "failed" for result in self.results.values())
+
+    async def _run_task(
+        self, name: str, *, limiter: PriorityLimiter, paths: dict[str, float]
+    ) -> None:
+        async with limiter.acquire(paths[name]):
+            if self._skip(name):
+                logger.debug(f"Skipping task '{name}'")
+                self.results[name] = TaskResult(name=name, status="skipped")
+                return
+
+            logger.info(f"Running task '{name}'")
+            started = time.monotonic()
+            error = None
+            with anyio.CancelScope() as scope:
+                self._scopes[name] = scope
+                error = await self._run_entity(
+                    self.registry.instantiate_entity(name, ctx=self.ctx)
+                )
+            del self._scopes[name]
+
+        status: TaskStatus = "succeeded"
+        if scope.cancelled_caught:
+            status = "cancelled"
+        elif error:
+            status = "failed"
+            logger.error(f"Task '{name}' failed: {error}")
+            if not self.keep_going:
+                for other in self._scopes.values():
+                    other.cancel()
+        self.results[name] = TaskResult(
+            name=name,
+            status=status,
+            duration=time.monotonic() - started,
+            error=error,
+        )
+
+    async def _record_durations(self) -> None:
+        durations = {
+            duration_key(self.ctx.project_root, name, "run"): result.duration
+            for name, result in self.results.items()
+            if result.status == "succeeded"
+        }
+        if durations and self.ctx.cache_dir:
+            store = DurationStore(self.ctx.cache_dir)
+            await anyio.to_thread.run_sync(store.record_all, durations)
+
+    async def _run_entity(self, entity: Entity) -> str | None:
+        """Start and run `entity` until it exits, describing how it failed if so."""
+        try:
+            await entity.start(ctx=self.ctx)
+            await entity.run(ctx=self.ctx)
+        except Exception as e:
+            # a task failing is reported in its result, rather than raised
+            return describe_error(e, sep=", ")
+        finally:
+            with anyio.CancelScope(shield=True):
+                await entity.stop(ctx=self.ctx)
+
+        statuses = [
+            f"{spec.id} exited with status {returncode}"
+            for spec, component in zip(entity.specs, entity.components, strict=False)
+            if (returncode := getattr(component, "returncode", None))
+        ]
+        return ", ".join(statuses) or None
+
+    def _skip(self, name: str) -> bool:
+        if self.failed and not self.keep_going:
+            return True
+        return any(self.results[dep].status != "succeeded" for dep in self._deps[name])
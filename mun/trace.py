@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Iterator, ParamSpec, TypeVar
+
+# timing spans around mun's own work and the components it drives, exported in
+# the Chrome trace-event format understood by Perfetto and chrome://tracing
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+@dataclass
+class Tracer:
+    """Collect spans as trace events, doing nothing until enabled."""
+
+    enabled: bool = False
+    events: list[dict[str, Any]] = field(default_factory=list)
+    _origin: int = field(default_factory=time.perf_counter_ns)
+    _tracks: dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def complete(
+        self, name: str, start: int, end: int, track: str | None, args: dict[str, Any]
+    ) -> None:
+        """Record a span from `start` to `end`, in `time.perf_counter_ns` units."""
+        self.events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": self._track(track or threading.current_thread().name),
+                "args": args,
+            }
+        )
+
+    def write(self, path: Path) -> None:
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": track},
+            }
+            for track, tid in self._tracks.items()
+        ]
+        with path.open("w") as fp:
+            json.dump(
+                {"traceEvents": [*metadata, *self.events], "displayTimeUnit": "ms"},
+                fp,
+            )
+
+    def _track(self, name: str) -> int:
+        # spans running concurrently, such as those of different components,
+        # need tracks of their own for the viewer to draw them properly
+        with self._lock:
+            return self._tracks.setdefault(name, len(self._tracks) + 1)
+
+
+TRACER = Tracer()
+
+
+@contextmanager
+def span(name: str, *, track: str | None = None, **args: Any) -> Iterator[None]:
+    """Time the enclosed block, on `track` or the current thread's track."""
+    if not TRACER.enabled:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        TRACER.complete(name, start, time.perf_counter_ns(), track, args)
+
+
+def traced(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Time every call of the decorated function."""
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -9,3 +9,10 @@ def camel_case(s: str) -> str:
         r"\1_\2",
         re.sub("(.)([A-Z][a-z]+)", r"\1_\2", s),
     ).lower()
+
+
+def describe_error(e: BaseException, *, sep: str = "\n") -> str:
+    """Describe `e` for a user, one line per exception of a group."""
+    if isinstance(e, BaseExceptionGroup):
+        return sep.join(describe_error(inner, sep=sep) for inner in e.exceptions)
+    return str(e) or type(e).__name__
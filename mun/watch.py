@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import ctypes
+import logging
+import os
+import select
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Protocol
+import anyio
+from mun.cache import stat_key
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) events that mean an entity file's contents may have changed
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+# an editor saving a file may touch it several times in quick succession, so
+# changes are collected until this many seconds pass without another
+SETTLE_SECONDS = 0.05
+
+
+class Watcher(Protocol):
+    async def changes(self) -> set[Path]:
+        """Wait for entity files to change, returning those that did."""
+        ...
+
+    def close(self) -> None: ...
+
+
+def open_watcher(dirs: Iterable[Path], *, poll_interval: float) -> Watcher:
+    """Watch `dirs` with inotify, or by polling where it isn't available."""
+    dirs = [dir for dir in dirs if dir.is_dir()]
+    try:
+        return InotifyWatcher.open(dirs)
+    except (OSError, AttributeError) as e:
+        logger.info(f"Polling for entity changes, inotify is unavailable: {e}")
+    return PollWatcher(dirs, interval=poll_interval)
+
+
+@dataclass
+class InotifyWatcher:
+    fd: int
+    dirs: dict[int, Path]
+
+    @classmethod
+    def open(cls, dirs: Iterable[Path]) -> InotifyWatcher:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        watcher = cls(fd=fd, dirs={})
+        for dir in dirs:
+            wd = libc.inotify_add_watch(fd, os.fsencode(dir), IN_MASK)
+            if wd < 0:
+                watcher.close()
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed", dir)
+            watcher.dirs[wd] = dir
+        return watcher
+
+    async def changes(self) -> set[Path]:
+        changed: set[Path] = set()
+        while not changed:
+            # polled with a timeout, as a blocked thread can't be cancelled
+            changed = await anyio.to_thread.run_sync(self._read, 0.25)
+        while more := await anyio.to_thread.run_sync(self._read, SETTLE_SECONDS):
+            changed |= more
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def _read(self, timeout: float) -> set[Path]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if wd in self.dirs and name.endswith(b".toml"):
+                changed.add(self.dirs[wd] / os.fsdecode(name))
+        return changed
+
+
+@dataclass
+class PollWatcher:
+    dirs: list[Path]
+    interval: float = 1.0
+    _seen: dict[Path, list[int]] = field(default_factory=dict, init=False)
+
+    def __post_init__(self) -> None:
+        self._seen = self._snapshot()
+
+    async def changes(self) -> set[Path]:
+        while True:
+            await anyio.sleep(self.interval)
+            seen = await anyio.to_thread.run_sync(self._snapshot)
+            changed = {
+                path
+                for path in seen.keys() | self._seen.keys()
+                if seen.get(path) != self._seen.get(path)
+            }
+            self._seen = seen
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        pass
+
+    def _snapshot(self) -> dict[Path, list[int]]:
+        snapshot = {}
+        for dir in self.dirs:
+            try:
+                entries = list(os.scandir(dir))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.endswith(".toml"):
+                    try:
+                        snapshot[Path(entry.path)] = stat_key(entry.stat())
+                    except OSError:
+                        continue  # removed since listing
+        return snapshot
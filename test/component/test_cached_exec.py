@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import shutil
+import threading
+from dataclasses import replace
+from pathlib import Path
+import pytest
+from mun.cache import OutputStore
+from mun.component import CachedExec, Context
+
+
+@pytest.fixture
+def cached_ctx(ctx: Context, tmp_path: Path) -> Context:
+    return replace(ctx, cache_dir=tmp_path / "cache")
+
+
+def _build(ctx: Context, **kwargs: object) -> CachedExec:
+    # counts its runs, so tests can tell a restore from running again
+    script = (
+        "echo run >> runs; mkdir -p out/sub; cat src > out/sub/built; cp src single"
+    )
+    return CachedExec(
+        ctx=ctx,
+        args=["sh", "-c", script],
+        inputs=["src"],
+        outputs=["out", "single"],
+        **kwargs,
+    )
+
+
+@pytest.mark.anyio
+async def test_restores_outputs_of_unchanged_inputs(cached_ctx: Context) -> None:
+    root = cached_ctx.project_root
+    (root / "src").write_text("one")
+
+    await _build(cached_ctx).start(ctx=cached_ctx)
+    assert (root / "out/sub/built").read_text() == "one"
+
+    (root / "out/sub/built").write_text("stale")
+    (root / "out/extra").touch()
+    (root / "single").unlink()
+    await _build(cached_ctx).start(ctx=cached_ctx)
+    assert (root / "runs").read_text() == "run\n"
+    assert (root / "out/sub/built").read_text() == "one"
+    assert (root / "single").read_text() == "one"
+    assert not (root / "out/extra").exists()
+
+    (root / "src").write_text("two")
+    await _build(cached_ctx).start(ctx=cached_ctx)
+    assert (root / "runs").read_text() == "run\nrun\n"
+    assert (root / "out/sub/built").read_text() == "two"
+
+    # back to an earlier version of the inputs, whose outputs are still stored
+    (root / "src").write_text("one")
+    await _build(cached_ctx).start(ctx=cached_ctx)
+    assert (root / "runs").read_text() == "run\nrun\n"
+    assert (root / "out/sub/built").read_text() == "one"
+
+
+@pytest.mark.anyio
+async def test_shared_between_roots(cached_ctx: Context, tmp_path: Path) -> None:
+    sibling = tmp_path / "sibling"
+    sibling.mkdir()
+    sibling_ctx = replace(cached_ctx, project_root=sibling)
+    for root in (cached_ctx.project_root, sibling):
+        (root / "src").write_text("one")
+
+    await _build(cached_ctx).start(ctx=cached_ctx)
+    await _build(sibling_ctx).start(ctx=sibling_ctx)
+    assert not (sibling / "runs").exists()
+    assert (sibling / "out/sub/built").read_text() == "one"
+
+
+@pytest.mark.anyio
+async def test_command_change_runs_again(cached_ctx: Context) -> None:
+    root = cached_ctx.project_root
+    (root / "src").write_text("one")
+
+    await _build(cached_ctx).start(ctx=cached_ctx)
+    await _build(cached_ctx, env={"CHANGED": "1"}).start(ctx=cached_ctx)
+    assert (root / "runs").read_text() == "run\nrun\n"
+
+
+@pytest.mark.anyio
+async def test_failure_is_not_cached(cached_ctx: Context) -> None:
+    root = cached_ctx.project_root
+    args = ["sh", "-c", "echo run >> runs; touch out; exit 1"]
+
+    for _ in range(2):
+        exec = CachedExec(ctx=cached_ctx, args=args, outputs=["out"])
+        with pytest.raises(RuntimeError, match="status 1"):
+            await exec.start(ctx=cached_ctx)
+    assert (root / "runs").read_text() == "run\nrun\n"
+
+
+def test_concurrent_saves_of_one_output(tmp_path: Path, mocker) -> None:
+    store = OutputStore(tmp_path / "cache")
+    (tmp_path / "out").write_text("same")
+    # both threads copy the same new blob before either moves it into place
+    barrier = threading.Barrier(2, timeout=5)
+    copyfile = shutil.copyfile
+
+    def copy_together(src: Path, dst: Path) -> None:
+        barrier.wait()
+        copyfile(src, dst)
+        barrier.wait()
+
+    mocker.patch("mun.cache.shutil.copyfile", side_effect=copy_together)
+    errors: list[BaseException] = []
+
+    def save(key: str) -> None:
+        try:
+            store.save(key, [Path("out")], base=tmp_path)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(key,)) for key in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    mocker.stopall()
+    for key in "ab":
+        (tmp_path / "out").unlink()
+        assert store.restore(key, base=tmp_path)
+        assert (tmp_path / "out").read_text() == "same"
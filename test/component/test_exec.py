@@ -1,9 +1,16 @@
 from __future__ import annotations
 
 import logging
+import os
+import signal
+from dataclasses import replace
+from functools import partial
 from pathlib import Path
+from typing import Any
+import anyio
 import pytest
 from mun.component import Context
+from mun.component import exec as exec_module
 from mun.component.exec import Exec
 
 
@@ -48,3 +55,235 @@ async def test_reports_status(ctx: Context, caplog: pytest.LogCaptureFixture) ->
     caplog.clear()
     await exec.run(ctx=ctx)
     assert any(record.levelno > logging.INFO for record in caplog.records)
+
+
+@pytest.mark.anyio
+async def test_console_output_is_prefixed(
+    ctx: Context, capfd: pytest.CaptureFixture[str]
+) -> None:
+    exec = Exec(
+        ctx=replace(ctx, name="ent.exec"),
+        args=["bash", "-c", "echo out; echo err >&2"],
+    )
+
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    captured = capfd.readouterr()
+    assert captured.out == "ent.exec | out\n"
+    assert captured.err == "ent.exec | err\n"
+
+
+@pytest.mark.anyio
+async def test_output_goes_to_console_and_files(
+    ctx: Context, tmp_path: Path, capfd: pytest.CaptureFixture[str]
+) -> None:
+    exec = Exec(
+        ctx=replace(ctx, name="ent.exec"),
+        args=["bash", "-c", "echo out; echo err >&2"],
+        stdout=str(tmp_path / "out"),
+        stderr=str(tmp_path / "err"),
+    )
+
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    captured = capfd.readouterr()
+    assert captured.out == "ent.exec | out\n"
+    assert captured.err == "ent.exec | err\n"
+    assert (tmp_path / "out").read_text() == "out\n"
+    assert (tmp_path / "err").read_text() == "err\n"
+
+
+@pytest.mark.anyio
+async def test_restarts_until_crash_loop(
+    ctx: Context, caplog: pytest.LogCaptureFixture
+) -> None:
+    exec = Exec(
+        ctx=ctx,
+        args=["false"],
+        restart={"policy": "on-failure", "backoff": 0.01, "max_restarts": 2},
+    )
+
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+    assert exec.restart_count == 2
+    assert exec.restarts.crash_looped
+    assert any(record.levelno == logging.ERROR for record in caplog.records)
+
+
+@pytest.mark.anyio
+async def test_stop_interrupts_restart_backoff(ctx: Context) -> None:
+    exec = Exec(ctx=ctx, args=["true"], restart={"policy": "always", "backoff": 60})
+
+    await exec.start(ctx=ctx)
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(partial(exec.run, ctx=ctx))
+            while exec.restart_count == 0:
+                await anyio.sleep(0.01)
+            await exec.stop(ctx=ctx)
+    assert exec.restart_count == 1
+
+
+@pytest.mark.anyio
+async def test_stop_during_respawn_stops_new_process(
+    ctx: Context, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    respawning = anyio.Event()
+    open_process = exec_module._open_process
+
+    async def slow_open_process(*args: Any, **kwargs: Any) -> Any:
+        if exec.restart_count:
+            respawning.set()
+            await anyio.sleep(0.1)
+        return await open_process(*args, **kwargs)
+
+    monkeypatch.setattr(exec_module, "_open_process", slow_open_process)
+    exec = Exec(
+        ctx=ctx, args=["sleep", "30"], restart={"policy": "always", "backoff": 0}
+    )
+
+    await exec.start(ctx=ctx)
+    assert exec.proc
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(partial(exec.run, ctx=ctx))
+            os.killpg(exec.proc.pid, signal.SIGKILL)
+            await respawning.wait()
+            await exec.stop(ctx=ctx)
+            assert exec.proc.returncode is not None
+
+
+@pytest.mark.anyio
+async def test_stop_kills_after_timeout(ctx: Context) -> None:
+    exec = Exec(
+        ctx=ctx,
+        args=["bash", "-c", "trap '' TERM; echo trapped; sleep 30"],
+        ready=[{"log": "trapped"}],
+        stop_timeout=0.1,
+    )
+
+    await exec.start(ctx=ctx)
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(partial(exec.run, ctx=ctx))
+            await exec.ready(ctx=ctx)
+            await exec.stop(ctx=ctx)
+    assert exec.proc and exec.proc.returncode == -signal.SIGKILL
+
+
+@pytest.mark.anyio
+async def test_stop_kills_process_group(ctx: Context, tmp_path: Path) -> None:
+    pid_file = tmp_path / "pid"
+    exec = Exec(
+        ctx=ctx,
+        args=["bash", "-c", f"sleep 30 & echo $! > {pid_file}; wait"],
+        ready=[{"file": str(pid_file)}],
+    )
+
+    await exec.start(ctx=ctx)
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(partial(exec.run, ctx=ctx))
+            await exec.ready(ctx=ctx)
+            while not (pid := pid_file.read_text().strip()):
+                await anyio.sleep(0.01)
+            await exec.stop(ctx=ctx)
+
+        # the orphaned child is reaped by init, which may take a moment
+        while _is_running(int(pid)):
+            await anyio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_stop_kills_group_of_exited_process(ctx: Context, tmp_path: Path) -> None:
+    pid_file = tmp_path / "pid"
+    exec = Exec(ctx=ctx, args=["bash", "-c", f"sleep 30 & echo $! > {pid_file}"])
+
+    await exec.start(ctx=ctx)
+    assert exec.proc
+    with anyio.fail_after(5):
+        await exec.proc.wait()
+        pid = int(pid_file.read_text())
+        assert _is_running(pid)
+        await exec.stop(ctx=ctx)
+
+        while _is_running(pid):
+            await anyio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_posix_spawn(
+    ctx: Context, tmp_path: Path, capfd: pytest.CaptureFixture[str]
+) -> None:
+    exec = Exec(
+        ctx=replace(ctx, name="ent.exec"),
+        args=["bash", "-c", "echo $FOO; pwd >&2; exit 3"],
+        env={"FOO": "BAR", "PATH": os.environ["PATH"]},
+        cwd=str(tmp_path),
+        spawn="posix_spawn",
+    )
+
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    captured = capfd.readouterr()
+    assert captured.out == "ent.exec | BAR\n"
+    assert captured.err == f"ent.exec | {tmp_path}\n"
+    assert exec.proc and exec.proc.returncode == 3
+
+
+@pytest.mark.anyio
+async def test_posix_spawn_stop(ctx: Context) -> None:
+    exec = Exec(
+        ctx=ctx,
+        args=["bash", "-c", "trap '' TERM; echo trapped; sleep 30"],
+        ready=[{"log": "trapped"}],
+        stop_timeout=0.1,
+        spawn="posix_spawn",
+    )
+
+    await exec.start(ctx=ctx)
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(partial(exec.run, ctx=ctx))
+            await exec.ready(ctx=ctx)
+            await exec.stop(ctx=ctx)
+    assert exec.proc and exec.proc.returncode == -signal.SIGKILL
+
+
+@pytest.mark.anyio
+async def test_posix_spawn_command_must_exist(ctx: Context, tmp_path: Path) -> None:
+    # run from elsewhere, so through the shell that changes directory first
+    exec = Exec(
+        ctx=ctx, args=["no-such-command"], cwd=str(tmp_path), spawn="posix_spawn"
+    )
+    with pytest.raises(FileNotFoundError):
+        await exec.start(ctx=ctx)
+
+
+@pytest.mark.anyio
+@pytest.mark.skipif(not hasattr(os, "pidfd_open"), reason="needs pidfds")
+async def test_posix_spawn_waits_without_polling(ctx: Context, mocker) -> None:
+    exec = Exec(
+        ctx=ctx,
+        # closing its output first, so only waiting for it to exit is left
+        args=["sh", "-c", "exec >&- 2>&-; sleep 0.5"],
+        spawn="posix_spawn",
+    )
+    waitpid = mocker.spy(os, "waitpid")
+
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    assert exec.proc and exec.proc.returncode == 0
+    assert waitpid.call_count <= 3
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    return stat.rpartition(")")[2].split()[0] != "Z"
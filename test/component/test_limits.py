@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+import resource
+from pathlib import Path
+import pydantic
+import pytest
+from mun.component import Context, Exec
+from mun.component.limits import Cgroups, Limits
+
+
+@pytest.fixture
+def cgroups(tmp_path: Path) -> Cgroups:
+    # delegated as by systemd, with mun in a cgroup of its own within the tree
+    root = tmp_path / "cgroup"
+    tree = root / "user.slice/mun.service"
+    own = tree / "supervisor"
+    own.mkdir(parents=True)
+    (tree / "cgroup.subtree_control").write_text("cpu io memory\n")
+    (own / "cgroup.controllers").write_text("cpu io memory\n")
+    (own / "cgroup.procs").write_text(f"{os.getpid()}\n")
+    proc = tmp_path / "proc-cgroup"
+    proc.write_text("0::/user.slice/mun.service/supervisor\n")
+    return Cgroups(root=root, proc=proc)
+
+
+def test_cgroup_limits(cgroups: Cgroups, tmp_path: Path) -> None:
+    limits = Limits(cpu_weight=50, cpu_quota=1.5, memory_max="512MiB")
+    assert cgroups.add("ent.exec", 1234, limits, project_root=tmp_path)
+
+    tree = cgroups.root / "user.slice/mun.service"
+    # mun's own cgroup and the tree's controllers are left as they were
+    assert (tree / "supervisor/cgroup.procs").read_text() == f"{os.getpid()}\n"
+    assert (tree / "cgroup.subtree_control").read_text() == "cpu io memory\n"
+    [leaf] = (path for path in tree.iterdir() if path.name.startswith("mun-"))
+    assert leaf.name.endswith(".ent.exec")
+    assert (leaf / "cgroup.procs").read_text() == "1234"
+    assert (leaf / "cpu.weight").read_text() == "50"
+    assert (leaf / "cpu.max").read_text() == "150000 100000"
+    assert (leaf / "memory.max").read_text() == str(512 * 1024 * 1024)
+
+
+def test_cgroups_of_projects_are_apart(cgroups: Cgroups, tmp_path: Path) -> None:
+    limits = Limits(cpu_weight=50)
+    for project in ("one", "two"):
+        assert cgroups.add("ent.exec", 1234, limits, project_root=tmp_path / project)
+
+    tree = cgroups.root / "user.slice/mun.service"
+    assert len([path for path in tree.iterdir() if path.name.startswith("mun-")]) == 2
+
+
+def test_cgroup_tree_not_delegated(cgroups: Cgroups) -> None:
+    tree = cgroups.root / "user.slice/mun.service"
+    (tree / "cgroup.subtree_control").write_text("\n")
+
+    assert not cgroups.add("ent.exec", 1234, Limits(cpu_weight=50), project_root=tree)
+    assert cgroups.tree() is None
+    assert sorted(path.name for path in tree.iterdir()) == [
+        "cgroup.subtree_control",
+        "supervisor",
+    ]
+
+
+def test_without_cgroup_v2(tmp_path: Path) -> None:
+    proc = tmp_path / "proc-cgroup"
+    proc.write_text("4:memory:/some/where\n0::/\n")
+    cgroups = Cgroups(root=tmp_path, proc=proc)
+
+    assert not cgroups.add(
+        "ent.exec", 1234, Limits(cpu_weight=50), project_root=tmp_path
+    )
+    assert cgroups.tree() is None
+
+
+@pytest.mark.anyio
+async def test_exec_limits(ctx: Context, tmp_path: Path, mocker) -> None:
+    # approximated by niceness and rlimits, without a usable cgroup tree
+    mocker.patch("mun.component.limits.CGROUPS", Cgroups(root=tmp_path))
+    exec = Exec(
+        ctx=ctx,
+        args=["sleep", "30"],
+        limits={
+            "cpu_weight": 50,
+            "memory_max": "1GiB",
+            "io_class": "idle",
+            "rlimits": {"nofile": 64, "core": [0, 0]},
+        },
+    )
+
+    await exec.start(ctx=ctx)
+    try:
+        assert exec.pid
+        assert os.getpriority(os.PRIO_PROCESS, exec.pid) == 3
+        assert resource.prlimit(exec.pid, resource.RLIMIT_NOFILE) == (64, 64)
+        assert resource.prlimit(exec.pid, resource.RLIMIT_CORE) == (0, 0)
+        assert resource.prlimit(exec.pid, resource.RLIMIT_AS) == (1 << 30, 1 << 30)
+    finally:
+        await exec.stop(ctx=ctx)
+
+
+@pytest.mark.anyio
+async def test_exec_limited_before_command_runs(
+    ctx: Context, tmp_path: Path, mocker
+) -> None:
+    mocker.patch("mun.component.limits.CGROUPS", Cgroups(root=tmp_path))
+    out = tmp_path / "out"
+    exec = Exec(
+        ctx=ctx,
+        args=["sh", "-c", "ulimit -n; nice"],
+        stdout=str(out),
+        limits={"nice": 5, "rlimits": {"nofile": 64}},
+    )
+
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    assert out.read_text().split() == ["64", "5"]
+
+
+@pytest.mark.anyio
+async def test_exec_limited_command_must_exist(ctx: Context) -> None:
+    exec = Exec(ctx=ctx, args=["no-such-command"], limits={"nice": 5})
+    with pytest.raises(FileNotFoundError):
+        await exec.start(ctx=ctx)
+
+
+@pytest.mark.anyio
+async def test_exec_limited_command_relative_to_cwd(
+    ctx: Context, tmp_path: Path
+) -> None:
+    script = ctx.project_root / "sub/run.sh"
+    script.parent.mkdir()
+    script.write_text(f"#!/bin/sh\nnice > {tmp_path / 'out'}\n")
+    script.chmod(0o755)
+    exec = Exec(ctx=ctx, args=["./run.sh"], cwd="sub", limits={"nice": 5})
+
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    assert (tmp_path / "out").read_text() == "5\n"
+
+
+def test_posix_spawn_cannot_be_limited(ctx: Context) -> None:
+    with pytest.raises(pydantic.ValidationError, match="posix_spawn"):
+        Exec(ctx=ctx, args=["true"], spawn="posix_spawn", limits={"nice": 5})
+
+
+def test_unknown_rlimit() -> None:
+    with pytest.raises(pydantic.ValidationError, match="Unknown rlimit 'bogus'"):
+        Limits(rlimits={"bogus": 1})
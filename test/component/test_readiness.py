@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from functools import partial
+from pathlib import Path
+import anyio
+import pytest
+from mun.component import Context
+from mun.component.exec import Exec
+from mun.component.readiness import Probe
+
+
+@pytest.mark.anyio
+async def test_file_probe(ctx: Context, tmp_path: Path) -> None:
+    exec = Exec(
+        ctx=ctx,
+        args=["bash", "-c", "sleep 0.2 && touch ready && sleep 5"],
+        cwd=str(tmp_path),
+        ready=[{"file": "ready", "interval": 0.01}],
+    )
+
+    await exec.start(ctx=ctx)
+    await exec.ready(ctx=ctx)
+    assert (tmp_path / "ready").exists()
+    exec.proc.kill()
+    await exec.proc.wait()
+
+
+@pytest.mark.anyio
+async def test_tcp_probe(ctx: Context) -> None:
+    listener = await anyio.create_tcp_listener(local_host="127.0.0.1")
+    port = listener.extra(anyio.abc.SocketAttribute.local_port)
+    exec = Exec(ctx=ctx, args=["sleep", "5"], ready=[{"tcp": f"127.0.0.1:{port}"}])
+
+    await exec.start(ctx=ctx)
+    await exec.ready(ctx=ctx)
+    await listener.aclose()
+
+    exec.args.ready[0].timeout = 0.2
+    with pytest.raises(ExceptionGroup) as e:
+        await exec.ready(ctx=ctx)
+    assert e.group_contains(TimeoutError)
+    exec.proc.kill()
+    await exec.proc.wait()
+
+
+@pytest.mark.anyio
+async def test_log_probe(ctx: Context) -> None:
+    exec = Exec(
+        ctx=ctx,
+        args=["bash", "-c", "echo starting; sleep 0.2; echo listening on 80; sleep 5"],
+        ready=[{"log": "listening on \\d+", "interval": 0.01}],
+    )
+
+    await exec.start(ctx=ctx)
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(partial(exec.run, ctx=ctx))
+        await exec.ready(ctx=ctx)
+        assert exec.output.recent[-1] == ("stdout", b"listening on 80\n")
+        exec.proc.kill()
+
+
+@pytest.mark.anyio
+async def test_command_probe(ctx: Context, tmp_path: Path) -> None:
+    exec = Exec(
+        ctx=ctx,
+        args=["bash", "-c", "sleep 0.2 && touch ready && sleep 5"],
+        cwd=str(tmp_path),
+        ready=[{"command": ["test", "-e", "ready"], "interval": 0.01}],
+    )
+
+    await exec.start(ctx=ctx)
+    await exec.ready(ctx=ctx)
+    assert (tmp_path / "ready").exists()
+    exec.proc.kill()
+    await exec.proc.wait()
+
+
+@pytest.mark.anyio
+async def test_probe_fails_when_process_exits(ctx: Context) -> None:
+    exec = Exec(ctx=ctx, args=["false"], ready=[{"file": "never", "interval": 0.01}])
+
+    await exec.start(ctx=ctx)
+    with pytest.raises(ExceptionGroup) as e:
+        await exec.ready(ctx=ctx)
+    assert e.group_contains(RuntimeError, match="exited")
+    await exec.proc.wait()
+
+
+def test_probe_without_check_fails_when_built() -> None:
+    class Unchecked(Probe):
+        def _target(self) -> str:
+            return "nothing"
+
+    with pytest.raises(TypeError, match="abstract"):
+        Unchecked()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import pytest
+from mun.component.restart import RestartPolicy, Restarts
+
+
+@pytest.mark.parametrize(
+    ("policy", "status", "expected"),
+    [
+        ("never", 1, False),
+        ("on-failure", 0, False),
+        ("on-failure", 1, True),
+        ("always", 0, True),
+    ],
+)
+def test_policy_applies(policy: str, status: int, expected: bool) -> None:
+    assert RestartPolicy(policy=policy).applies(status) is expected  # type: ignore[arg-type]
+
+
+def test_backoff_grows_to_max() -> None:
+    restarts = Restarts(
+        RestartPolicy(backoff=1, multiplier=2, max_backoff=5, jitter=0, max_restarts=10)
+    )
+
+    delays = [restarts.next_delay(float(now)) for now in range(5)]
+    assert delays == [1, 2, 4, 5, 5]
+    assert restarts.count == 5
+
+
+def test_backoff_is_jittered() -> None:
+    restarts = Restarts(RestartPolicy(backoff=1, jitter=0.5, max_restarts=100))
+
+    delay = restarts.next_delay(0)
+    assert delay is not None
+    assert 0.5 <= delay <= 1.5
+
+
+def test_crash_loop_within_window() -> None:
+    restarts = Restarts(RestartPolicy(max_restarts=2, window=10))
+
+    assert restarts.next_delay(0) is not None
+    assert restarts.next_delay(1) is not None
+    assert restarts.next_delay(2) is None
+    assert restarts.crash_looped
+    assert restarts.count == 2
+
+
+def test_restarts_outside_window_are_forgotten() -> None:
+    restarts = Restarts(RestartPolicy(backoff=1, jitter=0, max_restarts=2, window=10))
+
+    restarts.next_delay(0)
+    restarts.next_delay(1)
+    assert restarts.next_delay(20) == 1
+    assert not restarts.crash_looped
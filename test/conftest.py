@@ -21,6 +21,20 @@ def env(mocker):
     return inner
 
 
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, env) -> Path:
+    cache_home = tmp_path / "__cache"
+    env(XDG_CACHE_HOME=str(cache_home))
+    return cache_home / "mun"
+
+
+@pytest.fixture(autouse=True)
+def state_home(tmp_path, env) -> Path:
+    state_home = tmp_path / "__state"
+    env(XDG_STATE_HOME=str(state_home))
+    return state_home / "mun"
+
+
 @pytest.fixture
 def config_file(tmp_path, env) -> Callable[[str], None]:
     def inner(contents: str) -> None:
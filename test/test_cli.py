@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+import util
+from click.testing import CliRunner
+from bench.discovery import (
+    COLD_START_BUDGET_SECONDS,
+    cold_start,
+    cold_start_overhead,
+)
+from mun.cli import cli
+
+# `mun --help` is run from shell prompts and git hooks, so regressions in what
+# it imports, or how long it takes, are felt on every keystroke
+HEAVY_MODULES = ("anyio", "pydantic", "rich", "tomllib")
+COLD_START_MODULES = ["mun", "mun.cli"]
+
+
+def _run_cli(*args: str) -> subprocess.CompletedProcess[str]:
+    code = (
+        "import sys\n"
+        "from mun import cli\n"
+        f"try:\n    cli({list(args)!r}, prog_name='mun')\n"
+        "except SystemExit:\n    pass\n"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] == 'mun'))\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent.parent,
+    )
+
+
+def test_help_skips_heavy_imports() -> None:
+    output = _run_cli("--help")
+    assert "Usage: mun" in output.stdout
+    assert output.stdout.splitlines()[-1] == "[]"
+
+
+def test_help_imports_only_cli() -> None:
+    output = _run_cli("--help")
+    assert output.stdout.splitlines()[-2] == str(COLD_START_MODULES)
+
+
+def test_help_within_cold_start_budget() -> None:
+    # the quickest of a few runs, beyond a bare interpreter's, so that neither
+    # a loaded host nor a slow interpreter start counts against mun
+    results = dict(cold_start(repeat=5))
+    assert cold_start_overhead(results) < COLD_START_BUDGET_SECONDS
+
+
+def test_component_list_does_not_need_project(tmp_path: Path) -> None:
+    with util.chdir(tmp_path):
+        result = CliRunner().invoke(cli, ["component", "list"])
+
+    assert result.exit_code == 0, result.output
+    assert "exec" in result.output
+
+
+def test_entity_list(project_root: Path) -> None:
+    with (project_root / ".mun/entities/ent1.toml").open("w+") as fp:
+        fp.write("")
+
+    result = CliRunner().invoke(cli, ["entity", "list"])
+
+    assert result.exit_code == 0, result.output
+    assert "ent1" in result.output
+
+
+@pytest.mark.usefixtures("project_root")
+def test_entity_status_without_daemon(env, tmp_path) -> None:
+    env(XDG_RUNTIME_DIR=str(tmp_path / "run"))
+
+    result = CliRunner().invoke(cli, ["entity", "status"])
+
+    assert result.exit_code != 0
+    assert "No daemon is running" in result.output
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import os
-from pathlib import PosixPath
+import time
+from pathlib import Path, PosixPath
 import pytest
 import util
 from mun.config import Config
@@ -138,3 +139,60 @@ def test_custom_entity_dir_discovery(tmp_path, config_file) -> None:
         str(tmp_path / "foo/entities"),
         str(tmp_path / "foo/sib1/.entities"),
     ]
+
+
+def _age_dirs(path: Path) -> None:
+    """Backdate directory mtimes so discovery results over them are cacheable."""
+    past = time.time() - 60
+    for dir in [path, *(p for p in path.rglob("*") if p.is_dir())]:
+        os.utime(dir, (past, past))
+
+
+def test_workspace_cache_skips_discovery(tmp_path, mocker) -> None:
+    (tmp_path / "foo/root/.mun/entities").mkdir(parents=True)
+    (tmp_path / "foo/sib1/.mun/entities").mkdir(parents=True)
+    (tmp_path / "foo/sib2/.mun").mkdir(parents=True)
+    _age_dirs(tmp_path)
+
+    os.chdir(tmp_path / "foo/root")
+    expected = Config.find_or_default()
+    assert expected.entity_dirs
+
+    exists = mocker.patch.object(Config, "_exists", side_effect=AssertionError)
+    config = Config.find_or_default()
+    assert config.project_root == expected.project_root
+    assert config.sibling_roots == expected.sibling_roots
+    assert config.entity_dirs == expected.entity_dirs
+    assert not exists.called
+
+
+def test_workspace_cache_invalidated_by_directory_changes(tmp_path) -> None:
+    (tmp_path / "foo/root/.mun/entities").mkdir(parents=True)
+    (tmp_path / "foo/sib1/.mun").mkdir(parents=True)
+    _age_dirs(tmp_path)
+
+    os.chdir(tmp_path / "foo/root")
+    assert Config.find_or_default().entity_dirs == {tmp_path / "foo/root/.mun/entities"}
+
+    (tmp_path / "foo/sib1/.mun/entities").mkdir()
+    (tmp_path / "foo/sib2/.mun").mkdir(parents=True)
+    config = Config.find_or_default()
+    assert sorted(str(path) for path in config.sibling_roots) == [
+        str(tmp_path / "foo/sib1"),
+        str(tmp_path / "foo/sib2"),
+    ]
+    assert config.entity_dirs == {
+        tmp_path / "foo/root/.mun/entities",
+        tmp_path / "foo/sib1/.mun/entities",
+    }
+
+
+def test_workspace_cache_ignores_recently_modified_dirs(tmp_path, mocker) -> None:
+    (tmp_path / "foo/root/.mun/entities").mkdir(parents=True)
+
+    os.chdir(tmp_path / "foo/root")
+    _ = Config.find_or_default().entity_dirs
+
+    exists = mocker.spy(Config, "_exists")
+    _ = Config.find_or_default().entity_dirs
+    assert exists.called
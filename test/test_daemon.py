@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from functools import partial
+from pathlib import Path
+import anyio
+import pytest
+from mun import control
+from mun.component import Context
+from mun.config import Config
+from mun.daemon import Daemon
+from mun.registry import Registry
+from mun.runtime import Runtime
+from mun.watch import PollWatcher
+
+
+@pytest.fixture
+def socket(tmp_path: Path, env) -> Path:
+    env(XDG_RUNTIME_DIR=str(tmp_path / "run"))
+    return control.socket_path(tmp_path)
+
+
+async def _request(path: Path, command: str, **args):
+    return await anyio.to_thread.run_sync(
+        partial(control.request, path, command, **args)
+    )
+
+
+@pytest.mark.anyio
+async def test_daemon_controls_entities(
+    ctx: Context, project_root: Path, config: Config, socket: Path
+) -> None:
+    with (project_root / ".mun/entities/db.toml").open("w+") as fp:
+        fp.write("""[exec]\nargs = ["sleep", "30"]""")
+    with (project_root / ".mun/entities/api.toml").open("w+") as fp:
+        fp.write("""depends_on = ["db"]\n[exec]\nargs = ["sleep", "30"]""")
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    daemon = Daemon(runtime=Runtime(registry=registry, ctx=ctx), path=socket)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(daemon.serve)
+        with anyio.fail_after(5):
+            while not socket.exists():
+                await anyio.sleep(0.01)
+
+        listed = await _request(socket, "list")
+        assert sorted(entity["name"] for entity in listed) == ["api", "db"]
+
+        states = await _request(socket, "start", names=["api"])
+        assert states == {"api": "ready", "db": "ready"}
+
+        # stopping a dependency stops its dependents too
+        assert await _request(socket, "stop", names=["db"]) == {}
+        assert await _request(socket, "status") == {}
+
+        await _request(socket, "start", names=["db"])
+        assert await _request(socket, "shutdown") is None
+
+    assert not socket.exists()
+    assert not daemon.runtime.entities
+
+
+@pytest.mark.anyio
+async def test_daemon_reports_errors(
+    ctx: Context, config: Config, socket: Path
+) -> None:
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    daemon = Daemon(runtime=Runtime(registry=registry, ctx=ctx), path=socket)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(daemon.serve)
+        with anyio.fail_after(5):
+            while not socket.exists():
+                await anyio.sleep(0.01)
+
+        with pytest.raises(RuntimeError, match="missing"):
+            await _request(socket, "start", names=["missing"])
+        with pytest.raises(RuntimeError, match="Unknown command"):
+            await _request(socket, "frobnicate")
+
+        daemon.shutdown()
+
+
+@pytest.mark.anyio
+async def test_daemon_waits_for_one_stopping(
+    ctx: Context, project_root: Path, config: Config, socket: Path
+) -> None:
+    with (project_root / ".mun/entities/db.toml").open("w+") as fp:
+        fp.write("""[exec]\nargs = ["sleep", "30"]""")
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    first = Daemon(runtime=Runtime(registry=registry, ctx=ctx), path=socket)
+    second = Daemon(runtime=Runtime(registry=registry, ctx=ctx), path=socket)
+
+    with anyio.fail_after(10):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(first.serve)
+            while not socket.exists():
+                await anyio.sleep(0.01)
+            await _request(socket, "start", names=["db"])
+
+            first.shutdown()
+            tg.start_soon(second.serve)
+            while True:
+                try:
+                    states = await _request(socket, "status")
+                except OSError:
+                    await anyio.sleep(0.01)
+                else:
+                    break
+            # answered by the second, once the first has stopped its entities
+            assert states == {}
+            assert not first.runtime.entities
+            second.shutdown()
+
+
+@pytest.mark.anyio
+async def test_daemon_refuses_a_listening_socket(
+    ctx: Context, config: Config, socket: Path
+) -> None:
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    first = Daemon(runtime=Runtime(registry=registry, ctx=ctx), path=socket)
+    second = Daemon(runtime=Runtime(registry=registry, ctx=ctx), path=socket)
+
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(first.serve)
+            while not socket.exists():
+                await anyio.sleep(0.01)
+
+            with pytest.raises(RuntimeError, match="already listening"):
+                await second.serve()
+            first.shutdown()
+
+
+@pytest.mark.anyio
+async def test_daemon_leaves_a_successors_socket(
+    ctx: Context, config: Config, socket: Path
+) -> None:
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    daemon = Daemon(runtime=Runtime(registry=registry, ctx=ctx), path=socket)
+
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(daemon.serve)
+            while not socket.exists():
+                await anyio.sleep(0.01)
+
+            # as if it had been taken for stale, and replaced by another daemon
+            socket.unlink()
+            async with await anyio.create_unix_listener(socket):
+                daemon.shutdown()
+                await anyio.sleep(0.1)
+                assert socket.exists()
+
+
+def test_request_without_daemon(socket: Path) -> None:
+    with pytest.raises(OSError):
+        control.request(socket, "status")
+
+
+@pytest.mark.anyio
+async def test_daemon_reloads_changed_entities(
+    ctx: Context, project_root: Path, config: Config, socket: Path
+) -> None:
+    entities = project_root / ".mun/entities"
+    (entities / "db.toml").write_text("""[exec]\nargs = ["sleep", "30"]""")
+    (entities / "api.toml").write_text("""[exec]\nargs = ["sleep", "30"]""")
+    (entities / "web.toml").write_text(
+        """depends_on = ["api"]\n[exec]\nargs = ["sleep", "30"]"""
+    )
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    daemon = Daemon(
+        runtime=Runtime(registry=registry, ctx=ctx),
+        path=socket,
+        watcher=PollWatcher([entities], interval=0.01),
+    )
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(daemon.serve)
+        with anyio.fail_after(5):
+            while not socket.exists():
+                await anyio.sleep(0.01)
+        await _request(socket, "start", names=["db", "web"])
+        before = dict(daemon.runtime.entities)
+
+        (entities / "api.toml").write_text("""[exec]\nargs = ["sleep", "31"]""")
+        with anyio.fail_after(5):
+            while daemon.runtime.entities.get("web") in (None, before["web"]):
+                await anyio.sleep(0.01)
+
+        # the changed entity and its dependents restart, and nothing else
+        assert daemon.runtime.entities["api"] is not before["api"]
+        assert daemon.runtime.entities["db"] is before["db"]
+        assert await _request(socket, "shutdown") is None
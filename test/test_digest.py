@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from pathlib import Path
+from mun.digest import digest_paths
+
+
+def test_digest_tracks_names_and_contents(tmp_path: Path) -> None:
+    (tmp_path / "dir/sub").mkdir(parents=True)
+    (tmp_path / "dir/a").write_text("a")
+    (tmp_path / "dir/sub/b").write_text("b")
+    inputs = [tmp_path / "dir", tmp_path / "missing"]
+
+    digest = digest_paths(inputs, root=tmp_path)
+    assert digest == digest_paths(inputs, root=tmp_path, max_workers=1)
+
+    (tmp_path / "dir/sub/b").rename(tmp_path / "dir/sub/c")
+    assert digest_paths(inputs, root=tmp_path) != digest
+    (tmp_path / "dir/sub/c").rename(tmp_path / "dir/sub/b")
+    assert digest_paths(inputs, root=tmp_path) == digest
+
+    (tmp_path / "missing").touch()
+    assert digest_paths(inputs, root=tmp_path) != digest
+
+
+def test_digest_includes_extra(tmp_path: Path) -> None:
+    (tmp_path / "a").write_text("a")
+
+    assert digest_paths([tmp_path / "a"], root=tmp_path, extra={"x": 1}) != (
+        digest_paths([tmp_path / "a"], root=tmp_path, extra={"x": 2})
+    )
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import threading
+from dataclasses import replace
 from functools import partial
 from pathlib import Path
 from typing import Any
 import anyio
 import pytest
 from mun import register
+from mun.cache import DigestStore
 from mun.component import Context
 from mun.config import Config
 from mun.registry import Registry
@@ -50,9 +53,10 @@ class SequenceTestD(SequenceTestA): ...
 async def test_entity_start_sequencing(
     ctx: Context, project_root: Path, config: Config
 ):
-    """Test that starting an entity starts all components in sequence."""
+    """Test that starting a sequential entity starts components in sequence."""
     with (project_root / ".mun/entities/ent.toml").open("w+") as fp:
         fp.write("""
+            order = "sequential"
             [sequence_test_a]
             [sequence_test_b]
             [sequence_test_c]
@@ -77,9 +81,10 @@ async def test_entity_start_sequencing(
 
 @pytest.mark.anyio
 async def test_entity_stop_sequencing(ctx: Context, project_root: Path, config: Config):
-    """Test that starting an entity stops all components in reverse sequence."""
+    """Test that stopping a sequential entity stops components in reverse."""
     with (project_root / ".mun/entities/ent.toml").open("w+") as fp:
         fp.write("""
+            order = "sequential"
             [sequence_test_a]
             [sequence_test_b]
             [sequence_test_c]
@@ -100,3 +105,108 @@ async def test_entity_stop_sequencing(ctx: Context, project_root: Path, config:
     async with anyio.create_task_group() as tg:
         assert not any(event for event in events if event.is_set())
         tg.start_soon(partial(entity.stop, ctx=ctx))
+
+
+class Resets:
+    count: int = 0
+
+
+@register.component(with_defaults=True)
+class ResetCounter:
+    def __init__(self, *, ctx: Context, **kwargs: Any) -> None:  # noqa: ARG002
+        self.resets = kwargs["resets"]
+
+    async def reset(self, *, ctx: Context) -> None:  # noqa: ARG002
+        self.resets.count += 1
+
+
+@pytest.mark.anyio
+async def test_entity_reset_skips_unchanged_inputs(
+    ctx: Context, project_root: Path, config: Config, cache_home: Path
+) -> None:
+    (project_root / "seeds").mkdir()
+    (project_root / "seeds/a.sql").write_text("insert 1")
+    with (project_root / ".mun/entities/ent.toml").open("w+") as fp:
+        fp.write("""
+            [reset_counter]
+            reset_inputs = ["seeds", "schema.sql"]
+        """)
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    resets = Resets()
+    reg.entities["ent"].components[0].args["resets"] = resets
+    ctx = replace(ctx, project_root=project_root, cache_dir=cache_home)
+
+    async def reset() -> int:
+        await reg.instantiate_entity("ent", ctx=ctx).reset(ctx=ctx)
+        return resets.count
+
+    assert await reset() == 1
+    assert await reset() == 1
+
+    (project_root / "seeds/a.sql").write_text("insert 2")
+    assert await reset() == 2
+    (project_root / "schema.sql").write_text("create")
+    assert await reset() == 3
+    (project_root / "seeds/b.sql").write_text("insert 3")
+    assert await reset() == 4
+    assert await reset() == 4
+
+
+def test_concurrent_digests_are_kept(tmp_path: Path) -> None:
+    def put(key: str) -> None:
+        for i in range(20):
+            DigestStore(tmp_path).put(key, str(i))
+
+    threads = [threading.Thread(target=put, args=(str(i),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [DigestStore(tmp_path).get(str(i)) for i in range(4)] == ["19"] * 4
+
+
+@register.component(with_defaults=True)
+class StartGate:
+    def __init__(self, *, ctx: Context, **kwargs: Any) -> None:
+        self.name = ctx.name
+        self.log: list[str] = kwargs["log"]
+        self.wait_for: int = kwargs.get("wait_for", 0)
+
+    async def start(self, *, ctx: Context) -> None:  # noqa: ARG002
+        self.log.append(f"starting {self.name}")
+        with anyio.fail_after(1):
+            while len(self.log) < self.wait_for:
+                await anyio.sleep(0.01)
+        self.log.append(f"started {self.name}")
+
+    async def stop(self, *, ctx: Context) -> None:  # noqa: ARG002
+        self.log.append(f"stopped {self.name}")
+
+
+@pytest.mark.anyio
+async def test_entity_starts_components_concurrently(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    with (project_root / ".mun/entities/ent.toml").open("w+") as fp:
+        fp.write("""
+            [[start_gate]]
+            [[start_gate]]
+            [[start_gate]]
+            id = "last"
+            after = ["start_gate.0", "start_gate.1"]
+        """)
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    log: list[str] = []
+    for spec in reg.entities["ent"].components:
+        # the first two only finish starting once both have begun
+        spec.args.update(log=log, wait_for=2 if spec.id != "last" else 0)
+    entity = reg.instantiate_entity("ent", ctx=ctx)
+
+    await entity.start(ctx=ctx)
+    assert set(log[:2]) == {"starting ent.start_gate.0", "starting ent.start_gate.1"}
+    assert log[-2:] == ["starting ent.last", "started ent.last"]
+
+    log.clear()
+    await entity.stop(ctx=ctx)
+    assert log[0] == "stopped ent.last"
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import gzip
+import time
+from dataclasses import replace
+from pathlib import Path
+import pytest
+from click.testing import CliRunner
+from mun.cli import cli
+from mun.component import Context, Exec
+from mun.logs import LogStore, LogWriter
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def _writer(dir: Path) -> LogWriter:
+    return LogWriter(dir, segment_bytes=1024, segments=3, index_bytes=128)
+
+
+def _write(writer: LogWriter, clock: list[float], count: int) -> None:
+    for _ in range(count):
+        writer.write("stdout", [f"line at {clock[0]:.0f}\n".encode()])
+        if writer.full:
+            writer.rotate()
+        clock[0] += 1
+
+
+def test_rotates_into_indexed_gzip_segments(tmp_path: Path, clock: list[float]) -> None:
+    store = LogStore(tmp_path)
+    writer = _writer(tmp_path / "ent.exec")
+    _write(writer, clock, 100)
+    writer.close()
+
+    segments = store.reader("ent.exec").segments()
+    assert [segment.compressed for segment in segments] == [True, True, True, False]
+    assert store.names() == ["ent.exec"]
+
+    # each indexed block is a gzip member of its own, so can be read alone
+    segment = segments[0]
+    with segment.path.open("rb") as fp:
+        fp.seek(segment.index[1][1])
+        block = gzip.GzipFile(fileobj=fp).readline()
+    assert block.split(b" ", 2)[2] == f"line at {segment.index[1][0]:.0f}\n".encode()
+
+    # only the most recent segments are kept
+    records = list(store.reader("ent.exec").read())
+    assert records[0].time == segments[0].start
+    assert records[-1].line == b"line at 1099\n"
+    assert [record.time for record in records] == sorted(
+        record.time for record in records
+    )
+
+
+def test_reads_between_times(tmp_path: Path, clock: list[float]) -> None:
+    writer = _writer(tmp_path / "ent.exec")
+    _write(writer, clock, 100)
+    writer.close()
+    reader = LogStore(tmp_path).reader("ent.exec")
+
+    records = list(reader.read(since=1080, until=1084.5))
+    assert [record.line for record in records] == [
+        f"line at {t}\n".encode() for t in range(1080, 1085)
+    ]
+
+    # segments before the one holding `since` aren't read at all
+    for segment in reader.segments()[:-2]:
+        segment.path.write_bytes(b"garbage")
+    assert [record.time for record in reader.read(since=1095)] == [
+        float(t) for t in range(1095, 1100)
+    ]
+
+
+def test_tail_follows_rotation(tmp_path: Path, clock: list[float]) -> None:
+    writer = _writer(tmp_path / "ent.exec")
+    _write(writer, clock, 5)
+    tail = LogStore(tmp_path).reader("ent.exec").tail()
+    assert tail.poll() == []
+
+    # a segment holds around 30 lines, so this crosses several rotations, each
+    # between polls
+    polled = []
+    for _ in range(6):
+        _write(writer, clock, 20)
+        polled += tail.poll()
+    writer.close()
+    tail.close()
+
+    assert [record.time for record in polled] == [float(t) for t in range(1005, 1125)]
+
+
+def test_read_stops_where_tail_starts(tmp_path: Path, clock: list[float]) -> None:
+    writer = _writer(tmp_path / "ent.exec")
+    _write(writer, clock, 5)
+    reader = LogStore(tmp_path).reader("ent.exec")
+    tail = reader.tail()
+    # written after following starts, but before the history is read
+    _write(writer, clock, 5)
+    writer.close()
+
+    history = [record.time for record in reader.read(tail=tail)]
+    followed = [record.time for record in tail.poll()]
+    tail.close()
+
+    assert history == [float(t) for t in range(1000, 1005)]
+    assert followed == [float(t) for t in range(1005, 1010)]
+
+
+@pytest.mark.anyio
+async def test_exec_writes_to_log_store(ctx: Context, tmp_path: Path) -> None:
+    store = LogStore(tmp_path / "logs")
+    ctx = replace(ctx, name="ent.exec", log_store=store)
+
+    exec = Exec(ctx=ctx, args=["sh", "-c", "echo out; echo err >&2"])
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    records = list(store.reader("ent.exec").read())
+    assert sorted((record.stream, record.line) for record in records) == [
+        ("stderr", b"err\n"),
+        ("stdout", b"out\n"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_exec_rotates_log_of_both_streams(ctx: Context, tmp_path: Path) -> None:
+    store = LogStore(tmp_path / "logs", segment_bytes=4096, segments=100)
+    ctx = replace(ctx, name="ent.exec", log_store=store)
+    # pausing now and then, so output arrives in batches smaller than a segment
+    script = (
+        "for i in $(seq 1000); do"
+        " echo out$i; echo err$i >&2; (( i % 100 )) || sleep 0.01;"
+        " done"
+    )
+
+    exec = Exec(
+        ctx=ctx,
+        args=["bash", "-c", script],
+        stdout=str(tmp_path / "out"),
+        stderr=str(tmp_path / "err"),
+    )
+    await exec.start(ctx=ctx)
+    await exec.run(ctx=ctx)
+
+    reader = store.reader("ent.exec")
+    assert len(reader.segments()) > 3
+    lines = {(record.stream, record.line) for record in reader.read()}
+    assert lines == {
+        (stream, f"{prefix}{i}\n".encode())
+        for stream, prefix in [("stdout", "out"), ("stderr", "err")]
+        for i in range(1, 1001)
+    }
+
+
+def test_cli_shows_logs(project_root: Path, state_home: Path) -> None:
+    store = LogStore.for_project(state_home / "logs", project_root)
+    for name in ("ent.a", "ent.b", "other.a"):
+        writer = store.writer(name)
+        writer.write("stdout", [f"from {name}\n".encode()])
+        writer.close()
+
+    result = CliRunner().invoke(cli, ["logs", "ent", "--since", "1h"])
+
+    assert result.exit_code == 0, result.output
+    assert result.output == "ent.a | from ent.a\nent.b | from ent.b\n"
+
+    result = CliRunner().invoke(cli, ["logs", "ent", "--until", "1h"])
+    assert result.output == ""
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import io
+import anyio
+import pytest
+from mun.output import MAX_LINE_BYTES, ConsoleSink, OutputPipeline
+
+
+async def _pump(pipeline: OutputPipeline, chunks: list[bytes], sink) -> None:
+    send, receive = anyio.create_memory_object_stream[bytes](len(chunks))
+    async with send:
+        for chunk in chunks:
+            await send.send(chunk)
+    await pipeline.pump("stdout", receive, [sink])
+
+
+@pytest.mark.anyio
+async def test_console_sink_prefixes_whole_lines() -> None:
+    stream = io.BytesIO()
+    sink = ConsoleSink(stream=stream, prefix="ent.exec | ")
+
+    await _pump(OutputPipeline(history=10), [b"one\ntw", b"o\nthr", b"ee"], sink)
+
+    assert stream.getvalue() == (b"ent.exec | one\nent.exec | two\nent.exec | three\n")
+
+
+@pytest.mark.anyio
+async def test_history_is_bounded() -> None:
+    pipeline = OutputPipeline(history=3)
+    sink = ConsoleSink(stream=io.BytesIO(), prefix="")
+
+    await _pump(pipeline, [b"".join(b"%d\n" % i for i in range(10))], sink)
+
+    assert list(pipeline.recent) == [
+        ("stdout", b"7\n"),
+        ("stdout", b"8\n"),
+        ("stdout", b"9\n"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_long_lines_are_split() -> None:
+    pipeline = OutputPipeline(history=10)
+    sink = ConsoleSink(stream=io.BytesIO(), prefix="")
+
+    await _pump(pipeline, [b"x" * (MAX_LINE_BYTES * 2 + 1)], sink)
+
+    assert [len(line) for _, line in pipeline.recent] == [
+        MAX_LINE_BYTES,
+        MAX_LINE_BYTES,
+        1,
+    ]
+
+
+@pytest.mark.anyio
+async def test_observers_see_each_line() -> None:
+    pipeline = OutputPipeline(history=10)
+    seen: list[tuple[str, bytes]] = []
+    pipeline.observers.append(lambda stream, line: seen.append((stream, line)))
+
+    await _pump(pipeline, [b"a\nb\n"], ConsoleSink(stream=io.BytesIO(), prefix=""))
+
+    assert seen == [("stdout", b"a\n"), ("stdout", b"b\n")]
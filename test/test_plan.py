@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+import anyio
+import pytest
+from click.testing import CliRunner
+from mun.cache import DurationStore
+from mun.cli import cli
+from mun.component import Context
+from mun.config import Config
+from mun.plan import Plan, PriorityLimiter, duration_key
+from mun.registry import Registry
+from mun.runtime import Runtime
+from mun.tasks import TaskRunner
+
+DEPS = {
+    "app": ["db", "sidecar"],
+    "db": ["volume"],
+    "volume": [],
+    "sidecar": [],
+    "tool": [],
+}
+
+
+def _write(root: Path, name: str, script: str, depends_on: list[str]) -> None:
+    (root / f".mun/entities/{name}.toml").write_text(
+        f"depends_on = {depends_on!r}\n[exec]\nargs = ['sh', '-c', {script!r}]\n"
+    )
+
+
+def test_plan_follows_longest_path() -> None:
+    plan = Plan.build(DEPS, {"db": 5.0, "volume": 1.0, "sidecar": 0.5, "app": 1.0})
+
+    assert plan.paths == {
+        "app": 1.0,
+        "db": 6.0,
+        "volume": 7.0,
+        "sidecar": 1.5,
+        "tool": 1.0,  # never timed, so assumed to take a second
+    }
+    assert plan.critical_path() == ["volume", "db", "app"]
+    assert plan.order() == ["volume", "db", "sidecar", "app", "tool"]
+
+
+def test_duration_store_keeps_recent_history(tmp_path: Path) -> None:
+    store = DurationStore(tmp_path, history=3)
+    for seconds in (100.0, 1.0, 3.0, 2.0):
+        store.record("db", seconds)
+
+    assert store.estimates() == {"db": 2.0}
+
+
+def test_duration_store_keeps_concurrent_records(tmp_path: Path) -> None:
+    def record(key: str) -> None:
+        for seconds in range(20):
+            DurationStore(tmp_path).record_all({key: seconds})
+
+    threads = [threading.Thread(target=record, args=(str(i),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert DurationStore(tmp_path).estimates() == {str(i): 16 for i in range(4)}
+
+
+@pytest.mark.anyio
+async def test_limiter_admits_highest_priority_first() -> None:
+    limiter = PriorityLimiter(1)
+    admitted = []
+
+    async def acquire(name: str, priority: float) -> None:
+        async with limiter.acquire(priority):
+            admitted.append(name)
+            await anyio.sleep(0.01)
+
+    async with anyio.create_task_group() as tg:
+        for name, priority in [("quick", 1.0), ("slow", 9.0), ("middling", 5.0)]:
+            tg.start_soon(acquire, name, priority)
+
+    assert admitted == ["slow", "middling", "quick"]
+
+
+@pytest.mark.anyio
+async def test_tasks_start_on_critical_path_first(
+    ctx: Context, project_root: Path, config: Config, cache_home: Path
+) -> None:
+    log = project_root / "log"
+    for name in ("db", "sidecar"):
+        _write(project_root, name, f"echo {name} >> {log}", [])
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    ctx.cache_dir = cache_home
+    store = DurationStore(cache_home)
+
+    store.record(duration_key(ctx.project_root, "sidecar", "run"), 5.0)
+    await TaskRunner(registry=registry, ctx=ctx).run(["db", "sidecar"])
+    assert log.read_text() == "sidecar\ndb\n"
+
+    log.unlink()
+    store.record(duration_key(ctx.project_root, "db", "run"), 10.0)
+    store.record(duration_key(ctx.project_root, "db", "run"), 10.0)
+    await TaskRunner(registry=registry, ctx=ctx).run(["db", "sidecar"])
+    assert log.read_text() == "db\nsidecar\n"
+
+
+@pytest.mark.anyio
+async def test_runtime_records_startup_durations(
+    ctx: Context, project_root: Path, config: Config, cache_home: Path, mocker
+) -> None:
+    _write(project_root, "db", "exec sleep 30", [])
+    _write(project_root, "sidecar", "exec sleep 30", [])
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    ctx.cache_dir = cache_home
+    record_all = mocker.spy(DurationStore, "record_all")
+
+    async with Runtime(registry=registry, ctx=ctx, jobs=1) as runtime:
+        await runtime.start(["db", "sidecar"])
+        assert runtime.states == {"db": "ready", "sidecar": "ready"}
+        assert record_all.call_count == 1
+
+    assert runtime.plan(["db"]).estimates.keys() == {"db"}
+    assert DurationStore(cache_home).estimates().keys() == {
+        duration_key(ctx.project_root, name, "ready") for name in ("db", "sidecar")
+    }
+
+
+def test_cli_shows_critical_path(project_root: Path, cache_home: Path) -> None:
+    for name, deps in DEPS.items():
+        _write(project_root, name, "true", deps)
+    store = DurationStore(cache_home)
+    store.record(duration_key(project_root, "db", "ready"), 5.0)
+
+    result = CliRunner().invoke(cli, ["plan", "--critical-path", "app", "tool"])
+
+    assert result.exit_code == 0, result.output
+    assert [line.split() for line in result.output.splitlines()] == [
+        ["entity", "estimate", "path"],
+        ["volume", "unknown", "7.0s"],
+        ["db", "5.0s", "6.0s"],
+        ["app", "unknown", "1.0s"],
+    ]
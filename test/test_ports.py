@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import fcntl
+from dataclasses import replace
+from pathlib import Path
+import pytest
+from mun.component import Context, Exec
+from mun.config import Config
+from mun.ports import PortAllocator
+from mun.registry import Registry
+from mun.runtime import Runtime
+
+
+def test_concurrent_allocators_never_share(tmp_path: Path) -> None:
+    a = PortAllocator(tmp_path)
+    b = PortAllocator(tmp_path)
+    ports_a = {a.port("ent", str(i)) for i in range(20)}
+    ports_b = {b.port("ent", str(i)) for i in range(20)}
+
+    assert len(ports_a) == len(ports_b) == 20
+    assert not ports_a & ports_b
+    assert a.port("ent", "0") == a.port("ent", "0")
+
+
+def test_released_ports_can_be_reserved_again(tmp_path: Path) -> None:
+    a = PortAllocator(tmp_path)
+    port = a.port("ent", "http")
+    with (tmp_path / f"{port}.lock").open() as fp:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        a.release("ent")
+        assert not a.reserved
+        assert not (tmp_path / f"{port}.lock").exists()
+        fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_substitute(tmp_path: Path) -> None:
+    ports = PortAllocator(tmp_path)
+    args = {
+        "args": ["serve", "--port=${port:http}"],
+        "env": {"DB_PORT": "${port:db.pg}", "HOME": "/home"},
+        "ready": [{"tcp": "localhost:${port:http}"}],
+        "history": 10,
+    }
+
+    substituted = ports.substitute(args, entity="api")
+
+    http, pg = ports.reserved[("api", "http")], ports.reserved[("db", "pg")]
+    assert substituted == {
+        "args": ["serve", f"--port={http}"],
+        "env": {"DB_PORT": str(pg), "HOME": "/home"},
+        "ready": [{"tcp": f"localhost:{http}"}],
+        "history": 10,
+    }
+
+
+@pytest.mark.anyio
+async def test_entities_use_reserved_ports(
+    ctx: Context, project_root: Path, config: Config, tmp_path: Path
+) -> None:
+    (project_root / ".mun/entities/db.toml").write_text(
+        "[exec]\nargs = ['sleep', '30']\nenv = { PORT = '${port:pg}' }\n"
+    )
+    (project_root / ".mun/entities/api.toml").write_text(
+        "depends_on = ['db']\n"
+        "[exec]\nargs = ['echo', '${port:db.pg}', '${port:http}']\n"
+    )
+    ports = PortAllocator(tmp_path / "ports")
+    ctx = replace(ctx, ports=ports)
+
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    async with Runtime(registry=registry, ctx=ctx) as runtime:
+        await runtime.start(["api"])
+        db = runtime.entities["db"].components[0]
+        api = runtime.entities["api"].components[0]
+        assert isinstance(db, Exec) and isinstance(api, Exec)
+        assert db.args.env == {"PORT": str(ports.reserved[("db", "pg")])}
+        assert api.args.args[1] == db.args.env["PORT"]
+        assert runtime.ports() == {
+            "db.pg": ports.reserved[("db", "pg")],
+            "api.http": ports.reserved[("api", "http")],
+        }
+
+        await runtime.stop(["db"])
+        assert not runtime.ports()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "entity",
+    [
+        "[exec]\nargs = ['no-such-command', '${port:http}']\n",
+        "[exec]\nargs = ['true']\nready = [{ tcp = '${port:http}' }]\n",
+    ],
+    ids=["start", "ready"],
+)
+async def test_failed_entities_release_ports(
+    ctx: Context, project_root: Path, config: Config, tmp_path: Path, entity: str
+) -> None:
+    (project_root / ".mun/entities/api.toml").write_text(entity)
+    ports = PortAllocator(tmp_path / "ports")
+    ctx = replace(ctx, ports=ports)
+
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    async with Runtime(registry=registry, ctx=ctx) as runtime:
+        with pytest.raises(ExceptionGroup):
+            await runtime.start(["api"])
+        assert not ports.reserved
+        assert not runtime.entities
+        assert not list((tmp_path / "ports").iterdir())
@@ -18,6 +18,7 @@ class Defaulted:
 class NotDefaulted:
     def __init__(self, *, ctx: Context, **kwargs: Any) -> None: ...
     async def start(self, *, ctx: Context) -> None: ...
+    async def ready(self, *, ctx: Context) -> None: ...
     async def run(self, *, ctx: Context) -> None: ...
     async def stop(self, *, ctx: Context) -> None: ...
     async def reset(self, *, ctx: Context) -> None: ...
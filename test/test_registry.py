@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import tomllib
 from pathlib import Path
 import pytest
-from mun import register
+from mun import cache as cache_module
+from mun import register, registry
+from mun.cache import RegistryCache
 from mun.config import Config
 from mun.registry import Registry
 
@@ -96,3 +99,201 @@ def test_entity_depends_on_discovery(config, project_root) -> None:
     reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
 
     assert reg.entities["ent1"].depends_on == ["foo", "bar"]
+
+
+def test_registry_cache_skips_unchanged_files(
+    config: Config, project_root: Path, cache_home: Path, mocker
+) -> None:
+    with (project_root / ".mun/entities/ent1.toml").open("w+") as fp:
+        fp.write("""[test_comp1]""")
+    cache = RegistryCache(cache_home)
+    Registry.from_dirs(entity_dirs=config.entity_dirs, cache=cache).dependency_graph(
+        ["ent1"]
+    )
+
+    mocker.patch("mun.registry.tomllib.load", side_effect=AssertionError)
+    mocker.patch("mun.registry.tomllib.loads", side_effect=AssertionError)
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs, cache=cache)
+    assert [component.name for component in reg.entities["ent1"].components] == [
+        "test_comp1"
+    ]
+
+
+def test_registry_cache_saved_once_per_graph(
+    config: Config, project_root: Path, cache_home: Path, mocker
+) -> None:
+    entities = project_root / ".mun/entities"
+    (entities / "a.toml").write_text("depends_on = ['b']\n[test_comp1]\n")
+    (entities / "b.toml").write_text("depends_on = ['c']\n[test_comp1]\n")
+    (entities / "c.toml").write_text("[test_comp1]\n")
+    reg = Registry.from_dirs(
+        entity_dirs=config.entity_dirs, cache=RegistryCache(cache_home)
+    )
+    write_json = mocker.spy(cache_module, "write_json")
+
+    reg.dependency_graph(["a"])
+
+    assert write_json.call_count == 1
+
+
+def test_registry_cache_reparses_changed_files(
+    config: Config, project_root: Path, cache_home: Path
+) -> None:
+    path = project_root / ".mun/entities/ent1.toml"
+    with path.open("w+") as fp:
+        fp.write("""[test_comp1]""")
+    cache = RegistryCache(cache_home)
+    Registry.from_dirs(entity_dirs=config.entity_dirs, cache=cache)
+
+    with path.open("w+") as fp:
+        fp.write("""[test_comp1]\n[test_comp2]""")
+    with (project_root / ".mun/entities/ent2.toml").open("w+") as fp:
+        fp.write("""[test_comp2]""")
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs, cache=cache)
+
+    assert [component.name for component in reg.entities["ent1"].components] == [
+        "test_comp1",
+        "test_comp2",
+    ]
+    assert [component.name for component in reg.entities["ent2"].components] == [
+        "test_comp2"
+    ]
+
+    path.unlink()
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs, cache=cache)
+    assert list(reg.entities) == ["ent2"]
+
+
+def test_parallel_scan_matches_serial(config, project_root, sibling_roots) -> None:
+    for i, root in enumerate([project_root, *sibling_roots]):
+        for j in range(10):
+            with (root / f".mun/entities/ent{i}_{j}.toml").open("w+") as fp:
+                fp.write(f"""depends_on = ["ent{i}_{j - 1}"]\n[test_comp1]""")
+
+    serial = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    parallel = Registry.from_dirs(entity_dirs=config.entity_dirs, max_workers=8)
+
+    assert list(parallel.entities) == list(serial.entities)
+    assert parallel.entities == serial.entities
+
+
+def test_parallel_scan_collision_is_deterministic(
+    config: Config, project_root: Path, sibling_roots: list[Path]
+) -> None:
+    for root in [project_root, *sibling_roots]:
+        with (root / ".mun/entities/ent1.toml").open("w+") as fp:
+            fp.write("""[test_comp1]""")
+
+    messages = set()
+    for _ in range(5):
+        with pytest.raises(KeyError) as e:
+            Registry.from_dirs(entity_dirs=config.entity_dirs, max_workers=8)
+        messages.add(str(e.value))
+
+    assert len(messages) == 1
+
+
+def test_reload_reports_changed_entities(config, project_root) -> None:
+    entities = project_root / ".mun/entities"
+    (entities / "a.toml").write_text("[exec]\nargs = ['true']\n")
+    (entities / "b.toml").write_text("")
+    (entities / "c.toml").write_text("")
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    reg.dependency_graph(["a", "b", "c"])
+
+    assert reg.reload([entities / "a.toml"]) == set()
+
+    (entities / "a.toml").write_text("[exec]\nargs = ['false']\n")
+    (entities / "b.toml").write_text("name = 'renamed'\n")
+    (entities / "c.toml").unlink()
+    (entities / "d.toml").write_text("")
+    changed = reg.reload(entities / f"{name}.toml" for name in "abcd")
+
+    assert changed == {"a", "b", "renamed", "c", "d"}
+    assert sorted(reg.entities) == ["a", "d", "renamed"]
+    assert reg.entities["a"].components[0].args == {"args": ["false"]}
+
+
+def test_reload_collision_fails(config, project_root) -> None:
+    entities = project_root / ".mun/entities"
+    (entities / "a.toml").write_text("")
+    (entities / "b.toml").write_text("")
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+
+    (entities / "b.toml").write_text("name = 'a'\n")
+    with pytest.raises(KeyError, match="Two entities"):
+        reg.reload([entities / "b.toml"])
+
+
+def test_failed_reload_leaves_entities_unchanged(config, project_root) -> None:
+    entities = project_root / ".mun/entities"
+    (entities / "a.toml").write_text("[exec]\nargs = ['true']\n")
+    (entities / "b.toml").write_text("")
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    before = reg.entities["a"]
+
+    (entities / "a.toml").write_text("[exec]\nargs = ['false']\n")
+    (entities / "b.toml").write_text("name = \n")
+    with pytest.raises(tomllib.TOMLDecodeError):
+        reg.reload([entities / "a.toml", entities / "b.toml"])
+
+    assert sorted(reg.entities) == ["a", "b"]
+    assert reg.entities["a"] == before
+
+
+def test_entities_are_parsed_on_lookup(config, project_root, mocker) -> None:
+    entities = project_root / ".mun/entities"
+    (entities / "a.toml").write_text("depends_on = ['b']\n[test_comp1]\n")
+    (entities / "b.toml").write_text("name = 'b'\n[test_comp1]\n")
+    (entities / "c.toml").write_text("name = 'c'\n[unknown_component]\n")
+    load = mocker.spy(registry.tomllib, "load")
+
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    assert sorted(reg.entities) == ["a", "b", "c"]
+    assert load.call_count == 0
+
+    # only the closure of what's asked for is parsed, so `c` never fails to
+    assert reg.dependency_graph(["a"]) == {"a": ["b"], "b": []}
+    assert load.call_count == 2
+    with pytest.raises(ValueError, match="unknown_component"):
+        _ = reg.entities["c"]
+
+
+def test_index_falls_back_to_full_parse(config, project_root) -> None:
+    (project_root / ".mun/entities/a.toml").write_text(
+        "depends_on = [\n  ['nested'],\n]\nname = 'renamed'\n"
+    )
+
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    assert list(reg.entities) == ["renamed"]
+
+
+def test_arrays_of_components(config, project_root) -> None:
+    (project_root / ".mun/entities/ent.toml").write_text(
+        "[[test_comp1]]\n[[test_comp1]]\nid = 'named'\nafter = ['test_comp1.0']\n"
+        "[test_comp2]\n"
+    )
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+
+    components = reg.entities["ent"].components
+    assert [c.id for c in components] == ["test_comp1.0", "named", "test_comp2"]
+    assert components[1].after == ["test_comp1.0"]
+    assert components[1].args == {}
+    assert reg.entities["ent"].order == "concurrent"
+
+
+@pytest.mark.parametrize(
+    ("doc", "error"),
+    [
+        ("[[test_comp1]]\nid = 'a'\n[test_comp2]\nid = 'a'\n", "Duplicate"),
+        ("[test_comp1]\nafter = ['missing']\n", "unknown"),
+        ("[test_comp1]\nafter = ['test_comp1']\n", "cycle"),
+        ("order = 'random'\n", "order"),
+    ],
+)
+def test_invalid_component_ordering(config, project_root, doc, error) -> None:
+    (project_root / ".mun/entities/ent.toml").write_text(doc)
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+
+    with pytest.raises(ValueError, match=error):
+        _ = reg.entities["ent"]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+import anyio
+import pytest
+from mun import register
+from mun.component import Context
+from mun.config import Config
+from mun.registry import Registry
+from mun.runtime import Runtime
+
+
+@register.component(with_defaults=True)
+class RuntimeTestRecord:
+    def __init__(self, *, ctx: Context, **kwargs: Any) -> None:  # noqa: ARG002
+        self.name = kwargs["name"]
+        self.log: list[tuple[str, str]] = kwargs["log"]
+        self.wait_for: list[anyio.Event] = kwargs.get("wait_for", [])
+        self.event: anyio.Event | None = kwargs.get("event")
+        self.stop_wait_for: list[anyio.Event] = kwargs.get("stop_wait_for", [])
+        self.stop_event: anyio.Event | None = kwargs.get("stop_event")
+        self.run_error: Exception | None = kwargs.get("run_error")
+
+    async def start(self, *, ctx: Context) -> None:  # noqa: ARG002
+        self.log.append(("start", self.name))
+        if self.event:
+            self.event.set()
+        with anyio.fail_after(1):
+            for event in self.wait_for:
+                await event.wait()
+
+    async def run(self, *, ctx: Context) -> None:  # noqa: ARG002
+        if self.run_error:
+            raise self.run_error
+        await anyio.sleep_forever()
+
+    async def stop(self, *, ctx: Context) -> None:  # noqa: ARG002
+        self.log.append(("stop", self.name))
+        if self.stop_event:
+            self.stop_event.set()
+        with anyio.fail_after(1):
+            for event in self.stop_wait_for:
+                await event.wait()
+
+
+def _write_entity(root: Path, name: str, depends_on: list[str]) -> None:
+    with (root / f".mun/entities/{name}.toml").open("w+") as fp:
+        fp.write(f"depends_on = {depends_on!r}\n[runtime_test_record]\n")
+
+
+def _registry(config: Config, log: list[tuple[str, str]]) -> Registry:
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    for name, spec in reg.entities.items():
+        for component in spec.components:
+            component.args.update(name=name, log=log)
+    return reg
+
+
+@pytest.mark.anyio
+async def test_runtime_starts_dependencies_first(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_entity(project_root, "db", [])
+    _write_entity(project_root, "cache", [])
+    _write_entity(project_root, "api", ["db", "cache"])
+    _write_entity(project_root, "web", ["api"])
+    log: list[tuple[str, str]] = []
+    async with Runtime(registry=_registry(config, log), ctx=ctx) as runtime:
+        await runtime.start(["web"])
+
+        started = [name for (event, name) in log if event == "start"]
+        assert set(started[:2]) == {"db", "cache"}
+        assert started[2:] == ["api", "web"]
+        log.clear()
+
+    stopped = [name for (event, name) in log if event == "stop"]
+    assert stopped[:2] == ["web", "api"]
+    assert set(stopped[2:]) == {"db", "cache"}
+    assert not runtime.entities
+
+
+@pytest.mark.anyio
+async def test_runtime_starts_independent_entities_concurrently(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_entity(project_root, "a", [])
+    _write_entity(project_root, "b", [])
+    log: list[tuple[str, str]] = []
+    reg = _registry(config, log)
+
+    # each entity only finishes starting once the other has begun starting
+    events = {"a": anyio.Event(), "b": anyio.Event()}
+    reg.entities["a"].components[0].args.update(
+        event=events["a"], wait_for=[events["b"]]
+    )
+    reg.entities["b"].components[0].args.update(
+        event=events["b"], wait_for=[events["a"]]
+    )
+
+    async with Runtime(registry=reg, ctx=ctx) as runtime:
+        await runtime.start(["a", "b"])
+
+
+@pytest.mark.anyio
+async def test_overlapping_starts_share_entities(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_entity(project_root, "db", [])
+    _write_entity(project_root, "api", ["db"])
+    log: list[tuple[str, str]] = []
+    reg = _registry(config, log)
+    # db only finishes starting once both calls have begun
+    gate = anyio.Event()
+    reg.entities["db"].components[0].args.update(wait_for=[gate])
+
+    async with Runtime(registry=reg, ctx=ctx) as runtime:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(runtime.start, ["db"])
+            tg.start_soon(runtime.start, ["api"])
+            await anyio.wait_all_tasks_blocked()
+            gate.set()
+
+        assert runtime.entities.keys() == {"db", "api"}
+
+    assert [name for (event, name) in log if event == "start"] == ["db", "api"]
+    assert [name for (event, name) in log if event == "stop"] == ["api", "db"]
+
+
+@pytest.mark.anyio
+async def test_failed_entity_leaves_others_running(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_entity(project_root, "db", [])
+    _write_entity(project_root, "broken", [])
+    log: list[tuple[str, str]] = []
+    reg = _registry(config, log)
+    reg.entities["broken"].components[0].args.update(run_error=OSError("gone"))
+
+    async with Runtime(registry=reg, ctx=ctx) as runtime:
+        await runtime.start(["db", "broken"])
+        await anyio.wait_all_tasks_blocked()
+
+        assert runtime.states == {"db": "ready", "broken": "failed"}
+
+
+@pytest.mark.anyio
+async def test_runtime_stops_independent_entities_concurrently(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_entity(project_root, "a", [])
+    _write_entity(project_root, "b", [])
+    _write_entity(project_root, "c", ["a", "b"])
+    log: list[tuple[str, str]] = []
+    reg = _registry(config, log)
+
+    # each entity only finishes stopping once the other has begun stopping
+    events = {"a": anyio.Event(), "b": anyio.Event()}
+    reg.entities["a"].components[0].args.update(
+        stop_event=events["a"], stop_wait_for=[events["b"]]
+    )
+    reg.entities["b"].components[0].args.update(
+        stop_event=events["b"], stop_wait_for=[events["a"]]
+    )
+
+    async with Runtime(registry=reg, ctx=ctx) as runtime:
+        await runtime.start(["c"])
+        log.clear()
+        await runtime.stop(["a", "b"])
+
+        assert log[0] == ("stop", "c")
+        assert not runtime.entities
+
+
+@pytest.mark.anyio
+async def test_runtime_only_starts_dependency_closure(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_entity(project_root, "a", [])
+    _write_entity(project_root, "b", ["a"])
+    _write_entity(project_root, "unrelated", [])
+    log: list[tuple[str, str]] = []
+    async with Runtime(registry=_registry(config, log), ctx=ctx) as runtime:
+        await runtime.start(["b"])
+        await runtime.start(["b"])
+
+        assert sorted(runtime.entities) == ["a", "b"]
+        assert log == [("start", "a"), ("start", "b")]
+
+
+def test_dependency_cycle_is_rejected(config: Config, project_root: Path) -> None:
+    _write_entity(project_root, "a", ["c"])
+    _write_entity(project_root, "b", ["a"])
+    _write_entity(project_root, "c", ["b"])
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+
+    with pytest.raises(ValueError, match="cycle"):
+        reg.dependency_graph(["a"])
+
+
+def test_unknown_dependency_is_rejected(config: Config, project_root: Path) -> None:
+    _write_entity(project_root, "a", ["missing"])
+    reg = Registry.from_dirs(entity_dirs=config.entity_dirs)
+
+    with pytest.raises(KeyError, match="missing"):
+        reg.dependency_graph(["a"])
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import os
+import subprocess
+from functools import partial
+from pathlib import Path
+import anyio
+import pytest
+import mun
+from mun import control
+from mun.component import Context
+from mun.config import Config
+from mun.daemon import Daemon
+from mun.registry import Registry
+from mun.runtime import Runtime
+from mun.shared import SharedEntity, holder_alive, holder_id, shared_socket_path
+
+
+@pytest.fixture
+def run_dir(tmp_path: Path, env) -> Path:
+    env(
+        XDG_RUNTIME_DIR=str(tmp_path / "run"),
+        PYTHONPATH=str(Path(mun.__file__).parents[1]),
+    )
+    return tmp_path / "run"
+
+
+def _write_entities(root: Path) -> Path:
+    started = root / "started"
+    (root / ".mun/entities/db.toml").write_text(
+        "shared = 'machine'\n"
+        "depends_on = ['volume']\n"
+        f"[exec]\nargs = ['sh', '-c', 'echo db >> {started}; exec sleep 30']\n"
+    )
+    (root / ".mun/entities/volume.toml").write_text(
+        f"[exec]\nargs = ['sh', '-c', 'echo volume >> {started}; exec sleep 30']\n"
+    )
+    (root / ".mun/entities/app.toml").write_text(
+        "depends_on = ['db']\n[exec]\nargs = ['sleep', '30']\n"
+    )
+    return started
+
+
+async def _request(path: Path, command: str, **args):
+    return await anyio.to_thread.run_sync(
+        partial(control.request, path, command, **args)
+    )
+
+
+def test_shared_dependencies_left_to_daemon(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_entities(project_root)
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+
+    assert registry.dependency_graph(["app"]) == {"app": ["db"], "db": []}
+    entity = registry.instantiate_entity("db", ctx=ctx)
+    assert isinstance(entity, SharedEntity)
+    assert entity.definitions == [
+        project_root / ".mun/entities/db.toml",
+        project_root / ".mun/entities/volume.toml",
+    ]
+
+    # the shared daemon itself runs them like any other entity
+    registry.share = False
+    assert registry.dependency_graph(["db"]) == {"db": ["volume"], "volume": []}
+    assert not isinstance(registry.instantiate_entity("db", ctx=ctx), SharedEntity)
+
+
+def test_socket_path_by_scope(tmp_path: Path) -> None:
+    path = tmp_path / "db.toml"
+    project, sibling = [tmp_path / "project"], [tmp_path / "sibling"]
+
+    machine = partial(shared_socket_path, path, scope="machine")
+    assert machine(roots=project) == machine(roots=sibling)
+    workspace = partial(shared_socket_path, path, scope="workspace")
+    assert workspace(roots=project) != workspace(roots=sibling)
+    assert workspace(roots=project) != machine(roots=project)
+
+
+@pytest.mark.anyio
+async def test_daemon_counts_holders(
+    ctx: Context, project_root: Path, config: Config, run_dir: Path
+) -> None:
+    _write_entities(project_root)
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    registry.share = False
+    socket = run_dir / "shared.sock"
+    daemon = Daemon(
+        runtime=Runtime(registry=registry, ctx=ctx), path=socket, shared=True
+    )
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(daemon.serve)
+        with anyio.fail_after(5):
+            while not socket.exists():
+                await anyio.sleep(0.01)
+
+        holders = [holder_id(os.getpid()) for _ in range(2)]
+        for holder in holders:
+            result = await _request(socket, "acquire", name="db", holder=holder)
+            assert result["states"] == {"db": "ready", "volume": "ready"}
+
+        await _request(socket, "release", holder=holders[0])
+        assert await _request(socket, "status") == {"db": "ready", "volume": "ready"}
+        await _request(socket, "release", holder=holders[1])
+
+    assert not socket.exists()
+    assert not daemon.runtime.entities
+
+
+@pytest.mark.anyio
+async def test_daemon_expires_exited_holders(
+    ctx: Context, project_root: Path, config: Config, run_dir: Path
+) -> None:
+    _write_entities(project_root)
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    registry.share = False
+    socket = run_dir / "shared.sock"
+    daemon = Daemon(
+        runtime=Runtime(registry=registry, ctx=ctx),
+        path=socket,
+        shared=True,
+        idle_timeout=0,
+    )
+    exited = subprocess.run(["sh", "-c", "echo $$"], capture_output=True, text=True)
+
+    with anyio.fail_after(10):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(daemon.serve)
+            while not socket.exists():
+                await anyio.sleep(0.01)
+            await _request(
+                socket, "acquire", name="db", holder=f"{exited.stdout.strip()}::a"
+            )
+
+    assert not daemon.holders
+    assert not daemon.runtime.entities
+
+
+def test_holders_of_reused_pids_have_exited() -> None:
+    holder = holder_id(os.getpid())
+    assert holder_alive(holder)
+
+    # as though another process had been given the PID since
+    pid, _, id = holder.split(":")
+    assert not holder_alive(f"{pid}:1:{id}")
+
+
+@pytest.mark.anyio
+async def test_concurrent_acquires_start_once(
+    ctx: Context, project_root: Path, config: Config, run_dir: Path
+) -> None:
+    started = _write_entities(project_root)
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    registry.share = False
+    socket = run_dir / "shared.sock"
+    daemon = Daemon(
+        runtime=Runtime(registry=registry, ctx=ctx), path=socket, shared=True
+    )
+
+    with anyio.fail_after(10):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(daemon.serve)
+            while not socket.exists():
+                await anyio.sleep(0.01)
+
+            holders = [holder_id(os.getpid()) for _ in range(2)]
+            async with anyio.create_task_group() as acquiring:
+                for holder in holders:
+                    acquiring.start_soon(
+                        partial(_request, socket, "acquire", name="db", holder=holder)
+                    )
+            assert started.read_text() == "volume\ndb\n"
+            assert daemon.holders == set(holders)
+
+            for holder in holders:
+                await _request(socket, "release", holder=holder)
+
+    assert not daemon.runtime.entities
+
+
+@pytest.mark.anyio
+async def test_projects_share_one_daemon(
+    ctx: Context, project_root: Path, config: Config, run_dir: Path
+) -> None:
+    started = _write_entities(project_root)
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    socket = shared_socket_path(project_root / ".mun/entities/db.toml", scope="machine")
+    assert socket.is_relative_to(run_dir)
+
+    with anyio.fail_after(20):
+        async with Runtime(registry=registry, ctx=ctx) as first:
+            async with Runtime(registry=registry, ctx=ctx) as second:
+                await first.start(["app"])
+                await second.start(["app"])
+                assert started.read_text() == "volume\ndb\n"
+                assert second.states == {"app": "ready", "db": "ready"}
+
+            # still held by the first
+            assert await _request(socket, "status") == {
+                "db": "ready",
+                "volume": "ready",
+            }
+
+        while socket.exists():
+            await anyio.sleep(0.05)
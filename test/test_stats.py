@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+from typing import Iterator
+import anyio
+import pytest
+from mun.stats import Sample, Sampler, sample_sessions
+
+
+@pytest.fixture()
+def session() -> Iterator[int]:
+    # a session leader with a child of its own, both counted towards the session
+    proc = subprocess.Popen(
+        ["bash", "-c", "sleep 30 & wait"],
+        start_new_session=True,
+    )
+    yield proc.pid
+    # the whole group, as killing the leader alone leaves its child running
+    os.killpg(proc.pid, signal.SIGKILL)
+    proc.wait()
+
+
+def test_sample_session(session: int) -> None:
+    samples = sample_sessions([session])
+
+    sample = samples[session]
+    assert sample.processes >= 1
+    assert sample.rss_bytes > 0
+    assert sample.fds > 0
+
+
+def test_sample_skips_missing_sessions() -> None:
+    assert sample_sessions([sys.maxsize]) == {}
+
+
+def test_sampler_keeps_rolling_history(session: int) -> None:
+    sampler = Sampler(history=2)
+
+    for _ in range(3):
+        sampler.record({"ent.exec": session})
+
+    assert len(sampler.series["ent.exec"]) == 2
+    summary = sampler.summary()["ent.exec"]
+    assert summary["rss"] > 0
+    assert len(summary["cpu_history"]) == 1
+
+
+def test_sampler_forgets_stopped_processes(session: int) -> None:
+    sampler = Sampler()
+
+    sampler.record({"ent.exec": session})
+    sampler.record({})
+
+    assert sampler.summary() == {}
+
+
+@pytest.mark.anyio
+async def test_sampler_updates_history_on_the_loop(session: int) -> None:
+    sampler = Sampler(interval=0.01)
+    loop_thread = threading.get_ident()
+    threads = []
+    update = sampler.update
+
+    def record_thread(pids: dict[str, int], samples: dict[int, Sample]) -> None:
+        threads.append(threading.get_ident())
+        update(pids, samples)
+
+    sampler.update = record_thread  # type: ignore[method-assign]
+    with anyio.move_on_after(0.2):
+        await sampler.run(lambda: {"ent.exec": session})
+
+    assert threads
+    assert set(threads) == {loop_thread}
+    assert "ent.exec" in sampler.summary()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from pathlib import Path
+import pytest
+from click.testing import CliRunner
+from mun.cli import cli
+from mun.component import Context
+from mun.config import Config
+from mun.registry import Registry
+from mun.tasks import TaskRunner
+
+
+def _write_task(root: Path, name: str, script: str, depends_on: list[str]) -> None:
+    (root / f".mun/entities/{name}.toml").write_text(
+        f"depends_on = {depends_on!r}\n[exec]\nargs = ['sh', '-c', {script!r}]\n"
+    )
+
+
+def _runner(config: Config, ctx: Context, **kwargs: object) -> TaskRunner:
+    registry = Registry.from_dirs(entity_dirs=config.entity_dirs)
+    return TaskRunner(registry=registry, ctx=ctx, **kwargs)
+
+
+@pytest.mark.anyio
+async def test_runs_dependencies_first(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    log = project_root / "log"
+    _write_task(project_root, "migrate", f"echo migrate >> {log}", [])
+    _write_task(project_root, "fixtures", f"echo fixtures >> {log}", ["migrate"])
+    _write_task(project_root, "unrelated", f"echo unrelated >> {log}", [])
+
+    results = await _runner(config, ctx).run(["fixtures"])
+
+    assert log.read_text() == "migrate\nfixtures\n"
+    assert list(results) == ["migrate", "fixtures"]
+    assert all(result.status == "succeeded" for result in results.values())
+
+
+@pytest.mark.anyio
+async def test_jobs_limit_concurrency(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    running, peaks = project_root / "running", project_root / "peaks"
+    running.mkdir()
+    names = [f"warm{i}" for i in range(4)]
+    for name in names:
+        # each records how many were running as it started, itself included
+        _write_task(
+            project_root,
+            name,
+            f"touch {running}/{name}; ls {running} | wc -l >> {peaks};"
+            f" sleep 0.5; rm {running}/{name}",
+            [],
+        )
+
+    for jobs in (1, 2):
+        peaks.write_text("")
+        await _runner(config, ctx, jobs=jobs).run(names)
+        assert max(int(line) for line in peaks.read_text().split()) == jobs
+
+
+@pytest.mark.anyio
+async def test_failure_stops_everything(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_task(project_root, "broken", "exit 3", [])
+    _write_task(project_root, "slow", "sleep 30", [])
+    _write_task(project_root, "after", "true", ["broken"])
+
+    runner = _runner(config, ctx, jobs=2)
+    results = await runner.run(["slow", "after"])
+
+    assert runner.failed
+    assert results["broken"].status == "failed"
+    assert results["broken"].error == "exec exited with status 3"
+    assert results["slow"].status == "cancelled"
+    assert results["after"].status == "skipped"
+
+
+@pytest.mark.anyio
+async def test_keep_going_runs_independent_tasks(
+    ctx: Context, project_root: Path, config: Config
+) -> None:
+    _write_task(project_root, "broken", "exit 3", [])
+    _write_task(project_root, "after", "true", ["broken"])
+    _write_task(project_root, "independent", "sleep 0.1", [])
+
+    results = await _runner(config, ctx, jobs=1, keep_going=True).run(
+        ["after", "independent"]
+    )
+
+    assert results["broken"].status == "failed"
+    assert results["after"].status == "skipped"
+    assert results["independent"].status == "succeeded"
+
+
+def test_cli_summarises_tasks(project_root: Path) -> None:
+    _write_task(project_root, "ok", "true", [])
+    _write_task(project_root, "broken", "exit 1", ["ok"])
+
+    result = CliRunner().invoke(cli, ["run", "-j", "2", "broken"])
+
+    assert result.exit_code == 1
+    assert "succeeded" in result.output
+    assert "failed" in result.output
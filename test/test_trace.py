@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import pytest
+from click.testing import CliRunner
+from mun import trace
+from mun.cli import cli
+
+
+@pytest.fixture()
+def tracer(monkeypatch: pytest.MonkeyPatch) -> trace.Tracer:
+    tracer = trace.Tracer()
+    monkeypatch.setattr(trace, "TRACER", tracer)
+    return tracer
+
+
+def test_spans_only_recorded_when_enabled(tracer: trace.Tracer) -> None:
+    with trace.span("ignored"):
+        pass
+    assert tracer.events == []
+
+    tracer.enabled = True
+    with trace.span("outer"), trace.span("inner", track="other", detail=1):
+        pass
+
+    inner, outer = tracer.events
+    assert (outer["name"], inner["name"]) == ("outer", "inner")
+    assert inner["args"] == {"detail": 1}
+    assert inner["tid"] != outer["tid"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+
+def test_cli_writes_trace(
+    tracer: trace.Tracer, project_root: Path, tmp_path: Path
+) -> None:
+    (project_root / ".mun/entities/ent1.toml").touch()
+    out = tmp_path / "trace.json"
+
+    result = CliRunner().invoke(cli, ["--trace", str(out), "entity", "list"])
+
+    assert result.exit_code == 0, result.output
+    assert tracer.enabled
+    events = json.loads(out.read_text())["traceEvents"]
+    names = {event["name"] for event in events if event["ph"] == "X"}
+    assert {"config.entity_dirs", "registry.from_dirs"} <= names
+    assert any(event["ph"] == "M" for event in events)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import pytest
-from mun.util import camel_case
+from mun.util import camel_case, describe_error
 
 
 @pytest.mark.parametrize(
@@ -16,3 +16,10 @@ from mun.util import camel_case
 )
 def test_camel_case(input: str, expected: str) -> None:
     assert camel_case(input) == expected
+
+
+def test_describe_error() -> None:
+    group = ExceptionGroup(
+        "", [ValueError("bad value"), ExceptionGroup("", [OSError()])]
+    )
+    assert describe_error(group, sep=", ") == "bad value, OSError"
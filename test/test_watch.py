@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import anyio
+import pytest
+from mun.watch import InotifyWatcher, PollWatcher, Watcher, open_watcher
+
+
+@pytest.fixture(params=["inotify", "poll"])
+def watcher(request: pytest.FixtureRequest, tmp_path: Path) -> Watcher:
+    if request.param == "poll":
+        return PollWatcher([tmp_path], interval=0.01)
+    if not sys.platform.startswith("linux"):
+        pytest.skip("inotify is only available on linux")
+    return InotifyWatcher.open([tmp_path])
+
+
+@pytest.mark.anyio
+async def test_watcher_reports_changed_entity_files(
+    watcher: Watcher, tmp_path: Path
+) -> None:
+    (tmp_path / "removed.toml").write_text("")
+    async with anyio.create_task_group() as tg:
+        changes: set[Path] = set()
+
+        async def collect() -> None:
+            while len(changes) < 2:
+                changes.update(await watcher.changes())
+
+        tg.start_soon(collect)
+        await anyio.sleep(0.05)
+        (tmp_path / "ignored.txt").write_text("")
+        (tmp_path / "added.toml").write_text("")
+        (tmp_path / "removed.toml").unlink()
+        with anyio.fail_after(5):
+            while len(changes) < 2:
+                await anyio.sleep(0.01)
+
+    watcher.close()
+    assert changes == {tmp_path / "added.toml", tmp_path / "removed.toml"}
+
+
+def test_open_watcher_skips_missing_dirs(tmp_path: Path) -> None:
+    watcher = open_watcher([tmp_path, tmp_path / "missing"], poll_interval=1)
+    watcher.close()